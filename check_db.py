@@ -16,6 +16,7 @@ tables = conn.execute(
 
 print(f"\n{'='*60}")
 print(f"  DB: {database.DB_PATH}")
+print(f"  Schema version: {database.get_schema_version()} (latest: {database.SCHEMA_VERSION})")
 print(f"  Tables: {[t['name'] for t in tables]}")
 print(f"{'='*60}")
 
@@ -35,5 +36,21 @@ for table in tables:
     else:
         print("  (empty)")
 
+print(f"\n--- query plans ---")
+database.print_query_plans()
+
+print(f"\n--- query stats ---")
+dump = database.load_query_stats()
+if dump:
+    print(f"  (from {database.QUERY_STATS_PATH}, dumped {dump['dumped_at']} by pid {dump['pid']})")
+    database.print_query_stats(dump['stats'])
+    print(f"Slow Queries [>= {dump['slow_query_ms']} ms, n={len(dump['slow_queries'])}]:")
+    for x in dump['slow_queries']:
+        print(f"- {x['ms']} ms: {x['sql']}")
+        for detail in x['plan']:
+            print(f"      {detail}")
+else:
+    print(f"  (no {database.QUERY_STATS_PATH} — run run_admin.py with instrument_queries = True)")
+
 print(f"\n{'='*60}\n")
 conn.close()
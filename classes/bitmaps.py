@@ -0,0 +1,132 @@
+
+from classes.interval import Interval
+
+# Time-slot bitmap engine for large groups (Persons.get_bitmap_availability).
+# A person's free time (availability minus commitments) is quantized into fixed
+# buckets over a horizon and held as one Python int: bit i is set when the person
+# is free for the whole of bucket i. A group intersection is then a chain of ANDs,
+# and "at least k of n free" a bit-sliced popcount (a ripple-carry adder across the
+# bitmaps), each operating on the whole horizon at once.
+
+BUCKET_SECONDS = 15 * 60
+HORIZON_DAYS = 90
+
+def _set_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+class BitmapGrid():
+    """
+    Bucket layout: n_buckets buckets of granularity seconds starting at origin_ts (UTC epoch seconds).
+    Availability is rounded inwards (partly covered buckets are not free), commitments outwards.
+    """
+    __slots__ = ("origin_ts", "granularity", "n_buckets", "key", "_full")
+
+    def __init__(self, origin_ts, n_buckets, granularity=BUCKET_SECONDS):
+        self.origin_ts = origin_ts
+        self.granularity = granularity
+        self.n_buckets = n_buckets
+        self.key = (origin_ts, granularity, n_buckets)  # Person bitmap cache key
+        self._full = (1 << n_buckets) - 1
+
+    @classmethod
+    def for_horizon(cls, now_ts, horizon_days=HORIZON_DAYS, granularity=BUCKET_SECONDS):
+        """Grid from the start of now_ts's UTC day, so cached bitmaps stay valid for the whole day."""
+        origin_ts = now_ts - (now_ts % 86400)
+        return cls(origin_ts, (horizon_days * 86400) // granularity, granularity)
+
+    def _mask(self, start_ts, end_ts, inner):
+        if inner:
+            first = -((self.origin_ts - start_ts) // self.granularity)  # ceil
+            last = (end_ts - self.origin_ts) // self.granularity
+        else:
+            first = (start_ts - self.origin_ts) // self.granularity
+            last = -((self.origin_ts - end_ts) // self.granularity)
+        first = max(first, 0)
+        last = min(last, self.n_buckets)
+        return (((1 << (last - first)) - 1) << first) if (first < last) else 0
+
+    def bitmap(self, availability, commitments=()):
+        """Free-bucket bitmap of one person: availability minus commitments."""
+        bits = 0
+        for _, start_ts, end_ts in availability:
+            bits |= self._mask(start_ts, end_ts, inner=True)
+        for _, start_ts, end_ts in commitments:
+            if bits:
+                bits &= ~self._mask(start_ts, end_ts, inner=False)
+        return bits
+
+    def intersect(self, bitmaps):
+        """Buckets where every bitmap is free."""
+        bits = self._full if bitmaps else 0
+        for x in bitmaps:
+            bits &= x
+            if not bits:
+                break
+        return bits
+
+    def quorum(self, bitmaps, k):
+        """Buckets where at least k bitmaps are free (bit-sliced counter + compare against k)."""
+        planes = []  # planes[j] holds bit j of every bucket's free count
+        for carry in bitmaps:
+            for j in range(len(planes)):
+                if not carry:
+                    break
+                planes[j], carry = planes[j] ^ carry, planes[j] & carry
+            if carry:
+                planes.append(carry)
+        if (k <= 0):
+            return self._full
+        if (k.bit_length() > len(planes)):
+            return 0
+        greater, equal = 0, self._full
+        for j in range(len(planes) - 1, -1, -1):
+            if ((k >> j) & 1):
+                equal &= planes[j]
+            else:
+                greater |= equal & planes[j]
+                equal &= ~planes[j]
+        return greater | equal
+
+    def runs(self, bits):
+        """(first, last) bucket index pairs of every run of set bits, in order (last exclusive)."""
+        offset = 0
+        while bits:
+            skip = (bits & -bits).bit_length() - 1
+            bits >>= skip
+            offset += skip
+            length = (bits ^ (bits + 1)).bit_length() - 1
+            yield (offset, offset + length)
+            bits >>= length
+            offset += length
+
+    def _ts(self, bucket):
+        return self.origin_ts + bucket * self.granularity
+
+    def windows(self, bits, ids):
+        """Runs of bits as Interval(ids, start_ts, end_ts)."""
+        return [Interval(ids, self._ts(first), self._ts(last)) for first, last in self.runs(bits)]
+
+    def quorum_windows(self, bitmaps, owners, k):
+        """
+        Windows where at least k of bitmaps are free, split wherever the set of free persons changes,
+        as Interval(free_ids, start_ts, end_ts) (owners[i] are the ids of bitmaps[i]).
+        """
+        changes = 0  # bit i set: somebody's bucket i differs from bucket i + 1
+        for x in bitmaps:
+            changes |= x ^ (x >> 1)
+        n_bytes = (self.n_buckets + 7) // 8
+        rows = [(x.to_bytes(n_bytes, "little"), owner) for x, owner in zip(bitmaps, owners)]  # O(1) bit tests
+        windows = []
+        for first, last in self.runs(self.quorum(bitmaps, k)):
+            cuts = [first]
+            inner = (changes >> first) & ((1 << (last - first - 1)) - 1)
+            cuts.extend(first + j + 1 for j in _set_bits(inner))
+            cuts.append(last)
+            for seg_first, seg_last in zip(cuts, cuts[1:]):
+                byte, bit = seg_first >> 3, 1 << (seg_first & 7)
+                free_ids = tuple(x for row, owner in rows if (row[byte] & bit) for x in owner)
+                windows.append(Interval(free_ids, self._ts(seg_first), self._ts(seg_last)))
+        return windows
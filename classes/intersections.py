@@ -0,0 +1,172 @@
+
+import heapq
+
+try:
+    import numpy as np  # optional: vectorizes batch_intersections
+except ImportError:
+    np = None
+
+from classes.interval import Interval
+
+# Sweep-line intersection engines for Persons.get_intersecting_availability and
+# Persons.get_quorum_availability, plus the batch engine behind
+# Persons.get_intersecting_availability_batch.
+# Every availability is a sorted, non-overlapping interval list (an IntervalSet),
+# so each one is already a sorted stream of start/end events; heapq.merge walks
+# the k streams together in O(total · log k) while a counter tracks how many
+# persons are free.
+
+_END, _START = 0, 1  # at equal timestamps ends sort first: touching slots do not intersect
+
+def _events(intervals):
+    for _, start_ts, end_ts in intervals:
+        if (start_ts < end_ts):
+            yield (start_ts, _START)
+            yield (end_ts, _END)
+
+def sweep_intersections(availabilities):
+    """
+    Windows where every availability in availabilities is free, as Interval(ids, start_ts, end_ts)
+    sorted by start, with ids = all participants' ids in availabilities order.
+    Same result as intersecting the lists pairwise.
+    """
+    k = len(availabilities)
+    if (k == 0) or not all(availabilities):
+        return []
+    ids = tuple(x for availability in availabilities for x in availability[0][0])
+    intersections = []
+    free = 0
+    window_start = None
+    for ts, kind in heapq.merge(*[_events(x) for x in availabilities]):
+        if (kind == _START):
+            free += 1
+            if (free == k):
+                window_start = ts
+        else:
+            if (free == k) and (window_start < ts):
+                intersections.append(Interval(ids, window_start, ts))
+            free -= 1
+    return intersections
+
+def _owner_ids(availability):
+    return getattr(availability, "ids", None) or (availability[0][0] if availability else ())
+
+def _indexed_events(i, intervals):
+    for _, start_ts, end_ts in intervals:
+        if (start_ts < end_ts):
+            yield (start_ts, _START, i)
+            yield (end_ts, _END, i)
+
+def sweep_quorum_intersections(availabilities, quorum):
+    """
+    Windows where at least quorum of the availabilities are free, in one sweep over all of them.
+    Each window is Interval(free_ids, start_ts, end_ts): free_ids are the participants free for the
+    whole window (in availabilities order); a new window starts whenever that set changes.
+    With quorum == len(availabilities) this equals sweep_intersections().
+    """
+    owners = [_owner_ids(x) for x in availabilities]
+    quorum = max(1, quorum)
+    free = [False] * len(availabilities)
+    free_count = 0
+    prev_ts = None
+    intersections = []
+    for ts, kind, i in heapq.merge(*[_indexed_events(i, x) for i, x in enumerate(availabilities)]):
+        # Emit the span since the previous timestamp once every event at that timestamp is applied
+        if (prev_ts is not None) and (prev_ts < ts) and (free_count >= quorum):
+            intersections.append(Interval(
+                tuple(x for j, owner in enumerate(owners) if free[j] for x in owner), prev_ts, ts
+            ))
+        prev_ts = ts
+        free[i] = (kind == _START)
+        free_count += 1 if (kind == _START) else -1
+    return intersections
+
+class _IntervalArrays():
+    """Every distinct availability of a batch packed once into contiguous int64 start/end arrays (CSR offsets)."""
+    __slots__ = ("starts", "ends", "offsets", "index")
+
+    def __init__(self, availabilities):
+        self.index = {}  # id(availability) -> row
+        unique = []
+        for availability in availabilities:
+            if (id(availability) not in self.index):
+                self.index[id(availability)] = len(unique)
+                unique.append(availability)
+        lengths = np.fromiter((len(x) for x in unique), dtype=np.int64, count=len(unique))
+        self.offsets = np.concatenate(([0], np.cumsum(lengths)))
+        total = int(self.offsets[-1])
+        self.starts = np.fromiter((x.start_ts for a in unique for x in a), dtype=np.int64, count=total)
+        self.ends = np.fromiter((x.end_ts for a in unique for x in a), dtype=np.int64, count=total)
+
+    def gather(self, group_idx, rows, base, span):
+        """
+        The intervals of rows (one row per entry of group_idx) concatenated, with every timestamp keyed as
+        group * span + (ts - base): groups occupy disjoint key ranges, so the result stays globally sorted.
+        """
+        group_idx = np.asarray(group_idx, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        lo = self.offsets[rows]
+        counts = self.offsets[rows + 1] - lo
+        owner = np.repeat(np.arange(len(rows)), counts)
+        idx = lo[owner] + np.arange(int(counts.sum())) - (np.cumsum(counts) - counts)[owner]
+        shift = group_idx[owner] * span - base
+        return self.starts[idx] + shift, self.ends[idx] + shift
+
+def _intersect_arrays(a_starts, a_ends, b_starts, b_ends):
+    """Vectorized intersection of two sorted, non-overlapping interval arrays (touching does not intersect)."""
+    lo = np.searchsorted(b_ends, a_starts, side="right")   # first b ending after a starts
+    hi = np.searchsorted(b_starts, a_ends, side="left")    # first b starting at/after a ends
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if (total == 0):
+        return a_starts[:0], a_ends[:0]
+    a_idx = np.repeat(np.arange(len(a_starts)), counts)
+    b_idx = lo[a_idx] + np.arange(total) - (np.cumsum(counts) - counts)[a_idx]
+    starts = np.maximum(a_starts[a_idx], b_starts[b_idx])
+    ends = np.minimum(a_ends[a_idx], b_ends[b_idx])
+    keep = starts < ends
+    return starts[keep], ends[keep]
+
+def batch_intersections(groups):
+    """
+    Intersections for many groups at once: groups is a list of lists of availabilities, and the result
+    holds sweep_intersections(group) for each group, in order. With NumPy every distinct availability is
+    packed once into contiguous arrays, and all groups are folded together: step k intersects every
+    group's running result with its k-th member in one vectorized pass (timestamps are keyed by group so
+    the groups never mix). Without NumPy each group falls back to the sweep line.
+    """
+    if (np is None):
+        return [sweep_intersections(group) for group in groups]
+    arrays = _IntervalArrays(availability for group in groups for availability in group)
+    if not len(arrays.starts):
+        return [[] for _ in groups]
+    base = int(arrays.starts.min())
+    span = int(max(arrays.starts.max(), arrays.ends.max())) - base + 1
+    rows = [[arrays.index[id(x)] for x in group] for group in groups]
+    done_starts, done_ends = [], []
+    members = [g for g, x in enumerate(rows) if x]
+    starts, ends = arrays.gather(members, [rows[g][0] for g in members], base, span)
+    for k in range(1, max((len(x) for x in rows), default=0)):
+        members = [g for g, x in enumerate(rows) if (len(x) > k)]
+        active = np.zeros(len(rows), dtype=bool)
+        active[members] = True
+        running = active[starts // span]
+        done_starts.append(starts[~running])
+        done_ends.append(ends[~running])
+        b_starts, b_ends = arrays.gather(members, [rows[g][k] for g in members], base, span)
+        starts, ends = _intersect_arrays(starts[running], ends[running], b_starts, b_ends)
+    starts = np.concatenate(done_starts + [starts])
+    ends = np.concatenate(done_ends + [ends])
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    keep = starts < ends  # a lone availability may hold zero-length slots, which the sweep skips
+    starts, ends = starts[keep], ends[keep]
+    group_of = starts // span
+    bounds = np.searchsorted(group_of, np.arange(len(rows) + 1)).tolist()
+    shift = group_of * span - base
+    starts, ends = (starts - shift).tolist(), (ends - shift).tolist()
+    results = []
+    for g, group in enumerate(groups):
+        ids = tuple(x for availability in group for x in availability[0][0]) if all(group) else ()
+        results.append([Interval(ids, s, e) for s, e in zip(starts[bounds[g]:bounds[g + 1]], ends[bounds[g]:bounds[g + 1]])])
+    return results
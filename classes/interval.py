@@ -0,0 +1,41 @@
+
+from typing import NamedTuple, Tuple
+
+# Immutable scheduling records. Both are NamedTuples, so they index and unpack
+# like the [ids, start, end] lists they replace, compare/sort as tuples, and
+# carry no per-instance __dict__.
+
+class Interval(NamedTuple):
+    """[ids, start_ts, end_ts]: participant user ids (ints) and integer UTC epoch seconds."""
+    ids: Tuple[int, ...]
+    start_ts: int
+    end_ts: int
+
+    @property
+    def ids_str(self):
+        return ids_to_str(self.ids)
+
+class BalanceEntry(NamedTuple):
+    """One Person.balance_history ledger row."""
+    user_id: int
+    associate_ids: Tuple[int, ...]
+    start_ts: int
+    end_ts: int
+    amount: float
+    balance_after: float
+
+def ids_to_str(ids):
+    """(0, 1, 2) -> '0&1&2' (display / balance_history.associate_ids column)."""
+    return "&".join(str(x) for x in ids)
+
+def ids_from_str(ids_str):
+    """'0&1&2' (GROUP_CONCAT / associate_ids column) -> (0, 1, 2)."""
+    return tuple(int(x) for x in ids_str.split("&") if x.strip()) if ids_str else ()
+
+def as_interval(value):
+    """Interval, or a legacy [ids_str | ids, start_ts, end_ts] sequence -> Interval."""
+    if isinstance(value, Interval):
+        return value
+    ids, start_ts, end_ts = value
+    ids = ids_from_str(ids) if isinstance(ids, str) else tuple(int(x) for x in ids)
+    return Interval(ids, int(start_ts), int(end_ts))
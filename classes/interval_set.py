@@ -0,0 +1,155 @@
+
+from bisect import bisect_left, bisect_right
+
+from classes.interval import Interval
+
+class IntervalSet():
+    """
+    One owner's sorted, non-overlapping list of Interval(ids, start_ts, end_ts).
+    Backs Person.availability / commitments / meetings_history.
+    - add() locates the neighbours with bisect and merges every overlapping or
+      touching interval in one slice assignment: O(log n + k) comparisons.
+      merge() does the same and returns (removed, added), like subtract().
+    - subtract() / remove_many() cut ranges out in a single bisect-bounded pass,
+      keeping the fragments directly (no re-insert / re-sort).
+    - Reads like the list it replaces: len(), iteration, indexing/slicing,
+      `in`, index(), remove(), sort() (a no-op — it is always sorted).
+    """
+    __slots__ = ("ids", "_items", "_starts")
+
+    def __init__(self, ids, intervals=()):
+        self.ids = ids
+        if isinstance(intervals, IntervalSet):
+            self._items = list(intervals._items)
+            self._starts = list(intervals._starts)
+            return
+        # Normalise: sort, then merge overlapping/touching neighbours (same rule as add())
+        self._items = []
+        for _, start_ts, end_ts in sorted(intervals, key=lambda x: (x[1], x[2])):
+            if self._items and (start_ts <= self._items[-1].end_ts):
+                if (end_ts > self._items[-1].end_ts):
+                    self._items[-1] = Interval(ids, self._items[-1].start_ts, end_ts)
+            else:
+                self._items.append(Interval(ids, start_ts, end_ts))
+        self._starts = [x.start_ts for x in self._items]
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __contains__(self, interval):
+        i = bisect_left(self._starts, interval[1])
+        return (i < len(self._items)) and (self._items[i] == interval)
+
+    def __eq__(self, other):
+        if isinstance(other, IntervalSet):
+            return self._items == other._items
+        return self._items == list(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._items)
+
+    def __deepcopy__(self, memo):
+        return IntervalSet(self.ids, self)  # Intervals are immutable: copying the lists is a deep copy
+
+    def index(self, interval):
+        i = bisect_left(self._starts, interval[1])
+        if (i < len(self._items)) and (self._items[i] == interval):
+            return i
+        raise ValueError(f"{interval} is not in IntervalSet")
+
+    def remove(self, interval):
+        """Removes one exact interval (like list.remove)."""
+        i = self.index(interval)
+        del self._items[i]
+        del self._starts[i]
+
+    def sort(self):
+        pass
+
+    def overlapping(self, start_ts, end_ts):
+        """The intervals sharing more than an endpoint with [start_ts, end_ts] (bisect, O(log n + k))."""
+        lo = bisect_left(self._starts, start_ts)
+        if (lo > 0) and (self._items[lo - 1].end_ts > start_ts):
+            lo -= 1
+        return self._items[lo:bisect_left(self._starts, end_ts)]
+
+    def add(self, start_ts, end_ts):
+        """
+        Inserts [start_ts, end_ts], merged with every interval it overlaps or touches.
+        Returns the stored (possibly merged) Interval, or None if an existing interval already covers it.
+        """
+        _, added = self.merge(start_ts, end_ts)
+        return added[0] if added else None
+
+    def merge(self, start_ts, end_ts):
+        """
+        add() that reports the change: returns (removed, added), the Intervals absorbed into the merge
+        and the [merged] one stored in their place (([], []) if an existing interval already covers it).
+        """
+        lo = bisect_left(self._starts, start_ts)
+        if (lo > 0) and (self._items[lo - 1].end_ts >= start_ts):
+            lo -= 1  # previous interval reaches into (or up to) the new one
+        hi = bisect_right(self._starts, end_ts)  # intervals in [lo, hi) overlap or touch [start_ts, end_ts]
+        if (hi - lo == 1) and (self._items[lo].start_ts <= start_ts) and (end_ts <= self._items[lo].end_ts):
+            return [], []
+        removed = self._items[lo:hi]
+        if (lo < hi):
+            start_ts = min(start_ts, self._items[lo].start_ts)
+            end_ts = max(end_ts, self._items[hi - 1].end_ts)
+        merged = Interval(self.ids, start_ts, end_ts)
+        self._items[lo:hi] = [merged]
+        self._starts[lo:hi] = [start_ts]
+        return removed, [merged]
+
+    def subtract(self, start_ts, end_ts):
+        """
+        Cuts [start_ts, end_ts] out of the set (intervals that only touch it are kept).
+        Returns (removed, added): the Intervals taken out and the fragments put back in their place.
+        """
+        return self.remove_many([(start_ts, end_ts)])
+
+    def remove_many(self, ranges):
+        """
+        Cuts every (start_ts, end_ts) in ranges out of the set in one pass over the affected span:
+        O(m log m + log n + k) for m ranges touching k intervals. Returns (removed, added) like subtract().
+        """
+        ranges = sorted((x[-2], x[-1]) for x in ranges if x[-2] < x[-1])
+        if not ranges:
+            return [], []
+        lo = bisect_left(self._starts, ranges[0][0])
+        if (lo > 0) and (self._items[lo - 1].end_ts > ranges[0][0]):
+            lo -= 1
+        hi = bisect_left(self._starts, max(end for _, end in ranges))  # intervals in [lo, hi) start before the last cut ends
+        removed, added, kept = [], [], []
+        r = 0
+        for item in self._items[lo:hi]:
+            while (r < len(ranges)) and (ranges[r][1] <= item.start_ts):
+                r += 1
+            fragments = []
+            cursor = item.start_ts
+            j = r
+            while (j < len(ranges)) and (ranges[j][0] < item.end_ts):
+                if (ranges[j][0] > cursor):
+                    fragments.append(Interval(self.ids, cursor, ranges[j][0]))
+                cursor = max(cursor, ranges[j][1])
+                j += 1
+            if (cursor < item.end_ts):
+                fragments.append(Interval(self.ids, cursor, item.end_ts))
+            if (fragments == [item]):
+                kept.append(item)
+            else:
+                removed.append(item)
+                added.extend(fragments)
+                kept.extend(fragments)
+        if removed:
+            self._items[lo:hi] = kept
+            self._starts[lo:hi] = [x.start_ts for x in kept]
+        return removed, added
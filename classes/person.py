@@ -3,65 +3,184 @@
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+from classes.interval import Interval, BalanceEntry, ids_to_str, ids_from_str
+from classes.interval_set import IntervalSet
+from classes.timestamps import to_epoch, from_epoch, epoch_to_utc_text
 from db import database
 
 class Person():
     print_debug = False
+    write_buffer = None  # WriteBuffer shared by every Person in write-behind mode (set by Persons); None = write-through
+    __slots__ = ("role", "first_name", "last_name", "id", "family_id", "date_registered", "date_of_birth",
+                 "address", "phone_number", "email", "rate", "balance", "timezone", "comments",
+                 "_availability", "_commitments", "_meetings_history", "_balance_history", "_ids", "_free", "_bitmap",
+                 "_commitment_rows", "_meeting_rows", "_pending", "_balance_keys", "_balance_unwritten")
     
-    def __init__(self, items):
+    def __init__(self, items, schedule=None):
         ### Per-Person Profile ###
+        # id / family_id are ints (family_id may be None), rate / balance are floats, the rest are strings
         self.role = items[0]
         self.first_name = items[1]
         self.last_name = items[2]
-        self.id = items[3]
-        self.family_id = items[4]
+        self.id = int(items[3])
+        self.family_id = int(items[4]) if (str(items[4]).strip() not in ("", "None")) else None
         self.date_registered = items[5]
         self.date_of_birth = items[6]
         self.address = items[7]
         self.phone_number = items[8]
         self.email = items[9]
-        self.rate = items[10]
-        self.balance = items[11]
+        self.rate = float(items[10])
+        self.balance = float(items[11])
         self.timezone = items[12]
         self.comments = items[13]
         
         ### Per-Person Scheduling & Financial History (loaded from DB) ###
-        _availability_rows = database.fetch_all(
-            "SELECT user_id, start_utc, end_utc FROM user_availabilities WHERE user_id=? ORDER BY start_utc",
-            (int(self.id),)
-        )
-        self.availability = [[str(r["user_id"]), r["start_utc"], r["end_utc"]] for r in _availability_rows]
+        # Intervals are Interval((id,), start_ts, end_ts) with integer UTC epoch seconds, held in
+        # sorted, merged IntervalSets; every interval of this person shares the one ids tuple.
+        # The DB rows behind commitments / meetings_history are kept by primary key in _commitment_rows /
+        # _meeting_rows ({commitment_id | meeting_id: (start_ts, end_ts)}), so syncs address rows by id.
+        self._ids = (self.id,)
+        self._free = None    # free time view (availability minus commitments), built on first access
+        self._bitmap = None  # (grid.key, free-bucket int) cache for free_bitmap(); reset whenever free time changes
+        # schedule: (availability_rows, commitment_rows) already fetched for this person
+        # (Persons bulk hydration); None queries the DB for this person only.
+        if (schedule is None):
+            schedule = self._fetch_schedule()
+        self._set_schedule(*schedule)
+        # History is lazy: meetings_history / balance_history are loaded on first access
+        # (or in bulk by Persons.prefetch_history()). None = not loaded yet.
+        self._meetings_history = None
+        self._meeting_rows = None
+        self._balance_history = None
+        self._balance_keys = None  # {entry[0:5]} of balance_history: the ledger's duplicate check, kept with it
+        self._balance_unwritten = 0.0  # balance moved in memory but not yet added to users.balance
+        # Write-behind: {table: (removed, added) | None (rewrite all)} not yet flushed; None = nothing pending
+        self._pending = None
 
-        _commitment_rows = database.fetch_all(
-            """SELECT cp.user_id, c.start_utc, c.end_utc
-               FROM commitment_participants cp
-               JOIN commitments c ON cp.commitment_id = c.commitment_id
-               WHERE cp.user_id = ?
-               ORDER BY c.start_utc""",
-            (int(self.id),)
+    def _fetch_schedule(self):
+        print(f"------ _fetch_schedule() ------") if (self.print_debug == True) else False
+        user_id = (self.id,)
+        return (
+            database.fetch_all(
+                "SELECT user_id, start_ts, end_ts FROM user_availabilities WHERE user_id=? ORDER BY start_ts",
+                user_id
+            ),
+            database.fetch_all(
+                """SELECT cp.user_id, c.commitment_id, c.start_ts, c.end_ts
+                   FROM commitment_participants cp
+                   JOIN commitments c ON cp.commitment_id = c.commitment_id
+                   WHERE cp.user_id = ?
+                   ORDER BY c.start_ts""",
+                user_id
+            ),
         )
-        self.commitments = [[str(r["user_id"]), r["start_utc"], r["end_utc"]] for r in _commitment_rows]
 
-        _meetings_history_rows = database.fetch_all(
-            """SELECT mp.user_id, m.start_utc, m.end_utc
-               FROM meeting_participants mp
-               JOIN meetings m ON mp.meeting_id = m.meeting_id
-               WHERE mp.user_id = ?
-               ORDER BY m.start_utc""",
-            (int(self.id),)
-        )
-        self.meetings_history = [[str(r["user_id"]), r["start_utc"], r["end_utc"]] for r in _meetings_history_rows]
+    def _set_schedule(self, availability_rows, commitment_rows):
+        self.availability = [Interval(self._ids, r["start_ts"], r["end_ts"]) for r in availability_rows]
+        self.commitments = [Interval(self._ids, r["start_ts"], r["end_ts"]) for r in commitment_rows]
+        self._commitment_rows = {r["commitment_id"]: (r["start_ts"], r["end_ts"]) for r in commitment_rows}
 
-        _balance_rows = database.fetch_all(
-            """SELECT user_id, associate_ids, start_utc, end_utc, amount, balance_after
-               FROM balance_history WHERE user_id = ? ORDER BY entry_id""",
-            (int(self.id),)
-        )
-        self.balance_history = [
-            [str(r["user_id"]), r["associate_ids"] or "", r["start_utc"], r["end_utc"],
-             str(r["amount"]), str(r["balance_after"])]
-            for r in _balance_rows
+    # Assigning any iterable of [ids, start_ts, end_ts] stores it as this person's IntervalSet
+    @property
+    def availability(self):
+        return self._availability
+
+    @availability.setter
+    def availability(self, availability):
+        self._availability = IntervalSet(self._ids, availability)
+        self._free = self._bitmap = None
+
+    @property
+    def commitments(self):
+        return self._commitments
+
+    @commitments.setter
+    def commitments(self, commitments):
+        self._commitments = IntervalSet(self._ids, commitments)
+        self._free = self._bitmap = None
+
+    @property
+    def free(self):
+        """
+        Free/busy view: availability minus commitments, as an IntervalSet. Built once on first access,
+        then kept up to date by create/remove availability and create/remove commitment (_free_add / _free_remove).
+        The intersection engines read this, so they never propose booked time.
+        """
+        if (self._free is None):
+            self._free = IntervalSet(self._ids, self.availability)
+            self._free.remove_many(self.commitments)
+        return self._free
+
+    def _free_add(self, start_ts, end_ts):
+        """[start_ts, end_ts] became available or uncommitted: free time gains what is available there and not committed."""
+        self._bitmap = None
+        if (self._free is not None):
+            for _, available_start, available_end in self.availability.overlapping(start_ts, end_ts):
+                self._free.add(max(available_start, start_ts), min(available_end, end_ts))
+            self._free.remove_many(self.commitments.overlapping(start_ts, end_ts))
+
+    def _free_remove(self, ranges):
+        """ranges [(start_ts, end_ts), ...] became unavailable or committed."""
+        self._bitmap = None
+        if (self._free is not None):
+            self._free.remove_many(ranges)
+
+    def free_bitmap(self, grid):
+        """Free time on a BitmapGrid as an int bitset, cached per grid."""
+        if (self._bitmap is None) or (self._bitmap[0] != grid.key):
+            self._bitmap = (grid.key, grid.bitmap(self.free))
+        return self._bitmap[1]
+
+    @property
+    def meetings_history(self):
+        if (self._meetings_history is None):
+            print(f"------ meetings_history (lazy load) ------") if (self.print_debug == True) else False
+            self._set_meetings_history(database.fetch_all(
+                """SELECT mp.user_id, m.meeting_id, m.start_ts, m.end_ts
+                   FROM meeting_participants mp
+                   JOIN meetings m ON mp.meeting_id = m.meeting_id
+                   WHERE mp.user_id = ?
+                   ORDER BY m.start_ts""",
+                (self.id,)
+            ))
+        return self._meetings_history
+
+    @meetings_history.setter
+    def meetings_history(self, meetings_history):
+        self._meetings_history = IntervalSet(self._ids, meetings_history)
+        if (self._meeting_rows is None):
+            self._meeting_rows = {}
+
+    @property
+    def balance_history(self):
+        if (self._balance_history is None):
+            print(f"------ balance_history (lazy load) ------") if (self.print_debug == True) else False
+            self._set_balance_history(database.fetch_all(
+                """SELECT user_id, associate_ids, start_ts, end_ts, amount, balance_after
+                   FROM balance_history WHERE user_id = ? ORDER BY entry_id""",
+                (self.id,)
+            ))
+        return self._balance_history
+
+    @balance_history.setter
+    def balance_history(self, balance_history):
+        self._balance_history = balance_history
+        self._balance_keys = {x[0:5] for x in balance_history}
+
+    def history_loaded(self):
+        return (self._meetings_history is not None) and (self._balance_history is not None)
+
+    def _set_meetings_history(self, meetings_history_rows):
+        self._meetings_history = IntervalSet(self._ids, [Interval(self._ids, r["start_ts"], r["end_ts"]) for r in meetings_history_rows])
+        self._meeting_rows = {r["meeting_id"]: (r["start_ts"], r["end_ts"]) for r in meetings_history_rows}
+
+    def _set_balance_history(self, balance_rows):
+        self._balance_history = [
+            BalanceEntry(r["user_id"], ids_from_str(r["associate_ids"]), r["start_ts"], r["end_ts"],
+                         float(r["amount"]), float(r["balance_after"]))
+            for r in balance_rows
         ]
+        self._balance_keys = {x[0:5] for x in self._balance_history}
         
     def __str__(self):
         string = f"Person: {self.role}, {self.first_name}, {self.last_name}, {self.id}, {self.family_id}, {self.date_registered}, {self.date_of_birth}, {self.address}, {self.phone_number}, {self.email}, {self.rate}, {self.balance}, {self.timezone}, {self.comments}"
@@ -86,15 +205,16 @@ class Person():
         
     def _update_person_data(self):
         print("------ _update_person_data() ------") if self.print_debug else None
+        # Profile columns only: balance moves by increments in _write_balance()
         database.execute(
             """UPDATE users SET role=?, first_name=?, last_name=?, family_id=?,
                date_registered=?, date_of_birth=?, address=?, phone_number=?,
-               email=?, rate=?, balance=?, timezone=?, comments=?
+               email=?, rate=?, timezone=?, comments=?
                WHERE id=?""",
             (self.role, self.first_name, self.last_name, self.family_id,
              self.date_registered, self.date_of_birth, self.address,
-             self.phone_number, self.email, float(self.rate), float(self.balance),
-             self.timezone, self.comments, int(self.id))
+             self.phone_number, self.email, self.rate,
+             self.timezone, self.comments, self.id)
         )
         
     def _sort_datetimes(self, datetimes_list):
@@ -103,115 +223,51 @@ class Person():
         
     def _create_datetime(self, datetimes_list, start_datetime, end_datetime):
         print(f"------ _create_datetime() ------") if (self.print_debug == True) else False
-        start_datetime_utc = start_datetime.astimezone(ZoneInfo("UTC"))
-        end_datetime_utc = end_datetime.astimezone(ZoneInfo("UTC"))
-        a_line = f"{self.id}, {start_datetime_utc}, {end_datetime_utc}\n"
-        a_split = [x.strip() for x in a_line.split(",")]
-        if (a_split not in datetimes_list):
-            # Merge with existing overlapping datetimes (if any)
-            datetime_to_remove = []
-            for id_old, start_datetime_utc_old_str, end_datetime_utc_old_str in datetimes_list:
-                start_datetime_utc_old = datetime.fromisoformat(start_datetime_utc_old_str)
-                end_datetime_utc_old = datetime.fromisoformat(end_datetime_utc_old_str)
-                if (start_datetime_utc <= start_datetime_utc_old) and (end_datetime_utc >= end_datetime_utc_old): # New is engulfing old
-                    self._print_self_basic() if (self.print_debug == True) else False
-                    print(f"- Datetimes Overlap (New Engulfs Old): {start_datetime_utc}->{end_datetime_utc} vs. {start_datetime_utc_old}->{end_datetime_utc_old}") if (self.print_debug == True) else False
-                    # remove old start/end datetimes
-                    datetime_to_remove.append([start_datetime_utc_old, end_datetime_utc_old])
-                elif (start_datetime_utc_old <= start_datetime_utc <= end_datetime_utc_old) or (start_datetime_utc_old <= end_datetime_utc <= end_datetime_utc_old):
-                    if (start_datetime_utc <= start_datetime_utc_old) and (end_datetime_utc <= end_datetime_utc_old): # New overlaps before old
-                        self._print_self_basic() if (self.print_debug == True) else False
-                        print(f"- Datetimes Overlap (New In/Before Old): {start_datetime_utc}->{end_datetime_utc} vs. {start_datetime_utc_old}->{end_datetime_utc_old}") if (self.print_debug == True) else False
-                        end_datetime_utc = end_datetime_utc_old
-                        # remove old start/end datetimes
-                        datetime_to_remove.append([start_datetime_utc_old, end_datetime_utc_old])
-                    elif (start_datetime_utc >= start_datetime_utc_old) and (end_datetime_utc >= end_datetime_utc_old): # New overlaps after old
-                        self._print_self_basic() if (self.print_debug == True) else False
-                        print(f"- Datetimes Overlap (New In/After Old): {start_datetime_utc}->{end_datetime_utc} vs. {start_datetime_utc_old}->{end_datetime_utc_old}") if (self.print_debug == True) else False
-                        start_datetime_utc = start_datetime_utc_old
-                        # remove old start/end datetimes
-                        datetime_to_remove.append([start_datetime_utc_old, end_datetime_utc_old])
-                    elif (start_datetime_utc >= start_datetime_utc_old) and (end_datetime_utc <= end_datetime_utc_old): # New is within old
-                        self._print_self_basic() if (self.print_debug == True) else False
-                        print(f"- Datetimes Overlap (New Within Old): {start_datetime_utc}->{end_datetime_utc} vs. {start_datetime_utc_old}->{end_datetime_utc_old}") if (self.print_debug == True) else False
-                        start_datetime_utc = start_datetime_utc_old
-                        end_datetime_utc = end_datetime_utc_old
-            # Remove any datetime to remove
-            for atr_start_time, atr_end_time in datetime_to_remove:
-                self._remove_datetime(datetimes_list, atr_start_time, atr_end_time)
-            # Use merged (if any) line and split
-            a_line = f"{self.id}, {start_datetime_utc}, {end_datetime_utc}\n"
-            a_split = [x.strip() for x in a_line.split(",")]
-            if (a_split not in datetimes_list):
-                datetimes_list.append(a_split)
-                self._print_self_basic() if (self.print_debug == True) else False
-                print(f"- Datetime Created: {a_split}") if (self.print_debug == True) else False
-            else:
-                self._print_self_basic() if (self.print_debug == True) else False
-                print(f"- Datetime Already Exists (Not Created): {a_split}") if (self.print_debug == True) else False
+        start_ts = to_epoch(start_datetime)
+        end_ts = to_epoch(end_datetime)
+        # IntervalSet.merge merges with any overlapping/touching datetimes (bisect, O(log n + k))
+        removed, added = datetimes_list.merge(start_ts, end_ts)
+        if (added):
+            self._print_self_basic() if (self.print_debug == True) else False
+            print(f"- Datetime Created: {added[0]} (from {start_ts}->{end_ts})") if (self.print_debug == True) else False
         else:
             self._print_self_basic() if (self.print_debug == True) else False
-            print(f"- Datetime Already Exists (Not Created): {a_split}") if (self.print_debug == True) else False
-        self._sort_datetimes(datetimes_list)
+            print(f"- Datetime Already Exists (Not Created): {start_ts}->{end_ts}") if (self.print_debug == True) else False
+        return removed, added
         
     def _remove_datetime(self, datetimes_list, start_datetime, end_datetime):
         print(f"------ _remove_datetime() ------") if (self.print_debug == True) else False
-        start_datetime_utc = start_datetime.astimezone(ZoneInfo("UTC"))
-        end_datetime_utc = end_datetime.astimezone(ZoneInfo("UTC"))
-        datetime_to_remove = []
-        datetime_to_add = []
-        for id_old, start_datetime_utc_old_str, end_datetime_utc_old_str in datetimes_list:
-            start_datetime_utc_old = datetime.fromisoformat(start_datetime_utc_old_str)
-            end_datetime_utc_old = datetime.fromisoformat(end_datetime_utc_old_str)
-            if (start_datetime_utc == start_datetime_utc_old) and (end_datetime_utc == end_datetime_utc_old):
-                datetime_to_remove.append([start_datetime_utc_old_str, end_datetime_utc_old_str])
-                self._print_self_basic() if (self.print_debug == True) else False
-                print(f"- Datetime Removing (Direct Match): {start_datetime_utc} -> {end_datetime_utc}") if (self.print_debug == True) else False
-            elif (start_datetime_utc <= start_datetime_utc_old) and (end_datetime_utc >= end_datetime_utc_old): # New is engulfing old
-                datetime_to_remove.append([start_datetime_utc_old_str, end_datetime_utc_old_str])
-                self._print_self_basic() if (self.print_debug == True) else False
-                print(f"- Datetime Removing (Engulfing Match): {start_datetime_utc_old} -> {end_datetime_utc_old}") if (self.print_debug == True) else False
-            elif (start_datetime_utc_old <= start_datetime_utc <= end_datetime_utc_old) or (start_datetime_utc_old <= end_datetime_utc <= end_datetime_utc_old):
-                if (start_datetime_utc <= start_datetime_utc_old) and (end_datetime_utc <= end_datetime_utc_old): # New overlaps before old
-                    datetime_to_remove.append([start_datetime_utc_old_str, end_datetime_utc_old_str])
-                    self._print_self_basic() if (self.print_debug == True) else False
-                    print(f"- Datetime Removing (Removal In/Before Match): {start_datetime_utc}->{end_datetime_utc}") if (self.print_debug == True) else False
-                    datetime_to_add.append([end_datetime_utc, end_datetime_utc_old])
-                    print(f"- Datetime Re-Add (Split After Match): {end_datetime_utc}->{end_datetime_utc_old}") if (self.print_debug == True) else False
-                elif (start_datetime_utc >= start_datetime_utc_old) and (end_datetime_utc >= end_datetime_utc_old): # New overlaps after old
-                    datetime_to_remove.append([start_datetime_utc_old_str, end_datetime_utc_old_str])
-                    self._print_self_basic() if (self.print_debug == True) else False
-                    print(f"- Datetime Removing (Removal In/After Match): {start_datetime_utc}->{end_datetime_utc}") if (self.print_debug == True) else False
-                    datetime_to_add.append([start_datetime_utc_old, start_datetime_utc])
-                    print(f"- Datetime Re-Add (Split Before Match): {start_datetime_utc_old}->{start_datetime_utc}") if (self.print_debug == True) else False
-                elif (start_datetime_utc >= start_datetime_utc_old) and (end_datetime_utc <= end_datetime_utc_old): # New is within old
-                    datetime_to_remove.append([start_datetime_utc_old_str, end_datetime_utc_old_str])
-                    self._print_self_basic() if (self.print_debug == True) else False
-                    print(f"- Datetimes Removing (Removal In Match - Splitting): {start_datetime_utc}->{end_datetime_utc}") if (self.print_debug == True) else False
-                    datetime_to_add.append([start_datetime_utc_old, start_datetime_utc])
-                    print(f"- Datetime Re-Add (Split Before Match): {start_datetime_utc_old}->{start_datetime_utc}") if (self.print_debug == True) else False
-                    datetime_to_add.append([end_datetime_utc, end_datetime_utc_old])
-                    print(f"- Datetime Re-Add (Split After Match): {end_datetime_utc}->{end_datetime_utc_old}") if (self.print_debug == True) else False
-        # Remove from in-memory list
-        for atr_start_time_str, atr_end_time_str in datetime_to_remove:
-            ltr = [self.id, atr_start_time_str, atr_end_time_str]
-            if ltr in datetimes_list:
-                datetimes_list.remove(ltr)
-        # Re-add split segments
-        for ata_start_time, ata_end_time in datetime_to_add:
-            self._create_datetime(datetimes_list, ata_start_time, ata_end_time)
-        self._sort_datetimes(datetimes_list)
+        return self._remove_datetimes(datetimes_list, [(start_datetime, end_datetime)])
+
+    def _remove_datetimes(self, datetimes_list, ranges):
+        print(f"------ _remove_datetimes() ------") if (self.print_debug == True) else False
+        ranges = [(to_epoch(start_datetime), to_epoch(end_datetime)) for start_datetime, end_datetime in ranges]
+        # Single pass: overlapped datetimes are replaced by their remaining fragments (split before/after the removal)
+        removed, added = datetimes_list.remove_many(ranges)
+        self._print_self_basic() if (self.print_debug == True) and (removed) else False
+        [print(f"- Datetime Removing: {x.start_ts}->{x.end_ts}") for x in removed] if (self.print_debug == True) else False
+        [print(f"- Datetime Re-Add (Split Fragment): {x.start_ts}->{x.end_ts}") for x in added] if (self.print_debug == True) else False
+        return removed, added
+
+    def _find_row_id(self, table, id_column, start_ts, end_ts):
+        """Lowest id_column of the table row with these times (ad-hoc slots created without a known row), or None."""
+        row = database.fetch_one(f"SELECT MIN({id_column}) FROM {table} WHERE start_ts=? AND end_ts=?", (start_ts, end_ts))
+        return row[0] if row else None
+
+    def _covered_rows(self, rows, datetimes_list):
+        """The {row_id: (start_ts, end_ts)} of rows still fully inside datetimes_list (rows cut by a removal drop out)."""
+        return {row_id: (start_ts, end_ts) for row_id, (start_ts, end_ts) in rows.items()
+                if any((x.start_ts <= start_ts) and (end_ts <= x.end_ts) for x in datetimes_list.overlapping(start_ts, end_ts))}
     
     ### Operation-Specific Functions (For End-User Use) ###
     def print_availability(self):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ print_availability() ------") if (self.print_debug == True) else False
         self._print_self_basic()
         print(f"Availability [{len(self.availability)}] (Timezone: {self.timezone}): ")
         if self.availability:
             for x in self.availability:
-                start_datetime = datetime.strptime(x[1], FMT).astimezone(self.timezone)
-                end_datetime = datetime.strptime(x[2], FMT).astimezone(self.timezone)
+                start_datetime = from_epoch(x[1], self.timezone)
+                end_datetime = from_epoch(x[2], self.timezone)
                 print(f"- {start_datetime} -> {end_datetime}")
         else:
             print("- (none)")
@@ -222,15 +278,31 @@ class Person():
         - Overlaps are resolved (new slot merges with any overlapping existing slots).
         """
         print(f"------ create_availability() ------") if (self.print_debug == True) else False
-        self._create_datetime(self.availability, start_datetime, end_datetime)
-        self._sync_availability_to_db()
-    def _sync_availability_to_db(self):
-        """Dual-write: replaces all DB availability rows for this user with current in-memory state."""
-        database.execute("DELETE FROM user_availabilities WHERE user_id=?", (int(self.id),))
-        for row in self.availability:
-            database.execute(
-                "INSERT INTO user_availabilities (user_id, start_utc, end_utc) VALUES (?,?,?)",
-                (int(self.id), row[1], row[2])
+        removed, added = self._create_datetime(self.availability, start_datetime, end_datetime)
+        self._free_add(to_epoch(start_datetime), to_epoch(end_datetime))
+        self._sync_availability_to_db(removed, added)
+    def _sync_availability_to_db(self, removed=None, added=None):
+        """
+        Dual-write, incremental: deletes the DB rows of the removed intervals and inserts the added ones
+        (the (removed, added) of _create_datetime / _remove_datetimes), so the write is the size of the edit.
+        Without a delta (removed=None) all of this user's rows are replaced (e.g. after assigning availability).
+        """
+        self._write_delta("availability", removed, added)
+    def _write_availability(self, removed, added):
+        if (removed is None):
+            database.execute("DELETE FROM user_availabilities WHERE user_id=?", (self.id,))
+            added = self.availability
+        elif (removed):
+            # Every row inside a removed interval is part of it (rows are merged the same way on load)
+            database.execute_many(
+                "DELETE FROM user_availabilities WHERE user_id=? AND start_ts >= ? AND start_ts < ? AND end_ts <= ?",
+                [(self.id, row.start_ts, row.end_ts, row.end_ts) for row in removed]
+            )
+        if (added):
+            database.execute_many(
+                "INSERT INTO user_availabilities (user_id, start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?,?)",
+                [(self.id, epoch_to_utc_text(row.start_ts), epoch_to_utc_text(row.end_ts), row.start_ts, row.end_ts)
+                 for row in added]
             )
     def remove_availability(self, start_datetime="", end_datetime="", target_index=None):
         """
@@ -239,47 +311,78 @@ class Person():
         """
         print(f"------ remove_availability() ------") if (self.print_debug == True) else False
         if (target_index is not None):
-            FMT = "%Y-%m-%d %H:%M:%S%z"
             this_datetimes = self.availability[target_index]
-            start_datetime = datetime.strptime(this_datetimes[1], FMT)
-            end_datetime = datetime.strptime(this_datetimes[2], FMT)
-        self._remove_datetime(self.availability, start_datetime, end_datetime)
-        self._sync_availability_to_db()
+            start_datetime = this_datetimes[1]
+            end_datetime = this_datetimes[2]
+        removed, added = self._remove_datetime(self.availability, start_datetime, end_datetime)
+        self._free_remove([(to_epoch(start_datetime), to_epoch(end_datetime))])
+        self._sync_availability_to_db(removed, added)
+    def remove_availability_many(self, ranges):
+        """
+        Remove many availability slots [(start, end), ...] (or Intervals) in one pass and one DB sync.
+        """
+        print(f"------ remove_availability_many() ------") if (self.print_debug == True) else False
+        ranges = [(x[-2], x[-1]) for x in ranges]
+        removed, added = self._remove_datetimes(self.availability, ranges)
+        self._free_remove([(to_epoch(start_datetime), to_epoch(end_datetime)) for start_datetime, end_datetime in ranges])
+        self._sync_availability_to_db(removed, added)
         
     def print_commitments(self):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ print_commitments() ------") if (self.print_debug == True) else False
         self._print_self_basic()
         print(f"Commitments [{len(self.commitments)}] (Timezone: {self.timezone}): ")
         if self.commitments:
             for x in self.commitments:
-                start_datetime = datetime.strptime(x[1], FMT).astimezone(self.timezone)
-                end_datetime = datetime.strptime(x[2], FMT).astimezone(self.timezone)
+                start_datetime = from_epoch(x[1], self.timezone)
+                end_datetime = from_epoch(x[2], self.timezone)
                 print(f"- {start_datetime} -> {end_datetime}")
         else:
             print("- (none)")
-    def create_commitment(self, start_datetime, end_datetime):
+    def create_commitment(self, start_datetime, end_datetime, commitment_id=None):
         """
         Create commitment slot for this person in memory and DB.
         - Duplicates are not created.
         - Overlaps are resolved (new slot merges with any overlapping existing slots).
+        - commitment_id: the commitments row this slot belongs to; None looks one up by its times (ad-hoc slots).
         """
         print(f"------ create_commitment() ------") if (self.print_debug == True) else False
-        self._create_datetime(self.commitments, start_datetime, end_datetime)
-        self._sync_commitment_to_db()
-    def _sync_commitment_to_db(self):
-        """Dual-write: syncs commitment_participants rows for this user with current in-memory state."""
-        database.execute("DELETE FROM commitment_participants WHERE user_id=?", (int(self.id),))
-        for row in self.commitments:
-            c_row = database.fetch_one(
-                "SELECT commitment_id FROM commitments WHERE start_utc=? AND end_utc=?",
-                (row[1], row[2])
+        start_ts = to_epoch(start_datetime)
+        end_ts = to_epoch(end_datetime)
+        self._create_datetime(self.commitments, start_ts, end_ts)
+        if (commitment_id is None):
+            commitment_id = self._find_row_id("commitments", "commitment_id", start_ts, end_ts)
+        if (commitment_id is not None):
+            self._commitment_rows[commitment_id] = (start_ts, end_ts)
+        self._free_remove([(start_ts, end_ts)])
+        self._sync_commitment_to_db(added=[commitment_id] if (commitment_id is not None) else [])
+    def _sync_commitment_to_db(self, added=None, dropped=()):
+        """
+        Dual-write, incremental: writes only the commitment_participants rows that changed, by commitment_id.
+        added: commitment_ids just recorded; dropped: commitment_ids just let go. Rows a removal cut into drop out too.
+        Without a delta (added=None) all of this user's rows are replaced.
+        """
+        dropped = set(dropped)
+        kept = self._covered_rows({k: v for k, v in self._commitment_rows.items() if (k not in dropped)}, self.commitments)
+        dropped = self._commitment_rows.keys() - kept.keys()
+        self._commitment_rows = kept
+        if (added is None):
+            self._write_delta("commitments", None, None)
+        else:
+            self._write_delta("commitments", dropped, [commitment_id for commitment_id in added if (commitment_id in kept)])
+    def _write_commitments(self, dropped, added):
+        if (dropped is None):
+            database.execute("DELETE FROM commitment_participants WHERE user_id=?", (self.id,))
+            added = self._commitment_rows
+        elif (dropped):
+            database.execute_many(
+                "DELETE FROM commitment_participants WHERE commitment_id=? AND user_id=?",
+                [(commitment_id, self.id) for commitment_id in dropped]
+            )
+        if (added):
+            database.execute_many(
+                "INSERT OR IGNORE INTO commitment_participants (commitment_id, user_id) VALUES (?,?)",
+                [(commitment_id, self.id) for commitment_id in added]
             )
-            if c_row:
-                database.execute(
-                    "INSERT OR IGNORE INTO commitment_participants (commitment_id, user_id) VALUES (?,?)",
-                    (c_row["commitment_id"], int(self.id))
-                )
     def remove_commitment(self, start_datetime="", end_datetime="", target_index=None):
         """
         Remove commitment slot for this person from memory and DB.
@@ -287,47 +390,89 @@ class Person():
         """
         print(f"------ remove_commitment() ------") if (self.print_debug == True) else False
         if (target_index is not None):
-            FMT = "%Y-%m-%d %H:%M:%S%z"
             this_datetimes = self.commitments[target_index]
-            start_datetime = datetime.strptime(this_datetimes[1], FMT)
-            end_datetime = datetime.strptime(this_datetimes[2], FMT)
+            start_datetime = this_datetimes[1]
+            end_datetime = this_datetimes[2]
         self._remove_datetime(self.commitments, start_datetime, end_datetime)
-        self._sync_commitment_to_db()
+        self._free_add(to_epoch(start_datetime), to_epoch(end_datetime))
+        self._sync_commitment_to_db(added=[])
         
     def print_meetings_history(self):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ print_meetings_history() ------") if (self.print_debug == True) else False
         self._print_self_basic()
         print(f"Meetings History [{len(self.meetings_history)}] (Timezone: {self.timezone}): ")
         if self.meetings_history:
             for x in self.meetings_history:
-                start_datetime = datetime.strptime(x[1], FMT).astimezone(self.timezone)
-                end_datetime = datetime.strptime(x[2], FMT).astimezone(self.timezone)
+                start_datetime = from_epoch(x[1], self.timezone)
+                end_datetime = from_epoch(x[2], self.timezone)
                 print(f"- {start_datetime} -> {end_datetime}")
         else:
             print("- (none)")
-    def create_meeting(self, start_datetime, end_datetime):
+    def create_meeting(self, start_datetime, end_datetime, meeting_id=None):
         """
         Create meeting slot for this person in memory and DB.
         - Duplicates are not created.
         - Overlaps are resolved (new slot merges with any overlapping existing slots).
+        - meeting_id: the meetings row this slot belongs to; None looks one up by its times (ad-hoc slots).
         """
         print(f"------ create_meeting() ------") if (self.print_debug == True) else False
-        self._create_datetime(self.meetings_history, start_datetime, end_datetime)
-        self._sync_meeting_to_db()
-    def _sync_meeting_to_db(self):
-        """Dual-write: syncs meeting_participants rows for this user with current in-memory state."""
-        database.execute("DELETE FROM meeting_participants WHERE user_id=?", (int(self.id),))
-        for row in self.meetings_history:
-            m_row = database.fetch_one(
-                "SELECT meeting_id FROM meetings WHERE start_utc=? AND end_utc=?",
-                (row[1], row[2])
+        start_ts = to_epoch(start_datetime)
+        end_ts = to_epoch(end_datetime)
+        self._create_datetime(self.meetings_history, start_ts, end_ts)
+        if (meeting_id is None):
+            meeting_id = self._find_row_id("meetings", "meeting_id", start_ts, end_ts)
+        if (meeting_id is not None):
+            self._meeting_rows[meeting_id] = (start_ts, end_ts)
+        self._sync_meeting_to_db(added=[meeting_id] if (meeting_id is not None) else [])
+    def _sync_meeting_to_db(self, added=None):
+        """
+        Dual-write, incremental: writes only the meeting_participants rows that changed, by meeting_id
+        (rows left alone keep their attended flag). added: meeting_ids just recorded; rows a removal cut into
+        are deleted. Without a delta (added=None) all of this user's rows are replaced.
+        """
+        meetings_history = self.meetings_history  # loads the history (and _meeting_rows) if not loaded yet
+        kept = self._covered_rows(self._meeting_rows, meetings_history)
+        dropped = self._meeting_rows.keys() - kept.keys()
+        self._meeting_rows = kept
+        if (added is None):
+            self._write_delta("meetings", None, None)
+        else:
+            self._write_delta("meetings", dropped, [meeting_id for meeting_id in added if (meeting_id in kept)])
+    def _write_meetings(self, dropped, added):
+        if (dropped is None):
+            database.execute("DELETE FROM meeting_participants WHERE user_id=?", (self.id,))
+            added = self._meeting_rows
+        elif (dropped):
+            database.execute_many(
+                "DELETE FROM meeting_participants WHERE meeting_id=? AND user_id=?",
+                [(meeting_id, self.id) for meeting_id in dropped]
+            )
+        if (added):
+            database.execute_many(
+                "INSERT OR IGNORE INTO meeting_participants (meeting_id, user_id, attended) VALUES (?,?,1)",
+                [(meeting_id, self.id) for meeting_id in added]
             )
-            if m_row:
-                database.execute(
-                    "INSERT OR IGNORE INTO meeting_participants (meeting_id, user_id, attended) VALUES (?,?,1)",
-                    (m_row["meeting_id"], int(self.id))
-                )
+    def promote_meetings(self, meetings, remove_availability=False, remove_commitment=True):
+        """
+        Batch promotion (Persons._promote_crossedover): meetings are [(meeting_id, commitment_id, Interval), ...].
+        Records each in meetings_history (keyed by meeting_id) and clears it from commitments (dropping
+        commitment_id) and availability, syncing each changed list once.
+        meeting_participants rows are written by the caller for the whole batch.
+        """
+        print(f"------ promote_meetings() [{len(meetings)}] ------") if (self.print_debug == True) else False
+        ranges = [(x.start_ts, x.end_ts) for _, _, x in meetings]
+        for meeting_id, _, (_, start_ts, end_ts) in meetings:
+            self._create_datetime(self.meetings_history, start_ts, end_ts)
+            self._meeting_rows[meeting_id] = (start_ts, end_ts)
+        if (remove_availability):
+            removed, added = self._remove_datetimes(self.availability, ranges)
+            self._free_remove(ranges)
+            self._sync_availability_to_db(removed, added)
+        if (remove_commitment):
+            self._remove_datetimes(self.commitments, ranges)
+            for start_ts, end_ts in ranges:
+                self._free_add(start_ts, end_ts)
+            self._sync_commitment_to_db(added=[], dropped=[commitment_id for _, commitment_id, _ in meetings])
     def remove_meeting(self, start_datetime="", end_datetime="", target_index=None):
         """
         Remove meeting slot for this person from memory and DB.
@@ -335,12 +480,11 @@ class Person():
         """
         print(f"------ remove_meeting() ------") if (self.print_debug == True) else False
         if (target_index is not None):
-            FMT = "%Y-%m-%d %H:%M:%S%z"
             this_datetimes = self.meetings_history[target_index]
-            start_datetime = datetime.strptime(this_datetimes[1], FMT)
-            end_datetime = datetime.strptime(this_datetimes[2], FMT)
+            start_datetime = this_datetimes[1]
+            end_datetime = this_datetimes[2]
         self._remove_datetime(self.meetings_history, start_datetime, end_datetime)
-        self._sync_meeting_to_db()
+        self._sync_meeting_to_db(added=[])
 
     def print_balance_history(self):
         print(f"------ print_balance_history() ------") if (self.print_debug == True) else False
@@ -348,27 +492,87 @@ class Person():
         print(f"Balance: {self.balance}")
         print(f"Balance History [{len(self.balance_history)}]: ")
         if self.balance_history:
-            [print(f"- {x}") for x in self.balance_history]
+            for x in self.balance_history:
+                start_datetime = from_epoch(x.start_ts, self.timezone)
+                end_datetime = from_epoch(x.end_ts, self.timezone)
+                print(f"- {[x.user_id, ids_to_str(x.associate_ids), str(start_datetime), str(end_datetime), x.amount, x.balance_after]}")
         else:
             print("- (none)")
 
-    def create_balance_entry(self, associate_ids_str, start_time_utc, end_time_utc, entry):
+    def create_balance_entry(self, associate_ids, start_time_utc, end_time_utc, entry):
+        """associate_ids: tuple of user ids (or legacy '0&1&2' string) of the meeting this entry bills."""
         print(f"------ create_balance_entry() ------") if (self.print_debug == True) else False
-        # Calculate Balance
-        self.balance = float(self.balance) + float(entry)
-        self._update_person_data()
-        # Build entry
-        a_line = f"{self.id}, {associate_ids_str}, {start_time_utc}, {end_time_utc}, {entry}, {self.balance}\n"
-        a_split = [x.strip() for x in a_line.split(",")]
-        datetimes_only_split = a_split[0:5]  # exclude balance total to avoid duplicate entries
-        balance_history_datetimes_only = [x[0:5] for x in self.balance_history]
-        if (datetimes_only_split not in balance_history_datetimes_only):
-            self.balance_history.append(a_split)
-            database.execute(
-                """INSERT INTO balance_history
-                   (user_id, associate_ids, start_utc, end_utc, amount, balance_after)
-                   VALUES (?,?,?,?,?,?)""",
-                (int(self.id), associate_ids_str, str(start_time_utc), str(end_time_utc),
-                 float(entry), float(self.balance))
+        self.create_balance_entries([(associate_ids, start_time_utc, end_time_utc, entry)])
+
+    def create_balance_entries(self, entries):
+        """
+        Bills [(associate_ids, start, end, entry), ...] in order: one balance increment and one executemany
+        of ledger rows, committed together. An entry already in the ledger (same user, ids, times and amount,
+        checked against _balance_keys in O(1)) still moves the balance but is not recorded twice.
+        """
+        print(f"------ create_balance_entries() [{len(entries)}] ------") if (self.print_debug == True) else False
+        balance_history = self.balance_history  # loads the ledger (and _balance_keys) on first use
+        rows = []
+        for associate_ids, start_time_utc, end_time_utc, entry in entries:
+            associate_ids = ids_from_str(associate_ids) if isinstance(associate_ids, str) else tuple(associate_ids)
+            # Calculate Balance
+            self.balance = self.balance + float(entry)
+            self._balance_unwritten += float(entry)
+            # Build entry
+            start_ts = to_epoch(start_time_utc)
+            end_ts = to_epoch(end_time_utc)
+            a_split = BalanceEntry(self.id, associate_ids, start_ts, end_ts, float(entry), self.balance)
+            if (a_split[0:5] not in self._balance_keys):
+                self._balance_keys.add(a_split[0:5])
+                balance_history.append(a_split)
+                rows.append((self.id, ids_to_str(associate_ids), epoch_to_utc_text(start_ts), epoch_to_utc_text(end_ts),
+                             start_ts, end_ts, a_split.amount, a_split.balance_after))
+        self._write_delta("balance", (), rows)
+        self.print_balance_history() if (self.print_debug == True) else False
+    def _write_balance(self, _, rows):
+        # Only the balance column moves, by the amount billed since the last write (not a whole-row rewrite);
+        # the UNIQUE ledger key (migration 3) makes re-inserting an already recorded entry a no-op.
+        if (self._balance_unwritten):
+            database.execute("UPDATE users SET balance = balance + ? WHERE id=?", (self._balance_unwritten, self.id))
+        if (rows):
+            database.execute_many(
+                """INSERT OR IGNORE INTO balance_history
+                   (user_id, associate_ids, start_utc, end_utc, start_ts, end_ts, amount, balance_after)
+                   VALUES (?,?,?,?,?,?,?,?)""",
+                rows
             )
-        self.print_balance_history() if (self.print_debug == True) else False
\ No newline at end of file
+
+    def _write_delta(self, table, removed, added):
+        """
+        Dual-write of one table's delta through _write_<table>(removed, added) (removed=None: rewrite all of this
+        user's rows). Write-through: written now, in one transaction. Write-behind (write_buffer set): coalesced
+        into _pending (a pending add that is removed again is dropped, removals are kept) until the next flush.
+        """
+        if (self.write_buffer is None):
+            with database.transaction():
+                getattr(self, f"_write_{table}")(removed, added)
+            self._written()
+            return
+        if (self._pending is None):
+            self._pending = {}
+        if (removed is None) or ((table in self._pending) and (self._pending[table] is None)):
+            self._pending[table] = None  # rewritten from the in-memory state at flush time
+        else:
+            pending_removed, pending_added = self._pending.setdefault(table, ({}, {}))  # dicts as ordered sets
+            for x in removed:
+                pending_added.pop(x, None)
+                pending_removed[x] = None
+            for x in added:
+                pending_added[x] = None
+        self.write_buffer.mark(self)
+
+    def _write_pending(self):
+        """Writes the coalesced _pending deltas (WriteBuffer.flush, inside its transaction); removals go first."""
+        for table, delta in (self._pending or {}).items():
+            removed, added = (None, None) if (delta is None) else (list(delta[0]), list(delta[1]))
+            getattr(self, f"_write_{table}")(removed, added)
+
+    def _written(self):
+        """Once a write has committed (write-through, or WriteBuffer.flush): nothing is pending any more."""
+        self._pending = None
+        self._balance_unwritten = 0.0
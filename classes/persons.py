@@ -1,55 +1,86 @@
 
 import difflib
+import functools
+import heapq
+import json
+import threading
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from copy import deepcopy
+from itertools import groupby
+from operator import itemgetter
 
 from classes.person import *
+from classes.interval import Interval, ids_to_str, ids_from_str, as_interval
+from classes.intersections import sweep_intersections, sweep_quorum_intersections, batch_intersections
+from classes.bitmaps import BitmapGrid, BUCKET_SECONDS, HORIZON_DAYS
+from classes.write_buffer import WriteBuffer
+from classes.timestamps import to_epoch, from_epoch, epoch_to_utc_text, format_datetimes
 from db import database
 
+def _locked(method):
+    """Runs a Persons method under self.lock (shared with the background PromotionScheduler)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class Persons():
-    def __init__(self, current_timezone=None):
+    def __init__(self, current_timezone=None, db_profile=None, write_behind_seconds=None):
         """
         Persons creates, stores, and operates on a collection of Person objects.
         Intended to be all-in-one structure containing all person objects, but only loading/writing as needed per operation.
         Methods (high-level summary):
         - search for & store specific persons in working memory to operate on.
         - print/create/infer/save scheduling variables (e.g., availabilities, commitments, meetings)
+        db_profile: optional SQLite performance profile name (see database.PROFILES).
+        write_behind_seconds: None writes every mutation through to the DB before returning (default).
+        Otherwise Person writes are buffered (classes/write_buffer.py) and flushed in one transaction every
+        write_behind_seconds (0: only on flush() / close()); a crash loses at most the edits since the last flush.
         """
         ### Static (or LTM) Variables ###
+        # Guards scheduling state against the background PromotionScheduler (re-entrant: locked methods call each other)
+        self.lock = threading.RLock()
         # Debug Outputs
         self.print_debug = False
         Person.print_debug = self.print_debug
+        # Write-behind buffer (None: write-through)
+        self.write_buffer = WriteBuffer(self.lock, write_behind_seconds).start() if (write_behind_seconds is not None) else None
+        Person.write_buffer = self.write_buffer
         # Initialise database (creates data_pilot/scheduler.db if not present)
-        database.init_db()
+        database.init_db(profile=db_profile)
         ### Global Scheduling Data (all persons, loaded from DB) ###
+        # Rows are keyed by primary key: commitment_ids / meeting_ids map each Interval to its DB row
         _commitment_rows = database.fetch_all(
-            """SELECT GROUP_CONCAT(cp.user_id, '&') AS ids, c.start_utc, c.end_utc
+            """SELECT c.commitment_id, GROUP_CONCAT(cp.user_id, '&') AS ids, c.start_ts, c.end_ts
                FROM commitments c
                JOIN commitment_participants cp ON c.commitment_id = cp.commitment_id
                WHERE NOT EXISTS (
                    SELECT 1 FROM meetings m WHERE m.commitment_id = c.commitment_id
                )
                GROUP BY c.commitment_id
-               ORDER BY c.start_utc"""
+               ORDER BY c.start_ts"""
         )
-        self.commitments = [[r["ids"], r["start_utc"], r["end_utc"]] for r in _commitment_rows]
+        self.commitments = [Interval(ids_from_str(r["ids"]), r["start_ts"], r["end_ts"]) for r in _commitment_rows]
+        self.commitment_ids = {x: r["commitment_id"] for x, r in zip(self.commitments, _commitment_rows)}
         _meetings_history_rows = database.fetch_all(
-            """SELECT GROUP_CONCAT(mp.user_id, '&') AS ids, m.start_utc, m.end_utc
+            """SELECT m.meeting_id, GROUP_CONCAT(mp.user_id, '&') AS ids, m.start_ts, m.end_ts
                FROM meetings m
                JOIN meeting_participants mp ON m.meeting_id = mp.meeting_id
                GROUP BY m.meeting_id
-               ORDER BY m.start_utc"""
+               ORDER BY m.start_ts"""
         )
-        self.meetings_history = [[r["ids"], r["start_utc"], r["end_utc"]] for r in _meetings_history_rows]
+        self.meetings_history = [Interval(ids_from_str(r["ids"]), r["start_ts"], r["end_ts"]) for r in _meetings_history_rows]
+        self.meeting_ids = {x: r["meeting_id"] for x, r in zip(self.meetings_history, _meetings_history_rows)}
         # Import Persons from DB
         _user_rows = database.fetch_all("SELECT * FROM users ORDER BY id")
         persons_lines = [
             [str(r["role"]), str(r["first_name"]), str(r["last_name"]),
-             str(r["id"]), str(r["family_id"]), str(r["date_registered"]),
+             r["id"], r["family_id"], str(r["date_registered"]),
              str(r["date_of_birth"]), str(r["address"] or ""),
              str(r["phone_number"] or ""), str(r["email"] or ""),
-             str(r["rate"]), str(r["balance"]), str(r["timezone"]),
+             r["rate"], r["balance"], str(r["timezone"]),
              str(r["comments"] or "")]
             for r in _user_rows
         ]
@@ -57,6 +88,11 @@ class Persons():
                                    "date_registered", "date_of_birth", "address",
                                    "phone_number", "email", "rate", "balance",
                                    "timezone", "comments"]
+        # Lookup indexes over self.persons (kept in step by _index_person)
+        self.persons_by_id = {}         # id -> Person
+        self.persons_by_email = {}      # email -> Person
+        self.persons_by_phone = {}      # phone_number -> Person
+        self.persons_by_family_id = {}  # family_id -> [Person, ...]
         self.persons_len, self.persons = self._create_persons(
             self.person_attributes, len(persons_lines), persons_lines
         )
@@ -69,6 +105,11 @@ class Persons():
         self.current_datetime = datetime.now(self.current_timezone)
         # Global: active meetings (commitments whose window straddles now — transient, recomputed each update)
         self.active_meetings = []
+        # Promotion queues (see update_commitments_to_meetings): min-heaps of (start_ts, commitment) for
+        # commitments not started yet and (end_ts, commitment) for started ones (= the active meetings)
+        self._commitments_by_start = []
+        self._commitments_by_end = []
+        self._queue_commitments(self.commitments)
         # Admin working memory
         self.search_results = []
         self.selected_persons = []
@@ -77,19 +118,35 @@ class Persons():
     def __str__(self):
         string = f"Persons [{self.persons_len}]: {[x.first_name for x in self.persons]}"
         return string
+
+    @_locked
+    def flush(self):
+        """Write-behind mode: writes every buffered mutation in one transaction. Returns the number of persons flushed."""
+        print(f"------ flush() ------") if (self.print_debug == True) else False
+        return self.write_buffer.flush() if (self.write_buffer is not None) else 0
+
+    def close(self):
+        """Stops the write-behind flush thread (if any) after a final flush; later edits write through."""
+        if (self.write_buffer is not None):
+            self.write_buffer.stop()
+            if (Person.write_buffer is self.write_buffer):
+                Person.write_buffer = None
+            self.write_buffer = None
     
-    def _update_current_datetime(self):
+    def _update_current_datetime(self, quiet=False):
         print(f"------ _update_current_datetime() ------") if (self.print_debug == True) else False
-        prev_datetime = deepcopy(self.current_datetime)
+        prev_datetime = self.current_datetime
         self.current_datetime = datetime.now(self.current_timezone)
-        print(f"- Datetime Updated: {prev_datetime} -> {self.current_datetime}")
+        print(f"- Datetime Updated: {prev_datetime} -> {self.current_datetime}") if (not quiet) else False
         
-    def update(self):
+    @_locked
+    def update(self, quiet=False):
+        """quiet: no progress/global list prints (background PromotionScheduler runs)."""
         print(f"------ update() ------") if (self.print_debug == True) else False
-        self._update_current_datetime()
-        self.update_commitments_to_meetings()
+        self._update_current_datetime(quiet)
+        self.update_commitments_to_meetings(quiet=quiet)
     
-    def _validate_user(self, items, persons):
+    def _validate_user(self, items):
         print(f"------ _validate_user() ------") if (self.print_debug == True) else False
         errors = []
         items = {k: str(v) if v is not None else "" for k, v in items.items()}
@@ -134,15 +191,14 @@ class Persons():
                     errors.append(f"{name} is not a valid date")
         id_str = items.get("id", "")
         family_id_str = items.get("family_id", "")
-        for person in persons:
-            if hasattr(person, "email") and str(person.email) == email:
-                errors.append("A user with this email already exists")
-            if hasattr(person, "phone_number") and str(person.phone_number) == phone_number:
-                errors.append("A user with this phone number already exists")
-            if id_str and hasattr(person, "id") and str(person.id) == id_str:
-                errors.append("This User ID is already taken")
-            if family_id_str and hasattr(person, "family_id") and str(person.family_id) == family_id_str:
-                errors.append("This Family ID is already used")
+        if email in self.persons_by_email:
+            errors.append("A user with this email already exists")
+        if phone_number in self.persons_by_phone:
+            errors.append("A user with this phone number already exists")
+        if id_str.isdigit() and (int(id_str) in self.persons_by_id):
+            errors.append("This User ID is already taken")
+        if family_id_str.isdigit() and (int(family_id_str) in self.persons_by_family_id):
+            errors.append("This Family ID is already used")
         if items.get("timezone", "").strip() == "":
             errors.append("Timezone is missing")
         if errors:
@@ -155,30 +211,121 @@ class Persons():
     def _create_persons(self, persons_header, persons_lines_len, persons_lines):
         print(f"------ create_persons() ------") if (self.print_debug == True) else False
         persons = []
-        for i, s in enumerate(persons_lines):
-            person = Person(s)
+        for i, (schedule, s) in enumerate(zip(self._stream_schedules([x[3] for x in persons_lines]), persons_lines)):
+            person = Person(s, schedule)
             print(f"[{i+1}]: {person}") if (self.print_debug == True) else False
             persons.append(person)
+            self._index_person(person)
         persons_len = len(persons)
         return persons_len, persons
+
+    def _index_person(self, person):
+        self.persons_by_id[person.id] = person
+        if (person.email):
+            self.persons_by_email[person.email] = person
+        if (person.phone_number):
+            self.persons_by_phone[person.phone_number] = person
+        if (person.family_id is not None):
+            self.persons_by_family_id.setdefault(person.family_id, []).append(person)
+
+    def get_persons_by_ids(self, ids):
+        """Persons for the given user ids (in ids order, unknown ids skipped) — O(len(ids)) via persons_by_id."""
+        return [self.persons_by_id[x] for x in dict.fromkeys(ids) if (x in self.persons_by_id)]
+
+    def _stream_schedules(self, user_ids):
+        """
+        Bulk hydration: reads availability and commitments once each, ordered by user_id, and yields one
+        (availability_rows, commitment_rows) tuple per id in user_ids (which must be ascending, as loaded
+        by 'SELECT * FROM users ORDER BY id'). Replaces the per-person queries in Person() — startup is a
+        fixed number of queries regardless of the number of users. History is left to load lazily.
+        """
+        print(f"------ _stream_schedules() ------") if (self.print_debug == True) else False
+        return self._stream_rows_by_user(user_ids, [
+            database.iter_all(
+                "SELECT user_id, start_ts, end_ts FROM user_availabilities ORDER BY user_id, start_ts"
+            ),
+            database.iter_all(
+                """SELECT cp.user_id, c.commitment_id, c.start_ts, c.end_ts
+                   FROM commitment_participants cp
+                   JOIN commitments c ON cp.commitment_id = c.commitment_id
+                   ORDER BY cp.user_id, c.start_ts"""
+            ),
+        ])
+
+    def _stream_rows_by_user(self, user_ids, tables):
+        """
+        Merges row streams that are each ordered by user_id against ascending user_ids;
+        yields one tuple per user holding that user's rows from every table (in order).
+        """
+        groups = [groupby(rows, key=itemgetter("user_id")) for rows in tables]
+        heads = [next(g, (None, None)) for g in groups]  # (user_id, rows) of the next unconsumed group per table
+        for user_id in user_ids:
+            rows_per_table = []
+            for t, g in enumerate(groups):
+                # Skip rows of user_ids not in user_ids (e.g. orphans)
+                while (heads[t][0] is not None) and (heads[t][0] < user_id):
+                    heads[t] = next(g, (None, None))
+                if (heads[t][0] == user_id):
+                    rows_per_table.append(list(heads[t][1]))
+                    heads[t] = next(g, (None, None))
+                else:
+                    rows_per_table.append([])
+            yield tuple(rows_per_table)
+        for rows in tables:
+            rows.close()
+
+    @_locked
+    def prefetch_history(self, persons=None):
+        """
+        Loads meetings_history and balance_history for persons (default: the selected persons) with one
+        query per table, instead of one lazy query per person on first access. Already-loaded persons are skipped.
+        """
+        print(f"------ prefetch_history() ------") if (self.print_debug == True) else False
+        persons = self.selected_persons if (persons is None) else persons
+        pending = sorted({x.id: x for x in persons if not x.history_loaded()}.items())
+        if not pending:
+            return
+        user_ids = [user_id for user_id, _ in pending]
+        user_ids_json = json.dumps(user_ids)
+        streams = self._stream_rows_by_user(user_ids, [
+            database.iter_all(
+                """SELECT mp.user_id, m.meeting_id, m.start_ts, m.end_ts
+                   FROM meeting_participants mp
+                   JOIN meetings m ON mp.meeting_id = m.meeting_id
+                   WHERE mp.user_id IN (SELECT value FROM json_each(?))
+                   ORDER BY mp.user_id, m.start_ts""",
+                (user_ids_json,)
+            ),
+            database.iter_all(
+                """SELECT user_id, associate_ids, start_ts, end_ts, amount, balance_after
+                   FROM balance_history
+                   WHERE user_id IN (SELECT value FROM json_each(?))
+                   ORDER BY user_id, entry_id""",
+                (user_ids_json,)
+            ),
+        ])
+        for (meetings_history_rows, balance_rows), (_, person) in zip(streams, pending):
+            if (person._meetings_history is None):
+                person._set_meetings_history(meetings_history_rows)
+            if (person._balance_history is None):
+                person._set_balance_history(balance_rows)
         
+    @_locked
     def register_person(self, items):
         print(f"------ register_person() ------") if self.print_debug else False
         # Generate User ID
-        ids = [int(x.id) for x in self.persons]
         new_id = 0
-        while new_id in ids:
+        while new_id in self.persons_by_id:
             new_id += 1
         items["id"] = str(new_id)
         # Generate Family ID if not provided
         if not items.get("family_id"):
-            family_ids = [int(x.family_id) for x in self.persons]
             new_family_id = 0
-            while new_family_id in family_ids:
+            while new_family_id in self.persons_by_family_id:
                 new_family_id += 1
             items["family_id"] = str(new_family_id)
         # Validate user information
-        user_is_valid = self._validate_user(items, self.persons)
+        user_is_valid = self._validate_user(items)
         if user_is_valid:
             # Convert dict to ordered list to match Person() __init__
             items_list = [
@@ -200,6 +347,7 @@ class Persons():
             # Create the person object and append to the list
             person = Person(items_list)
             self.persons.append(person)
+            self._index_person(person)
             self.persons_len = len(self.persons)
             database.execute(
                 """INSERT OR IGNORE INTO users
@@ -236,7 +384,7 @@ class Persons():
         matched = []
         role_specific_persons = [x for x in self.persons if (role_key in x.role)] if role_key else self.persons
         for person in role_specific_persons:
-            person_values = [v.lower() for v in vars(person).values() if isinstance(v, str)]
+            person_values = [str(getattr(person, attr)).lower() for attr in self.person_attributes]
             word_scores = []
             for word in search_words:
                 best_word_ratio = max(difflib.SequenceMatcher(None, word, val).ratio() for val in person_values)
@@ -279,7 +427,7 @@ class Persons():
             matched_attr_head = self.search_for_attr(search_attr)
             if (matched_attr_head):
                 for person in role_specific_persons:
-                    person_values = [v.lower() for x,v in vars(person).items() if (x == matched_attr_head)]
+                    person_values = [str(getattr(person, matched_attr_head)).lower()]
                     match_attr = difflib.get_close_matches(search_str.lower(), person_values, n=1, cutoff=search_accuracy)
                     if (match_attr):
                         best_ratio = max(difflib.SequenceMatcher(None, search_str.lower(), val).ratio() for val in person_values)
@@ -294,28 +442,32 @@ class Persons():
                 self.search_results = matched
         return matched
     
+    @_locked
     def print_global_active_meetings(self):
         print(f"------ print_global_active_meetings() ------") if (self.print_debug == True) else False
         print(f"Global Active Meetings: [{len(self.active_meetings)}]: ")
         if self.active_meetings:
-            [print(f"- {x}") for x in self.active_meetings]
+            [print(f"- {format_datetimes(x, self.current_timezone)}") for x in self.active_meetings]
         else:
             print("- (none)")
+    @_locked
     def get_active_meetings_for(self, person):
         """Returns active meetings relevant to this person (filtered from global active_meetings)."""
-        return [m for m in self.active_meetings if person.id in m[0].split("&")]
+        return [m for m in self.active_meetings if person.id in m.ids]
+    @_locked
     def print_global_commitments(self):
         print(f"------ print_global_commitments() ------") if (self.print_debug == True) else False
         print(f"Global Commitments [{len(self.commitments)}]: ")
         if self.commitments:
-            [print(f"- {x}") for x in self.commitments]
+            [print(f"- {format_datetimes(x, self.current_timezone)}") for x in self.commitments]
         else:
             print("- (none)")
+    @_locked
     def print_global_meetings_history(self):
         print(f"------ print_global_meetings_history() ------") if (self.print_debug == True) else False
         print(f"Global Meetings History [{len(self.meetings_history)}]: ")
         if self.meetings_history:
-            [print(f"- {x}") for x in self.meetings_history]
+            [print(f"- {format_datetimes(x, self.current_timezone)}") for x in self.meetings_history]
         else:
             print("- (none)")
         
@@ -338,70 +490,73 @@ class Persons():
         
     def append_selected_intersection(self, intersection):
         print(f"------ append_selected_intersection() ------") if (self.print_debug == True) else False
-        self.selected_intersections.append(intersection)
+        self.selected_intersections.append(as_interval(intersection))
         
     def print_availability(self, person):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ print_availability() for '{person}' ------") if (self.print_debug == True) else False
         print(person)
         print(f"Availability [{len(person.availability)}] (Timezone: {self.current_timezone}): ")
         if person.availability:
             for x in person.availability:
-                start_datetime = datetime.strptime(x[1], FMT).astimezone(self.current_timezone)
-                end_datetime = datetime.strptime(x[2], FMT).astimezone(self.current_timezone)
+                start_datetime = from_epoch(x[1], self.current_timezone)
+                end_datetime = from_epoch(x[2], self.current_timezone)
                 print(f"- {start_datetime} -> {end_datetime}")
         else:
             print("- (none)")
+    @_locked
     def create_availability(self, person, start_datetime, end_datetime):
         print(f"------ create_availability() for '{person}' ------") if (self.print_debug == True) else False
         person.create_availability(start_datetime, end_datetime)
     def get_availability(self, person):
         print(f"------ get_availability() for '{person}' ------") if (self.print_debug == True) else False
         return person.availability
+    @_locked
     def remove_availability(self, person, start_datetime="", end_datetime="", target_index=None):
         print(f"------ remove_availability() for '{person}' ------") if (self.print_debug == True) else False
         person.remove_availability(start_datetime, end_datetime, target_index)
     
     def print_commitments(self, person):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ print_commitments() for '{person}' ------") if (self.print_debug == True) else False
         print(person)
         print(f"Commitments [{len(person.commitments)}] (Timezone: {self.current_timezone}): ")
         if person.commitments:
             for x in person.commitments:
-                start_datetime = datetime.strptime(x[1], FMT).astimezone(self.current_timezone)
-                end_datetime = datetime.strptime(x[2], FMT).astimezone(self.current_timezone)
+                start_datetime = from_epoch(x[1], self.current_timezone)
+                end_datetime = from_epoch(x[2], self.current_timezone)
                 print(f"- {start_datetime} -> {end_datetime}")
         else:
             print("- (none)")
+    @_locked
     def create_commitment(self, person, start_datetime, end_datetime):
         print(f"------ create_commitment() for '{person}' ------") if (self.print_debug == True) else False
         person.create_commitment(start_datetime, end_datetime)
     def get_commitments(self, person):
         print(f"------ get_commitments() for '{person}' ------") if (self.print_debug == True) else False
         return person.commitments
+    @_locked
     def remove_commitment(self, person, start_datetime="", end_datetime="", target_index=None):
         print(f"------ remove_commitment() for '{person}' ------") if (self.print_debug == True) else False
         person.remove_commitment(start_datetime, end_datetime, target_index)
     
     def print_meetings_history(self, person):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ print_meetings_history() for '{person}' ------") if (self.print_debug == True) else False
         print(person)
         print(f"Meetings History [{len(person.meetings_history)}] (Timezone: {self.current_timezone}): ")
         if person.meetings_history:
             for x in person.meetings_history:
-                start_datetime = datetime.strptime(x[1], FMT).astimezone(self.current_timezone)
-                end_datetime = datetime.strptime(x[2], FMT).astimezone(self.current_timezone)
+                start_datetime = from_epoch(x[1], self.current_timezone)
+                end_datetime = from_epoch(x[2], self.current_timezone)
                 print(f"- {start_datetime} -> {end_datetime}")
         else:
             print("- (none)")
+    @_locked
     def create_meeting(self, person, start_datetime, end_datetime):
         print(f"------ create_meeting() for '{person}' ------") if (self.print_debug == True) else False
         person.create_meeting(start_datetime, end_datetime)
     def get_meetings_history(self, person):
         print(f"------ get_meetings_history() for '{person}' ------") if (self.print_debug == True) else False
         return person.meetings_history
+    @_locked
     def remove_meeting(self, person, start_datetime="", end_datetime="", target_index=None):
         print(f"------ remove_meeting() for '{person}' ------") if (self.print_debug == True) else False
         person.remove_meeting(start_datetime, end_datetime, target_index)
@@ -409,8 +564,8 @@ class Persons():
         print(f"------ print_balance_history() for '{person}' ------") if (self.print_debug == True) else False
         person.print_balance_history()
 
+    @_locked
     def get_intersecting_availability(self, target_persons=[]):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ get_intersecting_availability() ------") if (self.print_debug == True) else False
         if (not target_persons):
             target_persons = self.selected_persons
@@ -419,255 +574,284 @@ class Persons():
         intersections = []
         if (target_persons_len > 1):
             for i, person in enumerate(target_persons):
-                availability = person.availability
+                availability = person.free  # availability minus commitments: booked time is never proposed
                 availabilities.append(availability)
-                print(f"Availability {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
-            intersections = availabilities[0]
-            for next_availability in availabilities[1:]:
-                this_intersections = []
-                for cid, c_start, c_end in intersections:
-                    c_start_dt = datetime.strptime(c_start, FMT)
-                    c_end_dt = datetime.strptime(c_end, FMT)
-                    for nid, n_start, n_end in next_availability:
-                        n_start_dt = datetime.strptime(n_start, FMT)
-                        n_end_dt = datetime.strptime(n_end, FMT)
-                        start = max(c_start_dt, n_start_dt)
-                        end = min(c_end_dt, n_end_dt)
-                        if start < end:
-                            this_intersections.append([f"{cid}&{nid}", start.isoformat(sep=" "), end.isoformat(sep=" ")])
-                # Move forward with the new this_intersections
-                intersections = this_intersections
-                # Early exit if nothing overlaps anymore
-                if not intersections:
-                    break
+                print(f"Free Time {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
+            # k-way sweep over the sorted free-time sets: O(total slots · log k)
+            intersections = sweep_intersections(availabilities)
             print(f"Availability Intersections [{len(intersections)}]: {intersections}") if (self.print_debug == True) else False
             self.selected_intersections = []
         return intersections
         
+    @_locked
+    def get_intersecting_availability_batch(self, groups):
+        """
+        get_intersecting_availability for many candidate groups (lists of Persons) in one call, e.g. every
+        teacher against a roster. Returns one intersection list per group, in order ([] for groups of fewer
+        than 2). Every involved person's free time (person.free) is loaded once (NumPy arrays when installed).
+        Does not touch selected_persons / selected_intersections.
+        """
+        print(f"------ get_intersecting_availability_batch() [{len(groups)} groups] ------") if (self.print_debug == True) else False
+        groups = [[x.free for x in group] for group in groups]
+        results = iter(batch_intersections([x for x in groups if (len(x) > 1)]))
+        return [next(results) if (len(x) > 1) else [] for x in groups]
+
+    @_locked
+    def get_quorum_availability(self, quorum, target_persons=[]):
+        """
+        Windows where at least quorum of target_persons (default: selected persons) are available,
+        as Interval(free_ids, start_ts, end_ts) annotated with who is free — one sweep over their free time
+        (person.free: availability minus commitments).
+        Each item can be appended as a selected intersection (a commitment for the free participants).
+        """
+        print(f"------ get_quorum_availability() (at least {quorum}) ------") if (self.print_debug == True) else False
+        if (not target_persons):
+            target_persons = self.selected_persons
+        intersections = sweep_quorum_intersections([x.free for x in target_persons], quorum)
+        print(f"Quorum Intersections [{len(intersections)}]: {intersections}") if (self.print_debug == True) else False
+        self.selected_intersections = []
+        return intersections
+        
+    def get_bitmap_grid(self, horizon_days=HORIZON_DAYS, granularity=BUCKET_SECONDS):
+        """BitmapGrid of granularity-second buckets from the start of today (UTC) over horizon_days."""
+        return BitmapGrid.for_horizon(to_epoch(self.current_datetime), horizon_days, granularity)
+
+    @_locked
+    def get_bitmap_availability(self, quorum=None, target_persons=[], grid=None):
+        """
+        Bitmap engine for large groups: free time (availability minus commitments) of each target person
+        (default: selected persons) as a cached per-person bitset on grid (default: get_bitmap_grid()).
+        quorum=None returns the windows where everyone is free (like get_intersecting_availability);
+        a quorum returns windows where at least quorum persons are free, annotated like get_quorum_availability.
+        Windows are whole buckets (15 min by default).
+        """
+        print(f"------ get_bitmap_availability() (quorum: {quorum}) ------") if (self.print_debug == True) else False
+        if (not target_persons):
+            target_persons = self.selected_persons
+        if (grid is None):
+            grid = self.get_bitmap_grid()
+        bitmaps = [x.free_bitmap(grid) for x in target_persons]
+        if (quorum is None):
+            ids = tuple(x.id for x in target_persons)
+            intersections = grid.windows(grid.intersect(bitmaps), ids) if (len(target_persons) > 1) else []
+        else:
+            intersections = grid.quorum_windows(bitmaps, [(x.id,) for x in target_persons], quorum)
+        print(f"Bitmap Intersections [{len(intersections)}]: {intersections}") if (self.print_debug == True) else False
+        self.selected_intersections = []
+        return intersections
+
     def _process_write_datetimes(self, source_datetimes_list, target_datetimes_working_memory, sort_working_memory=True):
+        """Appends the datetimes not already present; returns the ones created."""
         print(f"------ _process_write_datetimes() ------") if (self.print_debug == True) else False
+        created = []
         for i, this_datetime in enumerate(source_datetimes_list):
             print(f"Datetime {i+1}/{len(source_datetimes_list)}: {this_datetime}") if (self.print_debug == True) else False
             if (this_datetime not in target_datetimes_working_memory):
                 target_datetimes_working_memory.append(this_datetime)
+                created.append(this_datetime)
                 print(f"- Datetime Created: {this_datetime}") if (self.print_debug == True) else False
             else:
                 print(f"- Datetime Already Exists (Not Created): {this_datetime}") if (self.print_debug == True) else False
         if (sort_working_memory):
             self._sort_datetimes_by_start_datetime(target_datetimes_working_memory)
+        return created
+
+    def _queue_commitments(self, commitments):
+        """Schedules commitments for promotion (update_commitments_to_meetings pops them as they start / end)."""
+        for commitment in commitments:
+            heapq.heappush(self._commitments_by_start, (commitment.start_ts, commitment))
         
+    @_locked
     def create_intersecting_commitments(self, remove_availability=False):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
         print(f"------ create_intersecting_commitments() ------") if (self.print_debug == True) else False
         # Create Global Commitments
-        self._process_write_datetimes(self.selected_intersections, self.commitments)
-        # Sync new commitments to DB (dual-write)
-        for intersection in self.selected_intersections:
-            ids_str, start_utc, end_utc = intersection[0], intersection[1], intersection[2]
-            if not database.fetch_one(
-                "SELECT commitment_id FROM commitments WHERE start_utc=? AND end_utc=?",
-                (start_utc, end_utc)
-            ):
-                commitment_id = database.insert(
-                    "INSERT INTO commitments (start_utc, end_utc) VALUES (?,?)",
-                    (start_utc, end_utc)
-                )
-                for uid in ids_str.split("&"):
-                    database.execute(
-                        "INSERT OR IGNORE INTO commitment_participants (commitment_id, user_id) VALUES (?,?)",
-                        (commitment_id, int(uid.strip()))
-                    )
-        
-        # Create Person-Wise Commitments
+        self._queue_commitments(self._process_write_datetimes(self.selected_intersections, self.commitments))
+
+        # Each commitment (global row + participants + person-wise rows) is one transaction
         intersections_len = len(self.selected_intersections)
         for i, intersection in enumerate(self.selected_intersections):
-            print(f"Intersection {i+1}/{intersections_len}: {intersection}") if (self.print_debug == True) else False
-            id_index = 0
-            datetime_start_index = 1
-            datetime_end_index = 2
-            
-            intersection_ids = [x for x in intersection[id_index].split("&")]
-            intersection_ids_len = len(intersection_ids)
-            
-            datetime_start_utc = datetime.strptime(intersection[datetime_start_index], FMT)
-            datetime_end_utc = datetime.strptime(intersection[datetime_end_index], FMT)
-            
-            # Obtain only relevant target persons
-            target_persons = [x for x in self.persons if (x.id in intersection_ids)]
-            target_persons_len = len(target_persons)
-            
-            # Create Commitment at Person Object level
-            for i, person in enumerate(target_persons):
-                # Redundant Check/Query for Matching ID
-                print(f"- Matching ID ({person.id} in {intersection_ids})?: {person.id in intersection_ids}") if (self.print_debug == True) else False
-                
-                availability = deepcopy(person.availability)
-                commitments = deepcopy(person.commitments)
-                
-                person.create_commitment(datetime_start_utc, datetime_end_utc)
-                
-                if (remove_availability):
-                    person.remove_availability(datetime_start_utc, datetime_end_utc)
-                
-                print(f"------ (return to) create_intersecting_commitments() ------") if (self.print_debug == True) else False
-                print(f"- Availability (Before) {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
-                print(f"- Commitments (Before) {i+1}/{target_persons_len} [{len(commitments)}]: {commitments}") if (self.print_debug == True) else False
-                
-                availability = person.availability
-                commitments = person.commitments
-                
-                print(f"- Availability (After) {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
-                print(f"- Commitments (After) {i+1}/{target_persons_len} [{len(commitments)}]: {commitments}") if (self.print_debug == True) else False
-        
+            with database.transaction():
+                self._create_intersecting_commitment(i, intersections_len, intersection)
+
+        # Booked windows leave each participant's availability in one pass (one sync per person)
+        if (remove_availability):
+            booked = {}  # person.id -> (person, [intersection, ...])
+            for intersection in self.selected_intersections:
+                for person in self.get_persons_by_ids(intersection.ids):
+                    booked.setdefault(person.id, (person, []))[1].append(intersection)
+            with database.transaction():
+                for person, windows in booked.values():
+                    person.remove_availability_many(windows)
+
         self.print_global_commitments()
         return
-        
-    def _create_balance_entries(self, meeting):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
-        print(f"------ _create_balance_entries() ------") if (self.print_debug == True) else False
-        print(f"Meeting: {meeting}") if (self.print_debug == True) else False
+
+    def _create_intersecting_commitment(self, i, intersections_len, intersection):
+        # Sync new commitment to DB (dual-write); an identical group + slot already committed reuses its row
+        ids, start_ts, end_ts = intersection
+        commitment_id = self.commitment_ids.get(intersection)
+        if (commitment_id is None):
+            commitment_id = database.insert(
+                "INSERT INTO commitments (start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?)",
+                (epoch_to_utc_text(start_ts), epoch_to_utc_text(end_ts), start_ts, end_ts)
+            )
+            for uid in ids:
+                database.execute(
+                    "INSERT OR IGNORE INTO commitment_participants (commitment_id, user_id) VALUES (?,?)",
+                    (commitment_id, uid)
+                )
+            self.commitment_ids[intersection] = commitment_id
+
+        # Create Person-Wise Commitments
+        print(f"Intersection {i+1}/{intersections_len}: {intersection}") if (self.print_debug == True) else False
         id_index = 0
         datetime_start_index = 1
         datetime_end_index = 2
         
-        meeting_ids_str = meeting[id_index]
-        meeting_ids = [x for x in meeting[id_index].split("&")]
-        meeting_ids_len = len(meeting_ids)
+        intersection_ids = intersection[id_index]
+        intersection_ids_len = len(intersection_ids)
         
-        start_time_utc = meeting[datetime_start_index]
-        end_time_utc = meeting[datetime_end_index]
+        datetime_start_utc = intersection[datetime_start_index]
+        datetime_end_utc = intersection[datetime_end_index]
         
         # Obtain only relevant target persons
-        target_persons = [x for x in self.persons if (x.id in meeting_ids)]
+        target_persons = self.get_persons_by_ids(intersection_ids)
         target_persons_len = len(target_persons)
+        
+        # Create Commitment at Person Object level
+        for i, person in enumerate(target_persons):
+            # Redundant Check/Query for Matching ID
+            print(f"- Matching ID ({person.id} in {intersection_ids})?: {person.id in intersection_ids}") if (self.print_debug == True) else False
+            
+            availability = deepcopy(person.availability)
+            commitments = deepcopy(person.commitments)
             
-        for i, target_person in enumerate(target_persons):
-            entry = float(target_person.rate)
-            for em in self.global_balance_entry_modifiers:
-                entry *= float(em)
-            target_person.create_balance_entry(meeting_ids_str, start_time_utc, end_time_utc, entry)
+            person.create_commitment(datetime_start_utc, datetime_end_utc, commitment_id)
+            
+            print(f"------ (return to) create_intersecting_commitments() ------") if (self.print_debug == True) else False
+            print(f"- Availability (Before) {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
+            print(f"- Commitments (Before) {i+1}/{target_persons_len} [{len(commitments)}]: {commitments}") if (self.print_debug == True) else False
+            
+            availability = person.availability
+            commitments = person.commitments
+            
+            print(f"- Availability (After) {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
+            print(f"- Commitments (After) {i+1}/{target_persons_len} [{len(commitments)}]: {commitments}") if (self.print_debug == True) else False
         
-    def _postprocess_meeting(self, meeting):
-        print(f"------ _postprocess_meeting() ------") if (self.print_debug == True) else False
-        self._create_balance_entries(meeting)
-    
-    def update_commitments_to_meetings(self, remove_availability=False, remove_commitment=True):
-        FMT = "%Y-%m-%d %H:%M:%S%z"
+    def _balance_entry_amount(self, person):
+        """Amount billed to person for one meeting: their rate times every global modifier."""
+        entry = person.rate
+        for em in self.global_balance_entry_modifiers:
+            entry *= float(em)
+        return entry
+        
+    @_locked
+    def update_commitments_to_meetings(self, remove_availability=False, remove_commitment=True, quiet=False):
+        """
+        Moves commitments that have started into active_meetings and promotes the ones that have ended to meetings.
+        Only the commitments whose start / end time has passed since the last call are popped off the
+        promotion heaps, so an update with nothing due costs O(1) however many commitments are pending.
+        quiet: skip the global list prints (background PromotionScheduler runs).
+        """
         print(f"------ update_commitments_to_meetings() ------") if (self.print_debug == True) else False
         
         ### Gather evidence whether the meeting occurred; who attended, etc.
         # By Datetime Crossover Current Datetime
-        active_meetings = [] # Currently in session
-        crossedover = [] # Simply the current datetime has crossed over commmitment start time
-        commitments_len = len(self.commitments)
-        for i, commitment in enumerate(self.commitments):
-            print(f"Commitment {i+1}/{commitments_len}: {commitment}") if (self.print_debug == True) else False
-            id_index = 0
-            datetime_start_index = 1
-            datetime_end_index = 2
-            
-            intersection_ids = [x for x in commitment[id_index].split("&")]
-            intersection_ids_len = len(intersection_ids)
-            
-            datetime_start_utc = datetime.strptime(commitment[datetime_start_index], FMT)
-            datetime_end_utc = datetime.strptime(commitment[datetime_end_index], FMT)
-            
-            if (datetime_start_utc <= self.current_datetime <= datetime_end_utc):
-                active_meetings.append(deepcopy(commitment))
-            if (datetime_start_utc <= self.current_datetime) and (datetime_end_utc < self.current_datetime):
-                crossedover.append(deepcopy(commitment))
+        current_ts = to_epoch(self.current_datetime)
+        started = [] # Current datetime has crossed over commitment start time (now in session)
+        while (self._commitments_by_start) and (self._commitments_by_start[0][0] <= current_ts):
+            commitment = heapq.heappop(self._commitments_by_start)[1]
+            heapq.heappush(self._commitments_by_end, (commitment.end_ts, commitment))
+            started.append(commitment)
+        crossedover = [] # Current datetime has crossed over commitment end time
+        while (self._commitments_by_end) and (self._commitments_by_end[0][0] < current_ts):
+            crossedover.append(heapq.heappop(self._commitments_by_end)[1])
+        if (not started) and (not crossedover):
+            return
         
-        active_meetings_len = len(active_meetings)
-        print(f"Meetings Detected Active [{active_meetings_len}]: ") if (self.print_debug == True) else False
-        [print(x) for x in active_meetings] if (self.print_debug == True) else False
+        print(f"Meetings Detected Started [{len(started)}]: ") if (self.print_debug == True) else False
+        [print(x) for x in started] if (self.print_debug == True) else False
         crossedover_len = len(crossedover)
         print(f"Meetings Detected Crossed-Over [{crossedover_len}]: ") if (self.print_debug == True) else False
         [print(x) for x in crossedover] if (self.print_debug == True) else False
         
-        ### Process Active Meetings (clear stale entries, then write fresh)
-        self.active_meetings.clear()
-        self._process_write_datetimes(active_meetings, self.active_meetings)
+        ### Process Active Meetings (the started, not yet ended commitments)
+        self.active_meetings[:] = sorted((x[1] for x in self._commitments_by_end), key=lambda d: d[1])
         
         ### Process Crossed Over (Filter Out Identicals)
         self._process_write_datetimes(crossedover, self.meetings_history)
+        ### Promote Crossed Over (whole batch commits as one transaction)
+        if (crossedover):
+            with database.transaction():
+                self._promote_crossedover(crossedover, remove_availability, remove_commitment)
+                self.flush()  # write-behind: promotion and billing commit together, never left in the buffer
+        
+        if (not quiet):
+            self.print_global_commitments()
+            self.print_global_meetings_history()
+        return
+
+    def _promote_crossedover(self, crossedover, remove_availability=False, remove_commitment=True):
+        """
+        Promotes a whole batch of crossed-over commitments (the caller holds one transaction):
+        - every commitment is addressed by its commitment_id (commitment_ids); its meeting row is
+          inserted with executemany and found again through meetings.commitment_id,
+        - participant rows are written with executemany,
+        - each participant's schedule is updated and synced once (Person.promote_meetings),
+          and billed once (Person.create_balance_entries).
+        """
+        print(f"------ _promote_crossedover() [{len(crossedover)}] ------") if (self.print_debug == True) else False
         # Sync crossed-over meetings to DB (dual-write)
         # attended=1 for all participants: consistent with current behaviour where
         # time-crossover is the sole evidence of the meeting having occurred.
-        for crossover in crossedover:
-            ids_str, start_utc, end_utc = crossover[0], crossover[1], crossover[2]
-            if not database.fetch_one(
-                "SELECT meeting_id FROM meetings WHERE start_utc=? AND end_utc=?",
-                (start_utc, end_utc)
-            ):
-                commitment_row = database.fetch_one(
-                    "SELECT commitment_id FROM commitments WHERE start_utc=? AND end_utc=?",
-                    (start_utc, end_utc)
-                )
-                commitment_id = commitment_row["commitment_id"] if commitment_row else None
-                meeting_id = database.insert(
-                    "INSERT INTO meetings (commitment_id, start_utc, end_utc) VALUES (?,?,?)",
-                    (commitment_id, start_utc, end_utc)
-                )
-                for uid in ids_str.split("&"):
-                    database.execute(
-                        "INSERT OR IGNORE INTO meeting_participants (meeting_id, user_id, attended) VALUES (?,?,1)",
-                        (meeting_id, int(uid.strip()))
+        commitment_ids = {x: self.commitment_ids.pop(x, None) for x in crossedover}
+        new_meetings = [x for x in crossedover if (x not in self.meeting_ids)]  # identical group + slot already a meeting: reuse it
+        if (new_meetings):
+            database.execute_many(
+                "INSERT INTO meetings (commitment_id, start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?,?)",
+                [(commitment_ids[x], epoch_to_utc_text(x.start_ts), epoch_to_utc_text(x.end_ts), x.start_ts, x.end_ts)
+                 for x in new_meetings if (commitment_ids[x] is not None)]
+            )
+            rows = database.fetch_all(
+                """SELECT commitment_id, MAX(meeting_id) AS meeting_id FROM meetings
+                   WHERE commitment_id IN (SELECT value FROM json_each(?))
+                   GROUP BY commitment_id""",
+                (json.dumps([commitment_ids[x] for x in new_meetings if (commitment_ids[x] is not None)]),)
+            )
+            meeting_by_commitment = {r["commitment_id"]: r["meeting_id"] for r in rows}
+            for x in new_meetings:
+                if (commitment_ids[x] is not None):
+                    self.meeting_ids[x] = meeting_by_commitment[commitment_ids[x]]
+                else:  # no commitments row (in-memory only): a stand-alone meeting
+                    self.meeting_ids[x] = database.insert(
+                        "INSERT INTO meetings (start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?)",
+                        (epoch_to_utc_text(x.start_ts), epoch_to_utc_text(x.end_ts), x.start_ts, x.end_ts)
                     )
+            database.execute_many(
+                "INSERT OR IGNORE INTO meeting_participants (meeting_id, user_id, attended) VALUES (?,?,1)",
+                [(self.meeting_ids[x], uid) for x in new_meetings for uid in x.ids]
+            )
         
         # Remove promoted commitments from in-memory global list
         # (DB rows are retained as audit trail; meetings.commitment_id links back to them)
-        self.commitments[:] = [c for c in self.commitments if c not in crossedover]
+        promoted = set(crossedover)
+        self.commitments[:] = [c for c in self.commitments if c not in promoted]
         
-        # Create Person-Wise Meetings
-        for i, crossover in enumerate(crossedover):
-            print(f"Crossover {i+1}/{crossedover_len}: {crossover}") if (self.print_debug == True) else False
-            id_index = 0
-            datetime_start_index = 1
-            datetime_end_index = 2
-            
-            crossover_ids = [x for x in crossover[id_index].split("&")]
-            crossover_ids_len = len(crossover_ids)
-            
-            datetime_start_utc = datetime.strptime(crossover[datetime_start_index], FMT)
-            datetime_end_utc = datetime.strptime(crossover[datetime_end_index], FMT)
-            
-            # Obtain only relevant target persons
-            target_persons = [x for x in self.persons if (x.id in crossover_ids)]
-            target_persons_len = len(target_persons)
-            
-            # Create Commitment at Person Object level
-            for i, person in enumerate(target_persons):
-                # Redundant Check/Query for Matching ID
-                print(f"- Matching ID ({person.id} in {crossover_ids})?: {person.id in crossover_ids}") if (self.print_debug == True) else False
-                
-                availability = deepcopy(person.availability)
-                commitments = deepcopy(person.commitments)
-                meetings = deepcopy(person.meetings_history)
-                
-                person.create_meeting(datetime_start_utc, datetime_end_utc)
-                
-                if (remove_availability):
-                    person.remove_availability(datetime_start_utc, datetime_end_utc)
-                if (remove_commitment):
-                    person.remove_commitment(datetime_start_utc, datetime_end_utc)
-                
-                print(f"------ (return to) update_commitments_to_meetings() ------") if (self.print_debug == True) else False
-                print(f"- Availability (Before) {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
-                print(f"- Commitments (Before) {i+1}/{target_persons_len} [{len(commitments)}]: {commitments}") if (self.print_debug == True) else False
-                print(f"- Meetings (Before) {i+1}/{target_persons_len} [{len(meetings)}]: {meetings}") if (self.print_debug == True) else False
-                
-                availability = person.availability
-                commitments = person.commitments
-                meetings = person.meetings_history
-                
-                print(f"- Availability (After) {i+1}/{target_persons_len} [{len(availability)}]: {availability}") if (self.print_debug == True) else False
-                print(f"- Commitments (After) {i+1}/{target_persons_len} [{len(commitments)}]: {commitments}") if (self.print_debug == True) else False
-                print(f"- Meetings (After) {i+1}/{target_persons_len} [{len(meetings)}]: {meetings}") if (self.print_debug == True) else False
-                
-            # Postprocess Meeting
-            self._postprocess_meeting(crossover)
-            
-        self.print_global_commitments()
-        self.print_global_meetings_history()
-        return
+        # Participants' histories are about to be extended: load them all in one go (instead of lazily, per person)
+        crossedover_ids = {x for crossover in crossedover for x in crossover.ids}
+        self.prefetch_history(self.get_persons_by_ids(crossedover_ids))
+        
+        # Group the batch per participant, in promotion order
+        meetings_by_person = {}  # person.id -> (person, [crossover, ...])
+        for crossover in crossedover:
+            for person in self.get_persons_by_ids(crossover.ids):
+                meetings_by_person.setdefault(person.id, (person, []))[1].append((self.meeting_ids[crossover], commitment_ids[crossover], crossover))
+        
+        # Create Person-Wise Meetings + Balance Entries (one update / sync / billing per person)
+        for i, (person, meetings) in enumerate(meetings_by_person.values()):
+            print(f"Person {i+1}/{len(meetings_by_person)}: #{person.id} [{len(meetings)} meetings]") if (self.print_debug == True) else False
+            person.promote_meetings(meetings, remove_availability, remove_commitment)
+            person.create_balance_entries([(x.ids, x.start_ts, x.end_ts, self._balance_entry_amount(person)) for _, _, x in meetings])
+            print(f"- Commitments (After) [{len(person.commitments)}]: {person.commitments}") if (self.print_debug == True) else False
+            print(f"- Meetings (After) [{len(person.meetings_history)}]: {person.meetings_history}") if (self.print_debug == True) else False
         
\ No newline at end of file
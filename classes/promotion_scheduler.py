@@ -0,0 +1,64 @@
+
+import threading
+from datetime import datetime
+
+from db import database
+
+class PromotionScheduler():
+    """
+    Runs Persons.update() (commitment -> meeting promotion and balance billing) every tick_seconds
+    on a background daemon thread, so promotion no longer waits for the admin to press a key.
+    - Every run holds persons.lock, the same lock the Persons scheduling methods take, so the UI
+      and the scheduler never interleave writes to Persons state.
+    - Runs are quiet (no global list prints); the UI just reads persons.active_meetings,
+      persons.commitments and persons.meetings_history as last computed.
+    - The thread uses its own pooled DB connection and hands it back on stop().
+    """
+
+    def __init__(self, persons, tick_seconds=30.0):
+        self.persons = persons
+        self.tick_seconds = tick_seconds
+        self.runs = 0
+        self.last_run = None     # persons.current_datetime of the last completed run
+        self.last_error = None   # last exception raised by a run (the thread keeps going)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        print(f"------ PromotionScheduler.start() (every {self.tick_seconds}s) ------") if (self.persons.print_debug == True) else False
+        if self.is_running():
+            return self
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="promotion-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stops the thread after its current run (if any) and waits for it."""
+        print(f"------ PromotionScheduler.stop() ------") if (self.persons.print_debug == True) else False
+        self._stop_event.set()
+        if (self._thread is not None):
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        return (self._thread is not None) and self._thread.is_alive()
+
+    def run_once(self):
+        """One promotion pass (also usable without the thread, e.g. from tests or a cron job)."""
+        with self.persons.lock:
+            self.persons.update(quiet=True)
+            self.runs += 1
+            self.last_run = self.persons.current_datetime
+
+    def _run(self):
+        try:
+            while (not self._stop_event.is_set()):
+                try:
+                    self.run_once()
+                except Exception as error:
+                    self.last_error = error
+                    print(f"[ERROR] Promotion run failed at {datetime.now()}: {error!r}")
+                self._stop_event.wait(self.tick_seconds)
+        finally:
+            database.get_pool().release()
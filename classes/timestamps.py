@@ -0,0 +1,31 @@
+
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from classes.interval import ids_to_str
+
+# Scheduling intervals are held (in memory and in the *_ts DB columns) as integer
+# UTC epoch seconds. The legacy TEXT columns (start_utc/end_utc) are still written
+# alongside, in this format, for readability and audit.
+UTC_TEXT_FMT = "%Y-%m-%d %H:%M:%S+00:00"
+
+def to_epoch(value):
+    """datetime (tz-aware) or epoch int -> epoch int (UTC seconds)."""
+    if isinstance(value, int):
+        return value
+    return int(value.timestamp())
+
+def from_epoch(ts, tz=timezone.utc):
+    """epoch int -> tz-aware datetime in tz (ZoneInfo or IANA key string)."""
+    if isinstance(tz, str):
+        tz = ZoneInfo(tz)
+    return datetime.fromtimestamp(ts, tz)
+
+def epoch_to_utc_text(ts):
+    """epoch int -> legacy TEXT column value, e.g. '2026-10-18 14:00:00+00:00'."""
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(UTC_TEXT_FMT)
+
+def format_datetimes(datetimes, tz=timezone.utc):
+    """[ids, start_ts, end_ts] -> ['0&1', start_str, end_str] rendered in tz (for display)."""
+    ids = datetimes[0] if isinstance(datetimes[0], str) else ids_to_str(datetimes[0])
+    return [ids, str(from_epoch(datetimes[1], tz)), str(from_epoch(datetimes[2], tz))]
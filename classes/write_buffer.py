@@ -0,0 +1,75 @@
+
+import threading
+from datetime import datetime
+
+from db import database
+
+class WriteBuffer():
+    """
+    Write-behind mode for the Person dual-writes (Persons(write_behind_seconds=...)).
+    - A Person sync records its delta on the person, coalesced with whatever is already pending
+      (a row added then removed before the flush is never written), and marks the person dirty here.
+    - flush() writes every dirty person's pending delta in one transaction, in the order the persons were
+      first dirtied. On failure the transaction rolls back and everything stays pending for the next flush.
+    - With flush_seconds > 0 a daemon thread flushes every flush_seconds, under lock (persons.lock).
+    Durability: the database only ever holds whole flushes. A crash loses the edits made since the
+    last completed flush (at most flush_seconds of work), never part of one; what was flushed is as
+    durable as the active database profile makes any commit. Commitment -> meeting promotion and billing
+    flush in the promotion transaction, so they are never left in the buffer.
+    """
+
+    def __init__(self, lock, flush_seconds=0):
+        self.lock = lock
+        self.flush_seconds = flush_seconds
+        self.flushes = 0
+        self.last_error = None   # last exception raised by a background flush (the thread keeps going)
+        self._dirty = {}         # person.id -> Person with pending writes, in first-dirtied order
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __len__(self):
+        return len(self._dirty)
+
+    def mark(self, person):
+        self._dirty.setdefault(person.id, person)
+
+    def flush(self):
+        """Writes all pending deltas in one transaction; returns the number of persons flushed."""
+        with self.lock:
+            if not self._dirty:
+                return 0
+            dirty = list(self._dirty.values())
+            with database.transaction():
+                for person in dirty:
+                    person._write_pending()
+            for person in dirty:
+                person._written()
+            self._dirty.clear()
+            self.flushes += 1
+            return len(dirty)
+
+    def start(self):
+        if (self.flush_seconds) and (self._thread is None):
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stops the flush thread (if any) and flushes whatever is still pending."""
+        self._stop_event.set()
+        if (self._thread is not None):
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        try:
+            while (not self._stop_event.wait(self.flush_seconds)):
+                try:
+                    self.flush()
+                except Exception as error:
+                    self.last_error = error
+                    print(f"[ERROR] Write-behind flush failed at {datetime.now()}: {error!r}")
+        finally:
+            database.get_pool().release()
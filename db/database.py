@@ -1,22 +1,327 @@
 # database.py
 import sqlite3
 import os
+import threading
+import atexit
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from queue import Queue, Empty, Full
 
 # Hard-coded path — change this one line if you ever want a different filename
 DB_PATH = "data_pilot/scheduler.db"
 
+# Connection pool settings (see configure_pool)
+POOL_SIZE = 4                 # max connections kept open across all threads
+CACHED_STATEMENTS = 256       # per-connection prepared-statement cache (sqlite3 default is 128)
+
+# Performance profiles (see init_db / set_profile)
+# - journal_mode        WAL lets readers run alongside a writer (persistent per database file)
+# - synchronous         FULL = fsync every commit; NORMAL = fsync at checkpoints (WAL-safe); OFF = leave it to the OS
+# - cache_size          negative = KiB of page cache per connection
+# - mmap_size           bytes of the file memory-mapped for reads
+# - temp_store          where temp tables/indices live
+# - wal_autocheckpoint  SQLite's own checkpoint threshold in WAL pages (0 = off)
+# - checkpoint_every    run a PASSIVE checkpoint after this many commits (0 = off)
+PROFILES = {
+    "durable": {
+        "journal_mode": "WAL", "synchronous": "FULL", "cache_size": -8000,
+        "mmap_size": 0, "temp_store": "DEFAULT",
+        "wal_autocheckpoint": 1000, "checkpoint_every": 100,
+    },
+    "balanced": {
+        "journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -32000,
+        "mmap_size": 128 * 1024 * 1024, "temp_store": "MEMORY",
+        "wal_autocheckpoint": 1000, "checkpoint_every": 500,
+    },
+    "bulk-load": {
+        "journal_mode": "WAL", "synchronous": "OFF", "cache_size": -128000,
+        "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY",
+        "wal_autocheckpoint": 0, "checkpoint_every": 0,
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+_profile_lock = threading.Lock()
+_profile_name = DEFAULT_PROFILE
+_profile_version = 0          # bumped by set_profile(); pooled connections re-apply pragmas when stale
+_commits_since_checkpoint = 0
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers which profile version its pragmas reflect."""
+    profile_version = -1
+
+
+class ConnectionPool():
+    """
+    Keeps SQLite connections open and hands each thread its own one.
+
+    - A thread keeps the same connection for as long as it runs (sqlite3 connections
+      must not be shared across threads), so hot loops pay connection setup once.
+    - At most `size` connections are kept idle for reuse once released; extra
+      connections are closed on release.
+    - Idle connections are health-checked ("SELECT 1") before being handed out again.
+    """
+    def __init__(self, db_path, size=POOL_SIZE, cached_statements=CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.size = size
+        self.cached_statements = cached_statements
+        self._idle = Queue(maxsize=size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = set()
+        self.closed = False
+
+    def _connect(self):
+        # isolation_level=None: autocommit per statement unless inside transaction()
+        conn = sqlite3.connect(self.db_path, cached_statements=self.cached_statements,
+                               check_same_thread=False, isolation_level=None,
+                               factory=PooledConnection)
+        conn.row_factory = sqlite3.Row   # lets you do row['name'] instead of row[0]
+        conn.execute("PRAGMA foreign_keys = ON")
+        _apply_profile(conn)
+        with self._lock:
+            self._all.add(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._all.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Returns this thread's connection, reusing an idle one (or opening a new one) if needed."""
+        if self.closed:
+            raise sqlite3.ProgrammingError("Connection pool has been closed")
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            if (conn.profile_version != _profile_version) and (not conn.in_transaction):
+                _apply_profile(conn)
+            return conn
+        while conn is None:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                conn = self._connect()
+                break
+            if not self._is_healthy(conn):
+                self._discard(conn)
+                conn = None
+            elif (conn.profile_version != _profile_version):
+                _apply_profile(conn)
+        self._local.conn = conn
+        return conn
+
+    def release(self):
+        """Returns this thread's connection to the idle pool (call when a worker thread finishes)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            self._discard(conn)
+
+    def close_all(self):
+        """Closes every connection opened by this pool (idle or checked out)."""
+        self.closed = True
+        with self._lock:
+            conns = list(self._all)
+            self._all.clear()
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(size=POOL_SIZE, cached_statements=CACHED_STATEMENTS):
+    """(Re)create the connection pool with the given size and statement cache size."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(DB_PATH, size=size, cached_statements=cached_statements)
+    return _pool
+
+
+def get_pool():
+    """Returns the active pool, recreating it if DB_PATH changed or it was closed."""
+    global _pool
+    with _pool_lock:
+        if (_pool is None) or _pool.closed or (_pool.db_path != DB_PATH):
+            size = _pool.size if _pool else POOL_SIZE
+            cached_statements = _pool.cached_statements if _pool else CACHED_STATEMENTS
+            if _pool is not None:
+                _pool.close_all()
+            _pool = ConnectionPool(DB_PATH, size=size, cached_statements=cached_statements)
+        return _pool
+
+
+def close_pool():
+    """Clean shutdown: closes all pooled connections (also registered with atexit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+            _pool = None
+
+
+atexit.register(close_pool)
+
 
 def get_db():
-    """Returns a connection with FK enforcement on. Always use 'with'."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row   # lets you do row['name'] instead of row[0]
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    """Returns this thread's pooled connection with FK enforcement on."""
+    return get_pool().acquire()
+
+
+def _apply_profile(conn):
+    """Applies the active profile's pragmas to one connection."""
+    settings = PROFILES[_profile_name]
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {int(settings['wal_autocheckpoint'])}")
+    conn.profile_version = _profile_version
 
 
-def init_db():
+def get_profile():
+    return _profile_name
+
+
+def set_profile(name):
+    """
+    Switches the performance profile (one of PROFILES). Every pooled connection
+    re-applies the pragmas the next time its thread uses it.
+    """
+    global _profile_name, _profile_version
+    if name not in PROFILES:
+        raise ValueError(f"Unknown database profile '{name}' (expected one of {list(PROFILES)})")
+    with _profile_lock:
+        _profile_name = name
+        _profile_version += 1
+    _apply_profile(get_db())
+
+
+@contextmanager
+def use_profile(name):
+    """
+    Temporarily switch profile, e.g. for a bulk import:
+
+        with database.use_profile("bulk-load"):
+            ...
+    The WAL is checkpointed on exit so the previous profile starts from a small log.
+    """
+    previous = _profile_name
+    set_profile(name)
+    try:
+        yield
+    finally:
+        set_profile(previous)
+        checkpoint("TRUNCATE")
+
+
+def checkpoint(mode="PASSIVE"):
     """
-    Create all tables (safe to call every time — uses IF NOT EXISTS).
+    Copies WAL content back into the database file.
+    mode: PASSIVE (never blocks), FULL, RESTART or TRUNCATE (also resets the WAL file).
+    Returns (busy, wal_pages, checkpointed_pages).
+    """
+    global _commits_since_checkpoint
+    if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+        raise ValueError(f"Unknown checkpoint mode '{mode}'")
+    row = get_db().execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    with _profile_lock:
+        _commits_since_checkpoint = 0
+    return tuple(row)
+
+
+def _note_commit():
+    """Counts commits and runs a PASSIVE checkpoint every profile['checkpoint_every'] of them."""
+    global _commits_since_checkpoint
+    every = PROFILES[_profile_name]["checkpoint_every"]
+    if not every:
+        return
+    with _profile_lock:
+        _commits_since_checkpoint += 1
+        due = _commits_since_checkpoint >= every
+    if due:
+        checkpoint("PASSIVE")
+
+
+_tx_local = threading.local()
+
+
+@contextmanager
+def transaction():
+    """
+    Unit of work: every execute/insert inside the block commits once, at the end.
+    - Nestable: inner blocks become SAVEPOINTs, so an inner failure only rolls back the inner block.
+    - Any exception rolls the (sub-)transaction back and is re-raised.
+
+        with database.transaction():
+            commitment_id = database.insert(...)
+            database.execute(...)
+    """
+    conn = get_db()
+    depth = getattr(_tx_local, "depth", 0)
+    savepoint = f"sp_{depth}"
+    if (depth == 0):
+        conn.execute("BEGIN IMMEDIATE")   # take the write lock up front
+    else:
+        conn.execute(f"SAVEPOINT {savepoint}")
+    _tx_local.depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        _tx_local.depth = depth
+        if (depth == 0):
+            conn.execute("ROLLBACK")
+        else:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+        raise
+    _tx_local.depth = depth
+    if (depth == 0):
+        conn.execute("COMMIT")
+        _note_commit()
+    else:
+        conn.execute(f"RELEASE {savepoint}")
+
+
+def in_transaction():
+    """True while inside a transaction() block on this thread."""
+    return getattr(_tx_local, "depth", 0) > 0
+
+
+def init_db(apply_migrations=True, profile=None):
+    """
+    Create all tables (safe to call every time — uses IF NOT EXISTS), then bring the
+    schema up to date via migrate() (see MIGRATIONS below).
+    profile: name of a PROFILES entry ("durable", "balanced", "bulk-load"); None keeps the active one
+             (DEFAULT_PROFILE unless changed).
 
     Schema overview
     ---------------
@@ -32,124 +337,446 @@ def init_db():
     balance_history         — per-person financial trail, linked to a specific meeting
     """
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    with get_db() as conn:
-        conn.executescript('''
-            PRAGMA foreign_keys = ON;
-
-            -- ----------------------------------------------------------------
-            -- Users
-            -- ----------------------------------------------------------------
-            CREATE TABLE IF NOT EXISTS users (
-                id                INTEGER PRIMARY KEY,
-                role              TEXT    NOT NULL,
-                first_name        TEXT    NOT NULL,
-                last_name         TEXT    NOT NULL,
-                family_id         INTEGER,
-                date_registered   TEXT    NOT NULL DEFAULT (date('now')),
-                date_of_birth     TEXT    NOT NULL,
-                address           TEXT,
-                phone_number      TEXT,
-                email             TEXT    UNIQUE,
-                rate              REAL    NOT NULL DEFAULT 0.0,
-                balance           REAL    NOT NULL DEFAULT 0.0,
-                timezone          TEXT    NOT NULL,
-                comments          TEXT
-            );
-
-            -- ----------------------------------------------------------------
-            -- Availability  (per-person)
-            -- ----------------------------------------------------------------
-            CREATE TABLE IF NOT EXISTS user_availabilities (
-                avail_id    INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id     INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                start_utc   TEXT    NOT NULL,
-                end_utc     TEXT    NOT NULL,
-                CHECK (end_utc > start_utc)
-            );
-
-            -- ----------------------------------------------------------------
-            -- Commitments  (group-level — a confirmed intersection)
-            -- ----------------------------------------------------------------
-            CREATE TABLE IF NOT EXISTS commitments (
-                commitment_id   INTEGER PRIMARY KEY AUTOINCREMENT,
-                start_utc       TEXT NOT NULL,
-                end_utc         TEXT NOT NULL,
-                notes           TEXT,
-                CHECK (end_utc > start_utc)
-            );
-
-            -- who is committed to each slot
-            CREATE TABLE IF NOT EXISTS commitment_participants (
-                commitment_id   INTEGER NOT NULL REFERENCES commitments(commitment_id) ON DELETE CASCADE,
-                user_id         INTEGER NOT NULL REFERENCES users(id)                 ON DELETE CASCADE,
-                PRIMARY KEY (commitment_id, user_id)
-            );
-
-            -- ----------------------------------------------------------------
-            -- Meetings  (group-level — a commitment that happened, or ad-hoc)
-            --
-            -- commitment_id is NULLABLE:
-            --   - set     → meeting was derived from a tracked commitment
-            --   - NULL    → ad-hoc meeting (no prior commitment record)
-            -- ----------------------------------------------------------------
-            CREATE TABLE IF NOT EXISTS meetings (
-                meeting_id      INTEGER PRIMARY KEY AUTOINCREMENT,
-                commitment_id   INTEGER REFERENCES commitments(commitment_id) ON DELETE SET NULL,
-                start_utc       TEXT NOT NULL,
-                end_utc         TEXT NOT NULL,
-                title           TEXT,
-                notes           TEXT,
-                CHECK (end_utc > start_utc)
-            );
-
-            -- who was scheduled AND did they attend
-            -- attended: 0 = no-show / unknown, 1 = attended
-            CREATE TABLE IF NOT EXISTS meeting_participants (
-                meeting_id  INTEGER NOT NULL REFERENCES meetings(meeting_id) ON DELETE CASCADE,
-                user_id     INTEGER NOT NULL REFERENCES users(id)            ON DELETE CASCADE,
-                attended    INTEGER NOT NULL DEFAULT 0 CHECK (attended IN (0, 1)),
-                PRIMARY KEY (meeting_id, user_id)
-            );
-
-            -- ----------------------------------------------------------------
-            -- Balance history  (per-person financial trail)
-            -- ----------------------------------------------------------------
-            CREATE TABLE IF NOT EXISTS balance_history (
-                entry_id        INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id         INTEGER NOT NULL REFERENCES users(id)       ON DELETE CASCADE,
-                meeting_id      INTEGER          REFERENCES meetings(meeting_id) ON DELETE SET NULL,
-                associate_ids   TEXT,
-                start_utc       TEXT NOT NULL,
-                end_utc         TEXT NOT NULL,
-                amount          REAL NOT NULL,
-                balance_after   REAL NOT NULL
-            );
-        ''')
-    print(f"[OK] Database ready -> {DB_PATH}")
+    if (profile is not None):
+        set_profile(profile)
+    get_db().executescript('''
+        PRAGMA foreign_keys = ON;
+
+        -- ----------------------------------------------------------------
+        -- Users
+        -- ----------------------------------------------------------------
+        CREATE TABLE IF NOT EXISTS users (
+            id                INTEGER PRIMARY KEY,
+            role              TEXT    NOT NULL,
+            first_name        TEXT    NOT NULL,
+            last_name         TEXT    NOT NULL,
+            family_id         INTEGER,
+            date_registered   TEXT    NOT NULL DEFAULT (date('now')),
+            date_of_birth     TEXT    NOT NULL,
+            address           TEXT,
+            phone_number      TEXT,
+            email             TEXT    UNIQUE,
+            rate              REAL    NOT NULL DEFAULT 0.0,
+            balance           REAL    NOT NULL DEFAULT 0.0,
+            timezone          TEXT    NOT NULL,
+            comments          TEXT
+        );
+
+        -- ----------------------------------------------------------------
+        -- Availability  (per-person)
+        -- ----------------------------------------------------------------
+        CREATE TABLE IF NOT EXISTS user_availabilities (
+            avail_id    INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id     INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+            start_utc   TEXT    NOT NULL,
+            end_utc     TEXT    NOT NULL,
+            CHECK (end_utc > start_utc)
+        );
+
+        -- ----------------------------------------------------------------
+        -- Commitments  (group-level — a confirmed intersection)
+        -- ----------------------------------------------------------------
+        CREATE TABLE IF NOT EXISTS commitments (
+            commitment_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_utc       TEXT NOT NULL,
+            end_utc         TEXT NOT NULL,
+            notes           TEXT,
+            CHECK (end_utc > start_utc)
+        );
+
+        -- who is committed to each slot
+        CREATE TABLE IF NOT EXISTS commitment_participants (
+            commitment_id   INTEGER NOT NULL REFERENCES commitments(commitment_id) ON DELETE CASCADE,
+            user_id         INTEGER NOT NULL REFERENCES users(id)                 ON DELETE CASCADE,
+            PRIMARY KEY (commitment_id, user_id)
+        );
+
+        -- ----------------------------------------------------------------
+        -- Meetings  (group-level — a commitment that happened, or ad-hoc)
+        --
+        -- commitment_id is NULLABLE:
+        --   - set     → meeting was derived from a tracked commitment
+        --   - NULL    → ad-hoc meeting (no prior commitment record)
+        -- ----------------------------------------------------------------
+        CREATE TABLE IF NOT EXISTS meetings (
+            meeting_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+            commitment_id   INTEGER REFERENCES commitments(commitment_id) ON DELETE SET NULL,
+            start_utc       TEXT NOT NULL,
+            end_utc         TEXT NOT NULL,
+            title           TEXT,
+            notes           TEXT,
+            CHECK (end_utc > start_utc)
+        );
+
+        -- who was scheduled AND did they attend
+        -- attended: 0 = no-show / unknown, 1 = attended
+        CREATE TABLE IF NOT EXISTS meeting_participants (
+            meeting_id  INTEGER NOT NULL REFERENCES meetings(meeting_id) ON DELETE CASCADE,
+            user_id     INTEGER NOT NULL REFERENCES users(id)            ON DELETE CASCADE,
+            attended    INTEGER NOT NULL DEFAULT 0 CHECK (attended IN (0, 1)),
+            PRIMARY KEY (meeting_id, user_id)
+        );
+
+        -- ----------------------------------------------------------------
+        -- Balance history  (per-person financial trail)
+        -- ----------------------------------------------------------------
+        CREATE TABLE IF NOT EXISTS balance_history (
+            entry_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id         INTEGER NOT NULL REFERENCES users(id)       ON DELETE CASCADE,
+            meeting_id      INTEGER          REFERENCES meetings(meeting_id) ON DELETE SET NULL,
+            associate_ids   TEXT,
+            start_utc       TEXT NOT NULL,
+            end_utc         TEXT NOT NULL,
+            amount          REAL NOT NULL,
+            balance_after   REAL NOT NULL
+        );
+    ''')
+    if (apply_migrations):
+        migrate()
+    print(f"[OK] Database ready -> {DB_PATH} (profile: {_profile_name})")
+
+
+# ----------------------------------------------------------------
+# Migrations
+#
+# The CREATE TABLE script in init_db() is schema version 0. Every later change
+# is appended here as (version, description, [statements]) and is applied once,
+# in order, to both new and existing databases (e.g. data_pilot/scheduler.db).
+# The applied version is tracked in PRAGMA user_version.
+# Never edit a released migration — add a new one.
+# ----------------------------------------------------------------
+MIGRATIONS = [
+    (1, "indexes for per-user loads and (start_utc, end_utc) lookups", [
+        # Person.__init__ loads (filter user_id, order start_utc)
+        "CREATE INDEX IF NOT EXISTS idx_user_availabilities_user_start ON user_availabilities(user_id, start_utc)",
+        "CREATE INDEX IF NOT EXISTS idx_commitment_participants_user ON commitment_participants(user_id, commitment_id)",
+        "CREATE INDEX IF NOT EXISTS idx_meeting_participants_user ON meeting_participants(user_id, meeting_id)",
+        "CREATE INDEX IF NOT EXISTS idx_balance_history_user ON balance_history(user_id, entry_id)",
+        # slot lookups in the dual-write / promotion paths
+        "CREATE INDEX IF NOT EXISTS idx_commitments_start_end ON commitments(start_utc, end_utc)",
+        "CREATE INDEX IF NOT EXISTS idx_meetings_start_end ON meetings(start_utc, end_utc)",
+        # NOT EXISTS (... meetings.commitment_id = ?) in the Persons commitment loader
+        "CREATE INDEX IF NOT EXISTS idx_meetings_commitment ON meetings(commitment_id)",
+    ]),
+    (2, "integer epoch columns (start_ts, end_ts) backfilled from the TEXT datetimes", [
+        *[stmt for table in ("user_availabilities", "commitments", "meetings", "balance_history") for stmt in (
+            f"ALTER TABLE {table} ADD COLUMN start_ts INTEGER",
+            f"ALTER TABLE {table} ADD COLUMN end_ts INTEGER",
+            f"UPDATE {table} SET start_ts = CAST(strftime('%s', start_utc) AS INTEGER), "
+            f"end_ts = CAST(strftime('%s', end_utc) AS INTEGER)",
+        )],
+        # range/slot lookups move to the integer columns
+        "DROP INDEX IF EXISTS idx_user_availabilities_user_start",
+        "DROP INDEX IF EXISTS idx_commitments_start_end",
+        "DROP INDEX IF EXISTS idx_meetings_start_end",
+        "CREATE INDEX IF NOT EXISTS idx_user_availabilities_user_start_ts ON user_availabilities(user_id, start_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_commitments_start_end_ts ON commitments(start_ts, end_ts)",
+        "CREATE INDEX IF NOT EXISTS idx_meetings_start_end_ts ON meetings(start_ts, end_ts)",
+    ]),
+    (3, "unique ledger key on balance_history (duplicate entries dropped first)", [
+        # Person.create_balance_entries() records an entry once per (user, ids, times, amount); keep the first
+        # copy of any duplicate already stored (users.balance already counted every copy, so it is unchanged)
+        """DELETE FROM balance_history WHERE entry_id NOT IN (
+               SELECT MIN(entry_id) FROM balance_history
+               GROUP BY user_id, associate_ids, start_ts, end_ts, amount
+           )""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_balance_history_entry "
+        "ON balance_history(user_id, associate_ids, start_ts, end_ts, amount)",
+    ]),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def get_schema_version():
+    return get_db().execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(target_version=SCHEMA_VERSION):
+    """Applies pending MIGRATIONS up to target_version; each one commits atomically with its version bump."""
+    current_version = get_schema_version()
+    for version, description, statements in MIGRATIONS:
+        if (version <= current_version) or (version > target_version):
+            continue
+        with transaction() as conn:
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        print(f"[OK] Schema migrated v{current_version} -> v{version}: {description}")
+        current_version = version
+    return current_version
+
+
+# ----------------------------------------------------------------
+# Query plans
+#
+# The hot queries issued by Person/Persons: (sql, representative params, tables
+# that are expected to be scanned in full — e.g. the driving table of a
+# whole-table load). check_query_plans() runs EXPLAIN QUERY PLAN on each so check_db.py (and
+# run_benchmarks.py, before/after migrating) can show that none of them
+# falls back to a full table scan.
+# ----------------------------------------------------------------
+HOT_QUERIES = {
+    "availability by user": (
+        "SELECT user_id, start_ts, end_ts FROM user_availabilities WHERE user_id=? ORDER BY start_ts",
+        (0,), ()),
+    "commitments by user": (
+        """SELECT cp.user_id, c.commitment_id, c.start_ts, c.end_ts
+           FROM commitment_participants cp
+           JOIN commitments c ON cp.commitment_id = c.commitment_id
+           WHERE cp.user_id = ?
+           ORDER BY c.start_ts""",
+        (0,), ()),
+    "meetings by user": (
+        """SELECT mp.user_id, m.meeting_id, m.start_ts, m.end_ts
+           FROM meeting_participants mp
+           JOIN meetings m ON mp.meeting_id = m.meeting_id
+           WHERE mp.user_id = ?
+           ORDER BY m.start_ts""",
+        (0,), ()),
+    "balance history by user": (
+        """SELECT user_id, associate_ids, start_ts, end_ts, amount, balance_after
+           FROM balance_history WHERE user_id = ? ORDER BY entry_id""",
+        (0,), ()),
+    "commitment by slot": (
+        "SELECT MIN(commitment_id) FROM commitments WHERE start_ts=? AND end_ts=?",
+        (0, 0), ()),
+    "meeting by slot": (
+        "SELECT MIN(meeting_id) FROM meetings WHERE start_ts=? AND end_ts=?",
+        (0, 0), ()),
+    "meetings by commitment": (
+        """SELECT commitment_id, MAX(meeting_id) AS meeting_id FROM meetings
+           WHERE commitment_id IN (SELECT value FROM json_each(?))
+           GROUP BY commitment_id""",
+        ("[0]",), ("json_each",)),
+    "pending commitments": (
+        """SELECT c.commitment_id, GROUP_CONCAT(cp.user_id, '&') AS ids, c.start_ts, c.end_ts
+           FROM commitments c
+           JOIN commitment_participants cp ON c.commitment_id = cp.commitment_id
+           WHERE NOT EXISTS (
+               SELECT 1 FROM meetings m WHERE m.commitment_id = c.commitment_id
+           )
+           GROUP BY c.commitment_id
+           ORDER BY c.start_ts""",
+        (), ("c",)),
+}
+
+
+def explain_query_plan(sql, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines for sql."""
+    return [r["detail"] for r in get_db().execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def _plan_uses_index(details, allowed_scans=()):
+    # A filtered lookup shows up as "SEARCH <table> USING ..."; "SCAN <table> [USING ...]" visits every row.
+    for detail in details:
+        if detail.startswith("SCAN ") and (detail.split(" ")[1] not in allowed_scans):
+            return False
+    return True
+
+
+def check_query_plans(queries=None):
+    """Returns [(name, plan_details, uses_index)] for each hot query."""
+    queries = HOT_QUERIES if (queries is None) else queries
+    results = []
+    for name, (sql, params, allowed_scans) in queries.items():
+        details = explain_query_plan(sql, params)
+        results.append((name, details, _plan_uses_index(details, allowed_scans)))
+    return results
+
+
+def print_query_plans(queries=None):
+    print(f"Query Plans (schema v{get_schema_version()}):")
+    for name, details, uses_index in check_query_plans(queries):
+        print(f"- [{'INDEX' if uses_index else 'SCAN '}] {name}")
+        for detail in details:
+            print(f"      {detail}")
 
 
 def execute(sql, params=()):
-    """INSERT / UPDATE / DELETE"""
-    with get_db() as conn:
-        conn.execute(sql, params)
-        conn.commit()
+    """INSERT / UPDATE / DELETE (commits immediately unless inside transaction())"""
+    t0 = time.perf_counter()
+    cursor = get_db().execute(sql, params)
+    _record_query(sql, params, t0, cursor.rowcount)
+    if not in_transaction():
+        _note_commit()
 
 
 def insert(sql, params=()):
     """INSERT a single row; returns the new row's lastrowid."""
-    with get_db() as conn:
-        cursor = conn.execute(sql, params)
-        conn.commit()
-        return cursor.lastrowid
+    t0 = time.perf_counter()
+    cursor = get_db().execute(sql, params)
+    _record_query(sql, params, t0, cursor.rowcount)
+    if not in_transaction():
+        _note_commit()
+    return cursor.lastrowid
+
+
+def execute_many(sql, seq_of_params):
+    """Bulk INSERT / UPDATE / DELETE: one prepared statement run for every params tuple (executemany)."""
+    seq_of_params = list(seq_of_params)
+    t0 = time.perf_counter()
+    cursor = get_db().executemany(sql, seq_of_params)
+    _record_query(sql, seq_of_params[0] if seq_of_params else (), t0, cursor.rowcount)
+    if not in_transaction():
+        _note_commit()
+    return cursor.rowcount
 
 
 def fetch_all(sql, params=()):
     """SELECT many rows"""
-    with get_db() as conn:
-        return conn.execute(sql, params).fetchall()
+    t0 = time.perf_counter()
+    rows = get_db().execute(sql, params).fetchall()
+    _record_query(sql, params, t0, len(rows))
+    return rows
+
+
+def iter_all(sql, params=()):
+    """SELECT many rows, yielded straight off the cursor (no full result list held in memory)"""
+    t0 = time.perf_counter()
+    n_rows = 0
+    for row in get_db().execute(sql, params):
+        n_rows += 1
+        yield row
+    _record_query(sql, params, t0, n_rows)
 
 
 def fetch_one(sql, params=()):
     """SELECT one row (or None)"""
-    with get_db() as conn:
-        return conn.execute(sql, params).fetchone()
\ No newline at end of file
+    t0 = time.perf_counter()
+    row = get_db().execute(sql, params).fetchone()
+    _record_query(sql, params, t0, 0 if (row is None) else 1)
+    return row
+
+
+# ----------------------------------------------------------------
+# Query instrumentation (opt-in)
+#
+# enable_instrumentation() makes execute/insert/execute_many/fetch_all/fetch_one
+# record, per SQL template (the statement with whitespace collapsed), the call
+# count, cumulative and p95 latency, and rows returned (SELECT) or affected
+# (writes). Statements slower than slow_query_ms are printed with their query
+# plan. dump_query_stats() writes a JSON snapshot that check_db.py can print
+# from another process.
+# ----------------------------------------------------------------
+QUERY_STATS_PATH = "data_pilot/query_stats.json"
+SLOW_QUERY_MS = 50.0
+LATENCY_SAMPLES = 1000        # most recent latencies kept per template (for p95)
+
+_instrument_lock = threading.Lock()
+_instrument_enabled = False
+_slow_query_ms = SLOW_QUERY_MS
+_query_stats = {}             # template -> {"calls", "total_ms", "max_ms", "rows", "samples"}
+_slow_queries = deque(maxlen=100)
+
+
+def enable_instrumentation(slow_query_ms=SLOW_QUERY_MS):
+    global _instrument_enabled, _slow_query_ms
+    _slow_query_ms = slow_query_ms
+    _instrument_enabled = True
+
+
+def disable_instrumentation():
+    global _instrument_enabled
+    _instrument_enabled = False
+
+
+def instrumentation_enabled():
+    return _instrument_enabled
+
+
+def reset_query_stats():
+    with _instrument_lock:
+        _query_stats.clear()
+        _slow_queries.clear()
+
+
+def _sql_template(sql):
+    return " ".join(sql.split())
+
+
+def _record_query(sql, params, t0, rows):
+    if not _instrument_enabled:
+        return
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    template = _sql_template(sql)
+    with _instrument_lock:
+        stats = _query_stats.get(template)
+        if stats is None:
+            stats = _query_stats[template] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                                              "samples": deque(maxlen=LATENCY_SAMPLES)}
+        stats["calls"] += 1
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["rows"] += max(rows, 0)
+        stats["samples"].append(elapsed_ms)
+    if (elapsed_ms >= _slow_query_ms):
+        _log_slow_query(template, params, elapsed_ms)
+
+
+def _log_slow_query(template, params, elapsed_ms):
+    try:
+        plan = explain_query_plan(template, params)
+    except sqlite3.Error:
+        plan = []   # e.g. statements EXPLAIN cannot plan
+    with _instrument_lock:
+        _slow_queries.append({"sql": template, "ms": round(elapsed_ms, 3), "plan": plan})
+    print(f"[SLOW] {elapsed_ms:.1f} ms: {template}")
+    for detail in plan:
+        print(f"       {detail}")
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def query_stats():
+    """Returns per-template stats, slowest cumulative first."""
+    with _instrument_lock:
+        snapshot = [
+            {"sql": template, "calls": s["calls"], "total_ms": round(s["total_ms"], 3),
+             "avg_ms": round(s["total_ms"] / s["calls"], 3), "p95_ms": round(_percentile(s["samples"], 95), 3),
+             "max_ms": round(s["max_ms"], 3), "rows": s["rows"]}
+            for template, s in _query_stats.items()
+        ]
+    snapshot.sort(key=lambda x: x["total_ms"], reverse=True)
+    return snapshot
+
+
+def slow_queries():
+    with _instrument_lock:
+        return list(_slow_queries)
+
+
+def print_query_stats(stats=None, limit=15):
+    stats = query_stats() if (stats is None) else stats
+    print(f"Query Stats [{len(stats)} templates] (slowest cumulative first, showing {min(limit, len(stats))}):")
+    if not stats:
+        print("- (none — is instrumentation enabled?)")
+    for x in stats[:limit]:
+        sql = x["sql"] if (len(x["sql"]) <= 100) else x["sql"][:97] + "..."
+        print(f"- calls={x['calls']:<7} total={x['total_ms']:>9.1f} ms  p95={x['p95_ms']:>7.2f} ms  rows={x['rows']:<8} {sql}")
+
+
+def dump_query_stats(path=None):
+    """Writes the current stats and slow-query log to a JSON file (default QUERY_STATS_PATH)."""
+    path = QUERY_STATS_PATH if (path is None) else path
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {"dumped_at": time.strftime("%Y-%m-%d %H:%M:%S"), "pid": os.getpid(),
+               "slow_query_ms": _slow_query_ms, "stats": query_stats(), "slow_queries": slow_queries()}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp_path, path)   # readers never see a half-written file
+    return path
+
+
+def load_query_stats(path=None):
+    """Reads a dump_query_stats() file; returns None if there is none."""
+    path = QUERY_STATS_PATH if (path is None) else path
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
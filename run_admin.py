@@ -1,12 +1,20 @@
 
 import os
 from classes.persons import *
+from classes.promotion_scheduler import PromotionScheduler
+from classes.timestamps import format_datetimes
+from db import database
 from ui.functions_calendar_ui_admin import *
 from ui.functions_user_register_ui_admin import *
 from ui.functions_plan_meeting_ui_admin import Functions_Plan_Meeting_Ui_Admin
 
 ### Parameters ###
 current_timezone = "America/Toronto"
+db_profile = "balanced" # SQLite performance profile: "durable" | "balanced" | "bulk-load"
+instrument_queries = False # Record per-query stats (see 'print_query_stats'; dumped to data_pilot/query_stats.json for check_db.py)
+slow_query_ms = 50.0 # With instrument_queries, print queries slower than this (ms) with their query plan
+promotion_tick_seconds = 30.0 # Promote ended commitments -> meetings on a background thread every N seconds (None: promote inline on each menu redraw)
+write_behind_seconds = None # Buffer edits and write them in one transaction every N seconds (None: write each edit through immediately)
 
 ### Debug ###
 # Create logic for student/teacher preferences and auto-grouping to enable auto-scheduling. Only manual input should be availability.
@@ -15,13 +23,14 @@ current_timezone = "America/Toronto"
 # Create demo datasets/simulation.
 
 class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
-    def __init__(self, persons, print_debug=False, clear_console=True):
+    def __init__(self, persons, print_debug=False, clear_console=True, scheduler=None):
         self.persons = persons
+        self.scheduler = scheduler # PromotionScheduler keeping persons up to date in the background (None: update inline)
         self.persons.print_debug = print_debug
         self.clear_console = clear_console
 
         self.current = "mainmenu"
-        self.mainmenu = ["globals_quick_print", "global_print_menu", "register_person", "search", "search_by_key", "selection_print_menu", "selection_override_menu", "plan_meeting", "clear_selections", "toggle_debug_outputs", "exit"]
+        self.mainmenu = ["globals_quick_print", "global_print_menu", "register_person", "search", "search_by_key", "selection_print_menu", "selection_override_menu", "plan_meeting", "clear_selections", "print_query_stats", "toggle_debug_outputs", "exit"]
         self.global_print_menu = ["print_global_active_meetings", "print_global_commitments", "print_global_meetings_history"]
         self.selection_print_menu = ["print_availability", "print_commitments", "print_meetings_history", "print_balance_history"]
         self.selection_override_menu = ["availability_override", "commitments_override", "meetings_override"]
@@ -33,7 +42,8 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
     def menu_loop(self):
         exit_now = False
         while (not exit_now):
-            self.persons.update()
+            if (self.scheduler is None):
+                self.persons.update()
             exit_now = self.print_current()
     
     def print_current_datetime(self):
@@ -168,10 +178,12 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
                             self.persons.print_commitments(person)
                     elif (self.current == "print_meetings_history"):
                         self.print_page_title("PRINT MEETINGS HISTORY [For Selected Persons]")
+                        self.persons.prefetch_history()
                         for i, person in enumerate(self.persons.selected_persons):
                             self.persons.print_meetings_history(person)
                     elif (self.current == "print_balance_history"):
                         self.print_page_title("PRINT BALANCE HISTORY [For Selected Persons]")
+                        self.persons.prefetch_history()
                         for i, person in enumerate(self.persons.selected_persons):
                             self.persons.print_balance_history(person)
             self.current = "mainmenu"
@@ -202,7 +214,7 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
                             elif (self.current == "remove_availability"):
                                 self.print_page_title("REMOVE AVAILABILITIES [For Selected Persons]")
                                 for i, person in enumerate(self.persons.selected_persons):
-                                    self.print_contents(self.persons.get_availability(person))
+                                    self.print_contents([format_datetimes(x, self.persons.current_timezone) for x in self.persons.get_availability(person)])
                                     slots_len = len(self.persons.get_availability(person))
                                     if (slots_len > 0):
                                         self.print_page_subtitle(f"Remove Which Availabilities (Separated by Space)(Enter '' to go back) for: {person.first_name} {person.last_name} #{person.id}: ")
@@ -233,7 +245,7 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
                             elif (self.current == "remove_commitments"):
                                 self.print_page_title("REMOVE COMMITMENTS [For Selected Persons]")
                                 for i, person in enumerate(self.persons.selected_persons):
-                                    self.print_contents(self.persons.get_commitments(person))
+                                    self.print_contents([format_datetimes(x, self.persons.current_timezone) for x in self.persons.get_commitments(person)])
                                     slots_len = len(self.persons.get_commitments(person))
                                     if (slots_len > 0):
                                         self.print_page_subtitle(f"Remove Which Commitments (Separated by Space)(Enter '' to go back) for: {person.first_name} {person.last_name} #{person.id}: ")
@@ -264,7 +276,7 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
                             elif (self.current == "remove_meetings"):
                                 self.print_page_title("REMOVE MEETINGS [For Selected Persons]")
                                 for i, person in enumerate(self.persons.selected_persons):
-                                    self.print_contents(self.persons.get_meetings_history(person))
+                                    self.print_contents([format_datetimes(x, self.persons.current_timezone) for x in self.persons.get_meetings_history(person)])
                                     slots_len = len(self.persons.get_meetings_history(person))
                                     if (slots_len > 0):
                                         self.print_page_subtitle(f"Remove Which Meetings (Separated by Space)(Enter '' to go back) for: {person.first_name} {person.last_name} #{person.id}: ")
@@ -281,12 +293,22 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
             user_input = input("...Press Enter to Continue...")
         elif (self.current == "plan_meeting"):
             self.print_page_title("PLAN MEETING [Find Availability Intersections & Commit]")
-            intersections = self.persons.get_intersecting_availability()
+            n_selected = len(self.persons.selected_persons)
+            quorum = n_selected
+            if (n_selected > 2):
+                self.print_page_subtitle(f"Minimum Participants Available (2-{n_selected})(Enter '' for all {n_selected}): ")
+                user_input = input()
+                if (user_input.isnumeric()) and (2 <= int(user_input) <= n_selected):
+                    quorum = int(user_input)
+            if (quorum < n_selected):
+                intersections = self.persons.get_quorum_availability(quorum)
+            else:
+                intersections = self.persons.get_intersecting_availability()
             if not intersections:
                 print("No intersections found for the selected persons.")
             else:
                 self.print_page_subtitle(f"Intersections Found [{len(intersections)}]:")
-                planned = Functions_Plan_Meeting_Ui_Admin(self.persons, intersections).run()
+                planned = Functions_Plan_Meeting_Ui_Admin(self.persons, intersections, n_selected=n_selected).run()
                 if planned:
                     for item in planned:
                         self.persons.append_selected_intersection(item)
@@ -307,7 +329,7 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
             items = active[-LIMIT:]
             if items:
                 for x in items:
-                    print(f"- {x}")
+                    print(f"- {format_datetimes(x, self.persons.current_timezone)}")
             else:
                 print("- (none)")
 
@@ -316,7 +338,7 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
             items = commitments[-LIMIT:]
             if items:
                 for x in items:
-                    print(f"- {x}")
+                    print(f"- {format_datetimes(x, self.persons.current_timezone)}")
             else:
                 print("- (none)")
 
@@ -325,12 +347,21 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
             items = meetings_history[-LIMIT:]
             if items:
                 for x in items:
-                    print(f"- {x}")
+                    print(f"- {format_datetimes(x, self.persons.current_timezone)}")
             else:
                 print("- (none)")
 
             self.current = "mainmenu"
             user_input = input("...Press Enter to Continue...")
+        elif (self.current == "print_query_stats"):
+            self.print_page_title("PRINT QUERY STATS")
+            if (database.instrumentation_enabled()):
+                database.print_query_stats()
+                print(f"[OK] Query stats dumped -> {database.dump_query_stats()}")
+            else:
+                print("Query instrumentation is off (set instrument_queries = True in run_admin.py).")
+            self.current = "mainmenu"
+            user_input = input("...Press Enter to Continue...")
         elif (self.current == "toggle_debug_outputs"):
             self.print_page_title("TOGGLE DEBUG OUTPUTS")
             self.persons.print_debug = False if (self.persons.print_debug) else True
@@ -342,14 +373,23 @@ class Functions_Cmd_Ui_Admin(): # DEMO ONLY - this is <ideal design
             exit_now = True
             self.print_page_title("EXIT")
             print("Exiting...")
+            if (database.instrumentation_enabled()):
+                database.dump_query_stats()
         return exit_now
 
 
 def run_admin():
     print("============================== Create Objects ==============================")
-    persons = Persons(current_timezone)
+    if (instrument_queries):
+        database.enable_instrumentation(slow_query_ms)
+    persons = Persons(current_timezone, db_profile, write_behind_seconds)
+    scheduler = PromotionScheduler(persons, promotion_tick_seconds).start() if (promotion_tick_seconds) else None
     print("============================== Init UI ==============================")
-    Functions_Cmd_Ui_Admin(persons, print_debug=False, clear_console=True)
+    try:
+        Functions_Cmd_Ui_Admin(persons, print_debug=False, clear_console=True, scheduler=scheduler)
+    finally:
+        scheduler.stop() if (scheduler is not None) else False
+        persons.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,1044 @@
+"""
+run_benchmarks.py
+================================
+Performance checks for the database layer and the scheduling engines.
+
+Every benchmark runs against a throwaway SQLite file in a temporary
+directory, so data_pilot/scheduler.db is never touched.
+
+Run from project root:
+    python run_benchmarks.py
+"""
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from classes.interval import Interval, ids_to_str
+from classes.interval_set import IntervalSet
+from classes.bitmaps import BitmapGrid
+from classes import intersections
+from classes.intersections import sweep_intersections, sweep_quorum_intersections, batch_intersections
+from classes.person import Person
+from classes.persons import Persons
+from classes.promotion_scheduler import PromotionScheduler
+from classes.timestamps import epoch_to_utc_text
+from db import database
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+SEP  = "=" * 60
+LINE = "-" * 60
+
+def _section(title: str):
+    print(f"\n{SEP}\n  {title}\n{SEP}")
+
+def _sub(label: str):
+    print(f"\n{LINE}\n  {label}\n{LINE}")
+
+def _use_temp_db(tmp_dir: str, name: str):
+    """Points the database layer at a fresh file inside tmp_dir."""
+    database.DB_PATH = os.path.join(tmp_dir, name)
+
+def _make_persons(tmp_dir: str, name: str, n_persons: int) -> Persons:
+    """Fresh temp DB with n_persons registered users; returns the loaded Persons."""
+    _use_temp_db(tmp_dir, name)
+    persons = Persons("UTC")
+    for i in range(n_persons):
+        persons.register_person({
+            "role": "teacher" if (i == 0) else "student",
+            "first_name": f"Bench{i}", "last_name": "User", "family_id": "",
+            "date_registered": "2026-01-01", "date_of_birth": "2000-01-01",
+            "address": f"{i} Bench Street", "phone_number": f"+1 555-{i:07d}",
+            "email": f"bench{i}@bench.fake", "rate": "50.0", "balance": "0",
+            "timezone": "UTC", "comments": "",
+        })
+    return persons
+
+def _slots(n_slots: int, start: datetime, step_minutes: int = 60, length_minutes: int = 30):
+    """n_slots disjoint (start, end) datetime pairs, step_minutes apart."""
+    return [(start + timedelta(minutes=i * step_minutes),
+             start + timedelta(minutes=i * step_minutes + length_minutes)) for i in range(n_slots)]
+
+
+# ---------------------------------------------------------------------------
+# Schema: query plans before/after migrations
+# ---------------------------------------------------------------------------
+
+def bench_query_plans(tmp_dir: str):
+    _section("Query plans — without secondary indexes vs. latest migrations")
+
+    _sub("Before: latest columns, secondary indexes dropped")
+    _use_temp_db(tmp_dir, "query_plans_before.db")
+    database.init_db()
+    for row in database.fetch_all("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'"):
+        database.execute(f"DROP INDEX {row['name']}")
+    before = database.check_query_plans()
+    database.print_query_plans()
+
+    _sub(f"After: schema v{database.SCHEMA_VERSION}")
+    _use_temp_db(tmp_dir, "query_plans_after.db")
+    database.init_db()
+    after = database.check_query_plans()
+    database.print_query_plans()
+
+    _sub("Summary")
+    for (name, _, uses_before), (_, _, uses_after) in zip(before, after):
+        print(f"  {name:<28} before: {'index' if uses_before else 'SCAN':<6} after: {'index' if uses_after else 'SCAN'}")
+    assert all(uses_index for _, _, uses_index in after), "a hot query still scans a full table"
+
+
+# ---------------------------------------------------------------------------
+# Performance profiles: commit latency + WAL reader concurrency
+# ---------------------------------------------------------------------------
+
+def bench_profiles(tmp_dir: str, rows: int = 2000):
+    _section(f"Performance profiles — {rows} single-row commits, then 1 transaction")
+    for name in database.PROFILES:
+        _use_temp_db(tmp_dir, f"profile_{name}.db")
+        database.init_db(profile=name)
+        database.execute("INSERT INTO users (id, role, first_name, last_name, date_of_birth, timezone) "
+                         "VALUES (0, 'student', 'Bench', 'User', '2000-01-01', 'UTC')")
+        t0 = time.perf_counter()
+        for i in range(rows):
+            database.execute("INSERT INTO user_availabilities (user_id, start_utc, end_utc) VALUES (?,?,?)",
+                             (0, f"{i:08d}", f"{i+1:08d}"))
+        per_commit = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        with database.transaction():
+            for i in range(rows):
+                database.execute("INSERT INTO user_availabilities (user_id, start_utc, end_utc) VALUES (?,?,?)",
+                                 (0, f"{i:08d}", f"{i+1:08d}"))
+        one_tx = time.perf_counter() - t0
+        print(f"  {name:<10} per-statement commits: {per_commit*1000:8.1f} ms   one transaction: {one_tx*1000:8.1f} ms")
+    database.set_profile(database.DEFAULT_PROFILE)
+
+    _sub("WAL: a reader thread is not blocked by an open write transaction")
+    result = {}
+    def reader():
+        t0 = time.perf_counter()
+        result["rows"] = database.fetch_one("SELECT COUNT(*) AS n FROM user_availabilities")["n"]
+        result["ms"] = (time.perf_counter() - t0) * 1000
+        database.get_pool().release()
+    with database.transaction():
+        database.execute("DELETE FROM user_availabilities")
+        thread = threading.Thread(target=reader)
+        thread.start()
+        thread.join(timeout=5)
+    print(f"  reader saw {result.get('rows')} committed rows in {result.get('ms', float('nan')):.1f} ms while the writer held its transaction")
+    assert result.get("rows") == rows * 2, "reader was blocked or saw uncommitted data"
+
+
+# ---------------------------------------------------------------------------
+# Dual-write sync: full rewrite vs. incremental (delta) writes
+# ---------------------------------------------------------------------------
+
+def _db_schedule(user_id):
+    """This user's availability ranges and participant keys as stored in the DB."""
+    return (
+        sorted((r["start_ts"], r["end_ts"]) for r in database.fetch_all(
+            "SELECT start_ts, end_ts FROM user_availabilities WHERE user_id=?", (user_id,))),
+        {r[0] for r in database.fetch_all("SELECT commitment_id FROM commitment_participants WHERE user_id=?", (user_id,))},
+        {r[0] for r in database.fetch_all("SELECT meeting_id FROM meeting_participants WHERE user_id=?", (user_id,))},
+    )
+
+def _rows_written():
+    return sum(x["rows"] for x in database.query_stats() if x["sql"].split(" ")[0] in ("INSERT", "DELETE"))
+
+def bench_sync(tmp_dir: str, n_slots: int = 2000, n_edits: int = 200, n_ops: int = 400):
+    _section(f"Person sync — full rewrite vs. incremental delta ({n_slots} intervals per person)")
+    persons = _make_persons(tmp_dir, "sync.db", 1)
+    person = persons.persons[0]
+    start = datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC"))
+    rows = [(epoch_to_utc_text(int(s.timestamp())), epoch_to_utc_text(int(e.timestamp())), int(s.timestamp()), int(e.timestamp()))
+            for s, e in _slots(n_slots, start)]
+    with database.transaction():  # one commitments / meetings row per slot, so the participant syncs have keys to write
+        database.execute_many("INSERT INTO commitments (start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?)", rows)
+        database.execute_many("INSERT INTO meetings (start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?)", rows)
+        database.execute("INSERT INTO commitment_participants (commitment_id, user_id) SELECT commitment_id, ? FROM commitments", (person.id,))
+        database.execute("INSERT INTO meeting_participants (meeting_id, user_id, attended) SELECT meeting_id, ?, 1 FROM meetings", (person.id,))
+    person = Person([getattr(person, a) for a in persons.person_attributes])
+    person.availability = list(person.commitments)
+
+    _sub("Full rewrite (no delta)")
+    for name, sync in [("_sync_availability_to_db", person._sync_availability_to_db),
+                       ("_sync_commitment_to_db", person._sync_commitment_to_db),
+                       ("_sync_meeting_to_db", person._sync_meeting_to_db)]:
+        t0 = time.perf_counter()
+        sync()
+        print(f"  {name:<26} {(time.perf_counter() - t0) * 1000:8.1f} ms")
+    assert database.fetch_one("SELECT COUNT(*) FROM commitment_participants")[0] == n_slots
+    assert database.fetch_one("SELECT COUNT(*) FROM meeting_participants")[0] == n_slots
+
+    _sub(f"{n_edits} single-slot availability edits (create + remove each)")
+    edits = [(start + timedelta(minutes=60 * i + 40), start + timedelta(minutes=60 * i + 50)) for i in range(0, n_slots, n_slots // n_edits)]
+    database.enable_instrumentation(slow_query_ms=float("inf"))
+    try:
+        for label, full in (("full rewrite", True), ("delta", False)):
+            database.reset_query_stats()
+            t0 = time.perf_counter()
+            for s, e in edits:
+                if (full):  # the edit in memory, then every row rewritten
+                    person._create_datetime(person.availability, s, e)
+                    person._sync_availability_to_db()
+                    person._remove_datetime(person.availability, s, e)
+                    person._sync_availability_to_db()
+                else:
+                    person.create_availability(s, e)
+                    person.remove_availability(s, e)
+            elapsed = time.perf_counter() - t0
+            print(f"  {label:<12} {elapsed / (2 * len(edits)) * 1000:8.3f} ms per edit   {_rows_written() / (2 * len(edits)):8.1f} rows written per edit")
+    finally:
+        database.disable_instrumentation()
+        database.reset_query_stats()
+
+    _sub(f"Differential check — {n_ops} random edits, DB rows vs. in-memory state after each")
+    rng = random.Random(23)
+    base_ts = int(start.timestamp())
+    for i in range(n_ops):
+        s = base_ts + rng.randrange(n_slots * 4) * 900
+        e = s + rng.randint(1, 12) * 900
+        op = rng.choice(("create_availability", "remove_availability", "remove_commitment", "remove_meeting"))
+        getattr(person, op)(s, e)
+        stored = _db_schedule(person.id)
+        expected = ([(x.start_ts, x.end_ts) for x in person.availability], set(person._commitment_rows), set(person._meeting_rows))
+        assert stored == expected, f"DB differs from memory after {op}({s}, {e}) (edit {i + 1})"
+    print(f"  {n_ops} edits: availability rows, commitment and meeting participant rows identical to memory "
+          f"({len(person.availability)} / {len(person._commitment_rows)} / {len(person._meeting_rows)} left)")
+
+
+# ---------------------------------------------------------------------------
+# Startup: per-person queries vs. bulk hydration
+# ---------------------------------------------------------------------------
+
+def bench_startup(tmp_dir: str, n_users: int = 5000, slots_per_user: int = 4):
+    _section(f"Startup — {n_users} users x {slots_per_user} availability slots / commitments / balance entries")
+    _use_temp_db(tmp_dir, "startup.db")
+    database.init_db()
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+    with database.use_profile("bulk-load"), database.transaction():
+        database.execute_many(
+            "INSERT INTO users (id, role, first_name, last_name, date_of_birth, timezone) VALUES (?, 'student', ?, 'User', '2000-01-01', 'UTC')",
+            [(u, f"Bench{u}") for u in range(n_users)])
+        slots = [(epoch_to_utc_text(s), epoch_to_utc_text(s + 1800), s, s + 1800)
+                 for s in range(start, start + slots_per_user * 3600, 3600)]
+        database.execute_many(
+            "INSERT INTO user_availabilities (user_id, start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?,?)",
+            [(u, *slot) for u in range(n_users) for slot in slots])
+        database.execute_many(
+            "INSERT INTO commitments (start_utc, end_utc, start_ts, end_ts) VALUES (?,?,?,?)", slots)
+        database.execute(
+            "INSERT INTO commitment_participants (commitment_id, user_id) SELECT c.commitment_id, u.id FROM commitments c, users u")
+        database.execute_many(
+            "INSERT INTO balance_history (user_id, associate_ids, start_utc, end_utc, start_ts, end_ts, amount, balance_after) VALUES (?,'',?,?,?,?,-50,-50)",
+            [(u, *slot) for u in range(n_users) for slot in slots])
+
+    database.enable_instrumentation(slow_query_ms=float("inf"))
+    try:
+        database.reset_query_stats()
+        t0 = time.perf_counter()
+        persons = Persons("UTC")
+        bulk_s = time.perf_counter() - t0
+        bulk_queries = sum(x["calls"] for x in database.query_stats())
+
+        database.reset_query_stats()
+        t0 = time.perf_counter()
+        per_person = [Person([getattr(p, a) for a in persons.person_attributes]) for p in persons.persons]
+        per_person_s = time.perf_counter() - t0
+        per_person_queries = sum(x["calls"] for x in database.query_stats())
+    finally:
+        database.disable_instrumentation()
+        database.reset_query_stats()
+
+    print(f"  per-person queries: {per_person_s*1000:8.1f} ms  ({per_person_queries} queries, Person loads only)")
+    print(f"  bulk hydration:     {bulk_s*1000:8.1f} ms  ({bulk_queries} queries, whole Persons() startup)")
+    attrs = ("availability", "commitments", "meetings_history", "balance_history")
+    assert all(getattr(a, x) == getattr(b, x) for a, b in zip(persons.persons, per_person) for x in attrs), \
+        "bulk hydration loaded different data than the per-person queries"
+
+
+# ---------------------------------------------------------------------------
+# Memory: slotted Person + Interval vs. the legacy dict / list-of-strings model
+# ---------------------------------------------------------------------------
+
+class _LegacyPerson():
+    """The pre-__slots__ Person layout: every field a str in __dict__, intervals as [id_str, start, end] lists."""
+    def __init__(self, items):
+        (self.role, self.first_name, self.last_name, self.id, self.family_id, self.date_registered,
+         self.date_of_birth, self.address, self.phone_number, self.email, self.rate, self.balance,
+         self.timezone, self.comments) = [str(x) for x in items]
+        self.availability, self.commitments, self.meetings_history, self.balance_history = [], [], [], []
+
+def _traced_bytes(build):
+    """Bytes still allocated by build() (its return value is kept alive while measuring)."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+def bench_memory(n_intervals: int = 100_000, n_persons: int = 1_000):
+    _section(f"Memory — {n_persons} persons holding {n_intervals} availability intervals")
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+    per_person = n_intervals // n_persons
+    items = [["student", f"Bench{u}", "User", u, u, "2026-01-01", "2000-01-01", f"{u} Bench Street",
+              f"+1 555-{u:07d}", f"bench{u}@bench.fake", 50.0, 0.0, "UTC", ""] for u in range(n_persons)]
+
+    def legacy_persons():
+        return [_LegacyPerson(x) for x in items]
+    def slotted_persons():
+        return [Person(x, schedule=([], [])) for x in items]
+    def legacy_intervals():
+        persons = legacy_persons()
+        for p in persons:
+            # as the legacy loader built them: str(row["user_id"]) allocates a fresh id string per row
+            user_id = int(p.id)
+            p.availability = [[str(user_id), start + i * 3600, start + i * 3600 + 1800] for i in range(per_person)]
+        return persons
+    def slotted_intervals():
+        persons = slotted_persons()
+        for p in persons:
+            p.availability = [Interval(p._ids, start + i * 3600, start + i * 3600 + 1800) for i in range(per_person)]
+        return persons
+
+    legacy_p, slotted_p = _traced_bytes(legacy_persons), _traced_bytes(slotted_persons)
+    legacy_i, slotted_i = _traced_bytes(legacy_intervals) - legacy_p, _traced_bytes(slotted_intervals) - slotted_p
+    print(f"  {'':<26} {'legacy':>12} {'slotted':>12}")
+    print(f"  {'bytes per person':<26} {legacy_p / n_persons:12.0f} {slotted_p / n_persons:12.0f}")
+    print(f"  {'bytes per interval':<26} {legacy_i / n_intervals:12.0f} {slotted_i / n_intervals:12.0f}")
+    print(f"  {'total':<26} {(legacy_p + legacy_i) / 2**20:10.1f}MB {(slotted_p + slotted_i) / 2**20:10.1f}MB")
+
+
+# ---------------------------------------------------------------------------
+# Interval insert: IntervalSet (bisect merge) vs. the legacy list scan
+# ---------------------------------------------------------------------------
+
+def _legacy_create_datetime(datetimes_list, ids, start_ts, end_ts):
+    """The pre-IntervalSet Person._create_datetime (debug prints dropped): full scan, merge, re-sort."""
+    a_split = [ids, start_ts, end_ts]
+    if (a_split in datetimes_list):
+        return
+    datetime_to_remove = []
+    for _, start_ts_old, end_ts_old in datetimes_list:
+        if (start_ts <= start_ts_old) and (end_ts >= end_ts_old):
+            datetime_to_remove.append([ids, start_ts_old, end_ts_old])
+        elif (start_ts_old <= start_ts <= end_ts_old) or (start_ts_old <= end_ts <= end_ts_old):
+            if (start_ts <= start_ts_old) and (end_ts <= end_ts_old):
+                end_ts = end_ts_old
+                datetime_to_remove.append([ids, start_ts_old, end_ts_old])
+            elif (start_ts >= start_ts_old) and (end_ts >= end_ts_old):
+                start_ts = start_ts_old
+                datetime_to_remove.append([ids, start_ts_old, end_ts_old])
+            elif (start_ts >= start_ts_old) and (end_ts <= end_ts_old):
+                start_ts, end_ts = start_ts_old, end_ts_old
+    for x in datetime_to_remove:
+        datetimes_list.remove(x)
+    if ([ids, start_ts, end_ts] not in datetimes_list):
+        datetimes_list.append([ids, start_ts, end_ts])
+    datetimes_list.sort()
+
+def bench_interval_insert(n_slots: int = 10_000, n_legacy: int = 2_000):
+    _section(f"Interval insert — {n_slots} slots into one person (random order, ~10% overlapping)")
+    rng = random.Random(0)
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+    slots = []
+    for i in range(n_slots):
+        s = start + i * 3600
+        slots.append((s, s + (5400 if (rng.random() < 0.1) else 1800)))  # 90-min slots spill into the next hour
+    rng.shuffle(slots)
+    person = Person(["student", "Bench", "User", 0, 0, "2026-01-01", "2000-01-01", "", "", "", 50.0, 0.0, "UTC", ""],
+                    schedule=([], []))
+
+    results = {}
+    for label, n in [("legacy list", n_legacy), ("IntervalSet", n_legacy), ("IntervalSet", n_slots)]:
+        if (label == "legacy list"):
+            intervals = []
+            t0 = time.perf_counter()
+            for s, e in slots[:n]:
+                _legacy_create_datetime(intervals, person._ids, s, e)
+        else:
+            person.availability = []
+            intervals = person.availability
+            t0 = time.perf_counter()
+            for s, e in slots[:n]:
+                person._create_datetime(intervals, s, e)
+        elapsed = time.perf_counter() - t0
+        results[(label, n)] = [(x[1], x[2]) for x in intervals]
+        print(f"  {label:<12} {n:>6} inserts: {elapsed*1000:9.1f} ms  ({elapsed / n * 1e6:7.1f} us/insert) -> {len(intervals)} intervals")
+    assert results[("legacy list", n_legacy)] == results[("IntervalSet", n_legacy)], "IntervalSet merged differently from the legacy scan"
+
+
+# ---------------------------------------------------------------------------
+# Interval removal: single-pass subtraction vs. the legacy split + re-insert
+# ---------------------------------------------------------------------------
+
+def _legacy_remove_datetime(datetimes_list, ids, start_ts, end_ts):
+    """The pre-IntervalSet Person._remove_datetime: collect fragments, remove, re-insert each via create."""
+    datetime_to_remove, datetime_to_add = [], []
+    for _, start_ts_old, end_ts_old in datetimes_list:
+        if (start_ts <= start_ts_old) and (end_ts >= end_ts_old):
+            datetime_to_remove.append([ids, start_ts_old, end_ts_old])
+        elif (start_ts_old <= start_ts <= end_ts_old) or (start_ts_old <= end_ts <= end_ts_old):
+            datetime_to_remove.append([ids, start_ts_old, end_ts_old])
+            if (start_ts <= start_ts_old) and (end_ts <= end_ts_old):
+                datetime_to_add.append([end_ts, end_ts_old])
+            elif (start_ts >= start_ts_old) and (end_ts >= end_ts_old):
+                datetime_to_add.append([start_ts_old, start_ts])
+            elif (start_ts >= start_ts_old) and (end_ts <= end_ts_old):
+                datetime_to_add += [[start_ts_old, start_ts], [end_ts, end_ts_old]]
+    for x in datetime_to_remove:
+        if (x in datetimes_list):
+            datetimes_list.remove(x)
+    for s, e in datetime_to_add:
+        _legacy_create_datetime(datetimes_list, ids, s, e)
+    datetimes_list.sort()
+
+def bench_interval_remove(n_slots: int = 2_000, n_removals: int = 500, n_trials: int = 200):
+    _section(f"Interval removal — {n_removals} random ranges out of {n_slots} dense slots")
+    rng = random.Random(1)
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+    person = Person(["student", "Bench", "User", 0, 0, "2026-01-01", "2000-01-01", "", "", "", 50.0, 0.0, "UTC", ""],
+                    schedule=([], []))
+    ids = person._ids
+
+    _sub(f"Differential check — {n_trials} random sets vs. the legacy split + re-insert")
+    for _ in range(n_trials):
+        slots = [(s, s + rng.randint(1, 6) * 900) for s in sorted(rng.sample(range(start, start + 400 * 900, 900), 30))]
+        cuts = [(s, s + rng.randint(0, 12) * 900) for s in (rng.randrange(start, start + 400 * 900, 300) for _ in range(8))]
+        legacy = []
+        for s, e in slots:
+            _legacy_create_datetime(legacy, ids, s, e)
+        person.availability = legacy
+        single, bulk = person.availability, IntervalSet(ids, person.availability)
+        for s, e in cuts:
+            _legacy_remove_datetime(legacy, ids, s, e)
+            person._remove_datetime(single, s, e)
+        person._remove_datetimes(bulk, cuts)
+        expected = [(x[1], x[2]) for x in legacy]
+        assert [(x[1], x[2]) for x in single] == expected, "subtract() differs from the legacy removal"
+        assert [(x[1], x[2]) for x in bulk] == expected, "remove_many() differs from the legacy removal"
+    print(f"  {n_trials} trials: subtract() and remove_many() match the legacy removal")
+
+    _sub("Timing")
+    slots = [(start + i * 3600, start + i * 3600 + 3000) for i in range(n_slots)]
+    cuts = [(s, s + rng.randint(1, 48) * 900) for s in (rng.randrange(start, start + n_slots * 3600, 900) for _ in range(n_removals))]
+    legacy = [[ids, s, e] for s, e in slots]
+    t0 = time.perf_counter()
+    for s, e in cuts:
+        _legacy_remove_datetime(legacy, ids, s, e)
+    legacy_s = time.perf_counter() - t0
+    person.availability = slots_set = [Interval(ids, s, e) for s, e in slots]
+    t0 = time.perf_counter()
+    for s, e in cuts:
+        person._remove_datetime(person.availability, s, e)
+    single_s = time.perf_counter() - t0
+    single = [(x[1], x[2]) for x in person.availability]
+    person.availability = slots_set
+    t0 = time.perf_counter()
+    person._remove_datetimes(person.availability, cuts)
+    bulk_s = time.perf_counter() - t0
+    assert single == [(x[1], x[2]) for x in person.availability] == [(x[1], x[2]) for x in legacy]
+    print(f"  legacy split + re-insert : {legacy_s*1000:9.1f} ms")
+    print(f"  subtract() per range     : {single_s*1000:9.1f} ms")
+    print(f"  remove_many() one pass   : {bulk_s*1000:9.1f} ms")
+
+
+# ---------------------------------------------------------------------------
+# Intersections: sweep-line engine vs. the legacy pairwise nested loops
+# ---------------------------------------------------------------------------
+
+def _legacy_intersections(availabilities):
+    """The pre-sweep Persons.get_intersecting_availability core: pairwise nested loops."""
+    intersections = availabilities[0]
+    for next_availability in availabilities[1:]:
+        this_intersections = []
+        for cid, c_start, c_end in intersections:
+            for nid, n_start, n_end in next_availability:
+                start = max(c_start, n_start)
+                end = min(c_end, n_end)
+                if start < end:
+                    this_intersections.append(Interval(cid + nid, start, end))
+        intersections = this_intersections
+        if not intersections:
+            break
+    return list(intersections)
+
+def _random_availabilities(rng, n_persons, n_slots, start, span_slots, slot_seconds=900):
+    """n_persons IntervalSets of up to n_slots random slots (1-8 x slot_seconds) within span_slots."""
+    availabilities = []
+    for p in range(n_persons):
+        slots = []
+        for s in rng.sample(range(span_slots), min(n_slots, span_slots)):
+            ts = start + s * slot_seconds
+            slots.append(Interval((p,), ts, ts + rng.randint(1, 8) * slot_seconds))
+        availabilities.append(IntervalSet((p,), slots))
+    return availabilities
+
+def bench_intersections(n_trials: int = 500, sizes=((2, 300), (5, 300), (10, 300), (20, 300), (40, 300))):
+    _section("Intersections — sweep-line engine vs. legacy pairwise loops")
+    rng = random.Random(2)
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+
+    _sub(f"Differential check — {n_trials} random groups")
+    for _ in range(n_trials):
+        availabilities = _random_availabilities(rng, rng.randint(2, 6), rng.randint(0, 25), start, 200)
+        assert sweep_intersections(availabilities) == _legacy_intersections(availabilities), \
+            "sweep_intersections differs from the pairwise intersection"
+    print(f"  {n_trials} groups (2-6 persons, 0-25 slots each): identical [ids, start, end] results")
+
+    _sub("Scaling (persons x slots per person)")
+    for n_persons, n_slots in sizes:
+        # dense, mostly-free calendars so the group still has common windows
+        availabilities = _random_availabilities(rng, n_persons, n_slots, start, n_slots * 2)
+        t0 = time.perf_counter()
+        legacy = _legacy_intersections(availabilities)
+        legacy_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        swept = sweep_intersections(availabilities)
+        sweep_s = time.perf_counter() - t0
+        assert swept == legacy
+        print(f"  {n_persons:>3} x {n_slots:<4} legacy: {legacy_s*1000:9.1f} ms   sweep: {sweep_s*1000:7.1f} ms   ({len(swept)} windows)")
+
+
+# ---------------------------------------------------------------------------
+# Quorum intersections: single sweep vs. brute-force segment scan
+# ---------------------------------------------------------------------------
+
+def _brute_quorum_intersections(availabilities, quorum):
+    """Reference: test every elementary segment between boundaries, then merge neighbours with the same free set."""
+    bounds = sorted({ts for availability in availabilities for _, s, e in availability if s < e for ts in (s, e)})
+    windows = []
+    for seg_start, seg_end in zip(bounds, bounds[1:]):
+        free = tuple(x for availability in availabilities
+                     if any(s <= seg_start and seg_end <= e for _, s, e in availability)
+                     for x in availability.ids)
+        if (len(free) < quorum):
+            continue
+        if windows and (windows[-1].ids == free) and (windows[-1].end_ts == seg_start):
+            windows[-1] = Interval(free, windows[-1].start_ts, seg_end)
+        else:
+            windows.append(Interval(free, seg_start, seg_end))
+    return windows
+
+def bench_quorum(n_trials: int = 300, sizes=((5, 300), (10, 300), (20, 300), (40, 300))):
+    _section("Quorum intersections — at least k of n available, single sweep")
+    rng = random.Random(3)
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+
+    _sub(f"Differential check — {n_trials} random groups")
+    for _ in range(n_trials):
+        n_persons = rng.randint(2, 6)
+        availabilities = _random_availabilities(rng, n_persons, rng.randint(0, 25), start, 200)
+        quorum = rng.randint(1, n_persons)
+        assert sweep_quorum_intersections(availabilities, quorum) == _brute_quorum_intersections(availabilities, quorum), \
+            "sweep_quorum_intersections differs from the brute-force segment check"
+        assert sweep_quorum_intersections(availabilities, n_persons) == sweep_intersections(availabilities), \
+            "quorum == n should equal the all-available intersection"
+    print(f"  {n_trials} groups (2-6 persons, random quorum): identical to brute force; quorum == n matches sweep_intersections")
+
+    _sub("Scaling (persons x slots per person, quorum = half)")
+    for n_persons, n_slots in sizes:
+        availabilities = _random_availabilities(rng, n_persons, n_slots, start, n_slots * 2)
+        t0 = time.perf_counter()
+        windows = sweep_quorum_intersections(availabilities, n_persons // 2)
+        sweep_s = time.perf_counter() - t0
+        print(f"  {n_persons:>3} x {n_slots:<4} sweep: {sweep_s*1000:7.1f} ms   ({len(windows)} windows)")
+
+
+# ---------------------------------------------------------------------------
+# Bitmap engine: 15-minute bitsets vs. the sweep line
+# ---------------------------------------------------------------------------
+
+def bench_bitmaps(tmp_dir: str, n_trials: int = 300, sizes=((50, 40), (200, 40), (500, 40)), horizon_days: int = 90):
+    _section("Bitmap engine — 15-minute bitsets vs. sweep line")
+    rng = random.Random(4)
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+    grid = BitmapGrid(start, horizon_days * 96)
+
+    _sub(f"Differential check — {n_trials} random groups on 15-minute-aligned slots")
+    for _ in range(n_trials):
+        n_persons = rng.randint(2, 6)
+        availabilities = _random_availabilities(rng, n_persons, rng.randint(0, 25), start, 200)
+        commitments = _random_availabilities(rng, n_persons, rng.randint(0, 5), start, 200)
+        free = []
+        for availability, busy in zip(availabilities, commitments):
+            availability = IntervalSet(availability.ids, availability)
+            availability.remove_many(busy)
+            free.append(availability)
+        bitmaps = [grid.bitmap(a, c) for a, c in zip(availabilities, commitments)]
+        assert grid.windows(grid.intersect(bitmaps), tuple(range(n_persons))) == sweep_intersections(free), \
+            "bitmap intersection differs from the sweep line"
+        quorum = rng.randint(1, n_persons)
+        assert grid.quorum_windows(bitmaps, [x.ids for x in free], quorum) == sweep_quorum_intersections(free, quorum), \
+            "bitmap quorum differs from the sweep line"
+    print(f"  {n_trials} groups (availability minus commitments, random quorum): identical windows")
+
+    _sub("Cache invalidation (Person.free_bitmap)")
+    persons = _make_persons(tmp_dir, "bench_bitmaps.db", 2)
+    person = persons.persons[0]
+    day = datetime.now(ZoneInfo("UTC")).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    person_grid = persons.get_bitmap_grid()
+    before = person.free_bitmap(person_grid)
+    person.create_availability(day, day + timedelta(hours=1))
+    after_create = person.free_bitmap(person_grid)
+    person.create_commitment(day, day + timedelta(minutes=15))
+    after_commit = person.free_bitmap(person_grid)
+    assert before == 0 and bin(after_create).count("1") == 4 and bin(after_commit).count("1") == 3
+    print(f"  free buckets: {bin(before).count('1')} -> create_availability 1h: {bin(after_create).count('1')}"
+          f" -> create_commitment 15m: {bin(after_commit).count('1')}")
+
+    _sub(f"Scaling (persons x slots per person, {horizon_days}-day horizon)")
+    for n_persons, n_slots in sizes:
+        # wide calendars: everyone free most of the first week, so the group still has common windows
+        availabilities = [IntervalSet((p,), [Interval((p,), start, start + 7 * 86400)]) for p in range(n_persons)]
+        for p, availability in enumerate(availabilities):
+            busy = _random_availabilities(rng, 1, n_slots, start, 96 * horizon_days)[0]
+            availability.remove_many(busy)
+        quorum = n_persons * 9 // 10
+        t0 = time.perf_counter()
+        swept = sweep_intersections(availabilities)
+        sweep_all_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        swept_quorum = sweep_quorum_intersections(availabilities, quorum)
+        sweep_quorum_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        bitmaps = [grid.bitmap(x) for x in availabilities]
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        windows = grid.windows(grid.intersect(bitmaps), tuple(range(n_persons)))
+        bitmap_all_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        quorum_mask = grid.quorum(bitmaps, quorum)
+        count_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        quorum_windows = grid.quorum_windows(bitmaps, [x.ids for x in availabilities], quorum)
+        annotated_s = time.perf_counter() - t0
+        assert windows == swept and quorum_windows == swept_quorum
+        print(f"  {n_persons:>3} x {n_slots:<3} build {build_s*1000:5.1f} ms | all free: sweep {sweep_all_s*1000:6.1f} ms, "
+              f"bitmap {bitmap_all_s*1000:5.1f} ms | >= 90%: sweep {sweep_quorum_s*1000:6.1f} ms, "
+              f"bitmap count {count_s*1000:5.1f} ms, annotated {annotated_s*1000:6.1f} ms "
+              f"({len(windows)} / {len(quorum_windows)} windows)")
+
+
+# ---------------------------------------------------------------------------
+# Batch intersections: many candidate groups per call
+# ---------------------------------------------------------------------------
+
+def bench_batch(n_trials: int = 200, n_teachers: int = 20, n_students: int = 200, slots: int = 60):
+    engine = f"NumPy {intersections.np.__version__}" if (intersections.np is not None) else "pure Python (NumPy not installed)"
+    _section(f"Batch intersections — many candidate groups per call [{engine}]")
+    rng = random.Random(5)
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+
+    _sub(f"Differential check — {n_trials} batches of overlapping groups")
+    for _ in range(n_trials):
+        pool = _random_availabilities(rng, 8, rng.randint(0, 25), start, 200)
+        groups = [rng.sample(pool, rng.randint(1, 6)) for _ in range(rng.randint(1, 10))]
+        assert batch_intersections(groups) == [sweep_intersections(x) for x in groups], \
+            "batch_intersections differs from per-group sweep_intersections"
+    print(f"  {n_trials} batches (1-10 groups of 1-6 persons sharing a pool of 8): identical per-group results")
+
+    _sub(f"Throughput — {n_teachers} teachers x {n_students} students ({slots} slots each)")
+    teachers = _random_availabilities(rng, n_teachers, slots, start, slots * 4)
+    students = _random_availabilities(rng, n_students, slots, start, slots * 4)
+    for label, groups in (
+        ("pairs (teacher, student)", [[t, x] for t in teachers for x in students]),
+        ("groups of 5 (teacher + 4)", [[t] + rng.sample(students, 4) for t in teachers for _ in range(n_students // 4)]),
+    ):
+        t0 = time.perf_counter()
+        looped = [sweep_intersections(x) for x in groups]
+        loop_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        batched = batch_intersections(groups)
+        batch_s = time.perf_counter() - t0
+        assert batched == looped
+        print(f"  {label:<26} {len(groups):>5} groups   per-group sweep: {len(groups)/loop_s:9.0f} groups/s   "
+              f"batch: {len(groups)/batch_s:9.0f} groups/s")
+
+
+# ---------------------------------------------------------------------------
+# Free/busy view: incremental maintenance vs. rebuild
+# ---------------------------------------------------------------------------
+
+def _scratch_free(person):
+    free = IntervalSet(person.availability.ids, person.availability)
+    free.remove_many(person.commitments)
+    return free
+
+def bench_free_view(tmp_dir: str, n_ops: int = 300, n_slots: int = 5_000, n_updates: int = 2_000):
+    _section("Free/busy view — incremental vs. rebuilt from scratch")
+    rng = random.Random(6)
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+
+    _sub(f"Differential check — {n_ops} random create/remove availability/commitment calls")
+    persons = _make_persons(tmp_dir, "bench_free_view.db", 1)
+    person = persons.persons[0]
+    person.free  # build the view, then only incremental updates from here on
+    for _ in range(n_ops):
+        s = start + rng.randrange(200) * 900
+        e = s + rng.randint(1, 12) * 900
+        op = rng.choice((person.create_availability, person.remove_availability,
+                         person.create_commitment, person.remove_commitment))
+        op(s, e)
+        assert person.free == _scratch_free(person), f"free view out of date after {op.__name__}({s}, {e})"
+    print(f"  {n_ops} calls: person.free always equals availability minus commitments "
+          f"({len(person.availability)} availability, {len(person.commitments)} commitments, {len(person.free)} free)")
+
+    _sub(f"Update cost — {n_updates} commitment changes on {n_slots} availability slots")
+    ids = (0,)
+    person.availability = [Interval(ids, start + i * 3600, start + i * 3600 + 1800) for i in range(n_slots)]
+    person.commitments = []
+    person.free
+    changes = [(start + rng.randrange(n_slots) * 3600, rng.randint(1, 4) * 900) for _ in range(n_updates)]
+    t0 = time.perf_counter()
+    for s, length in changes:
+        person.commitments.add(s, s + length)
+        person._free_remove([(s, s + length)])
+        person.commitments.remove_many([(s, s + length)])
+        person._free_add(s, s + length)
+    incremental_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for s, length in changes[:n_updates // 20]:
+        person.commitments.add(s, s + length)
+        _scratch_free(person)
+        person.commitments.remove_many([(s, s + length)])
+        _scratch_free(person)
+    rebuild_s = (time.perf_counter() - t0) * 20
+    assert person.free == _scratch_free(person)
+    print(f"  incremental: {incremental_s / (2 * n_updates) * 1e6:8.1f} µs per change   "
+          f"rebuild: {rebuild_s / (2 * n_updates) * 1e6:8.1f} µs per change")
+
+
+# ---------------------------------------------------------------------------
+# Promotion: heap-driven update() vs. the legacy scan of every commitment
+# ---------------------------------------------------------------------------
+
+def _legacy_scan(commitments, current_ts):
+    """The pre-heap update_commitments_to_meetings() gather step: every commitment checked on every update."""
+    active, crossedover = [], []
+    for commitment in commitments:
+        if (commitment.start_ts <= current_ts <= commitment.end_ts):
+            active.append(commitment)
+        if (commitment.start_ts <= current_ts) and (commitment.end_ts < current_ts):
+            crossedover.append(commitment)
+    return active, crossedover
+
+def bench_promotion(tmp_dir: str, n_commitments: int = 50_000, n_updates: int = 1_000, n_steps: int = 40):
+    _section("Promotion — heap-driven update() vs. scanning every commitment")
+    rng = random.Random(7)
+    persons = _make_persons(tmp_dir, "bench_promotion.db", 4)
+    user_ids = [x.id for x in persons.persons]
+    start = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+
+    _sub(f"Differential check — {n_steps} clock steps over 300 commitments")
+    commitments = []
+    for i in range(300):
+        s = start + rng.randrange(400) * 900
+        commitments.append(Interval((rng.choice(user_ids),), s, s + rng.randint(1, 8) * 900))
+    legacy = list(set(commitments))
+    persons.commitments = []
+    persons._queue_commitments(persons._process_write_datetimes(commitments, persons.commitments))
+    for step in range(1, n_steps + 1):
+        current_ts = start + step * 400 * 900 // n_steps + rng.randint(-450, 450)
+        persons.current_datetime = datetime.fromtimestamp(current_ts, ZoneInfo("UTC"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            persons.update_commitments_to_meetings()
+        active, crossedover = _legacy_scan(legacy, current_ts)
+        legacy = [c for c in legacy if c not in crossedover]
+        assert sorted(persons.active_meetings) == sorted(active) and sorted(persons.commitments) == sorted(legacy), \
+            f"promotion differs at step {step}"
+    print(f"  {n_steps} steps: active meetings and remaining commitments identical to the legacy scan "
+          f"({len(persons.meetings_history)} promoted)")
+
+    _sub(f"Idle update() with {n_commitments} future commitments")
+    future = [Interval((user_ids[0],), start + 10**7 + i * 900, start + 10**7 + i * 900 + 600) for i in range(n_commitments)]
+    persons.commitments = []
+    persons._queue_commitments(persons._process_write_datetimes(future, persons.commitments, sort_working_memory=False))
+    t0 = time.perf_counter()
+    for _ in range(n_updates):
+        persons.update_commitments_to_meetings()
+    heap_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(n_updates // 100):
+        _legacy_scan(persons.commitments, current_ts)
+    scan_s = (time.perf_counter() - t0) * 100
+    print(f"  heap: {heap_s / n_updates * 1e6:8.2f} µs per update   legacy scan: {scan_s / n_updates * 1e6:9.1f} µs per update")
+
+
+# ---------------------------------------------------------------------------
+# Batched promotion: one transaction, set-based id lookups, executemany writes
+# ---------------------------------------------------------------------------
+
+def bench_batch_promotion(tmp_dir: str, n_commitments: int = 2_000, n_persons: int = 6):
+    _section("Batched promotion — one transaction for a backlog of overdue commitments")
+    rng = random.Random(21)
+    persons = _make_persons(tmp_dir, "bench_batch_promotion.db", n_persons)
+    user_ids = [x.id for x in persons.persons]
+    now = datetime.now(ZoneInfo("UTC")).replace(second=0, microsecond=0)
+    start = int(now.timestamp()) - n_commitments * 3600
+    for i in range(n_commitments):  # back-to-back slots, so every person also has touching commitments
+        group = tuple(sorted(rng.sample(user_ids, rng.randint(2, 3))))
+        persons.append_selected_intersection(Interval(group, start + i * 1800, start + i * 1800 + 1800))
+    with contextlib.redirect_stdout(io.StringIO()):
+        persons.create_intersecting_commitments()
+    expected = sorted(persons.commitments)
+    balances = {x.id: x.balance for x in persons.persons}
+
+    database.enable_instrumentation(slow_query_ms=float("inf"))
+    try:
+        database.reset_query_stats()
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            persons.update_commitments_to_meetings(quiet=True)
+        promote_s = time.perf_counter() - t0
+        queries = sum(x["calls"] for x in database.query_stats())
+    finally:
+        database.disable_instrumentation()
+        database.reset_query_stats()
+
+    n_participants = sum(len(x.ids) for x in expected)
+    assert not persons.commitments and sorted(persons.meetings_history) == expected, "promoted meetings differ from the backlog"
+    assert database.fetch_one("SELECT COUNT(*) FROM meetings")[0] == n_commitments
+    assert database.fetch_one("SELECT COUNT(*) FROM meeting_participants")[0] == n_participants
+    assert database.fetch_one("SELECT COUNT(*) FROM commitment_participants")[0] == 0
+    for person in persons.persons:
+        mine = [x for x in expected if person.id in x.ids]
+        assert len(person.balance_history) == len(mine)
+        assert abs(person.balance - balances[person.id] - person.rate * len(mine)) < 1e-6 * (len(mine) + 1)
+    print(f"  {n_commitments} commitments ({n_participants} participant rows) promoted and billed in "
+          f"{promote_s*1000:.0f} ms with {queries} statements ({queries / n_commitments:.2f} per commitment)")
+
+
+# ---------------------------------------------------------------------------
+# Background promotion: PromotionScheduler alongside foreground writes
+# ---------------------------------------------------------------------------
+
+def bench_scheduler(tmp_dir: str, n_commitments: int = 200, n_writes: int = 200):
+    _section("Background promotion — PromotionScheduler vs. foreground writes")
+    persons = _make_persons(tmp_dir, "bench_scheduler.db", 4)
+    now = datetime.now(ZoneInfo("UTC")).replace(second=0, microsecond=0)
+    start = int(now.timestamp()) - n_commitments * 3600
+    for i in range(n_commitments):  # a backlog: every commitment ended while nobody was at the console
+        persons.append_selected_intersection(Interval(tuple(x.id for x in persons.persons[:2]), start + i * 3600, start + i * 3600 + 1800))
+    with contextlib.redirect_stdout(io.StringIO()):
+        persons.create_intersecting_commitments()
+    person = persons.persons[3]
+    scheduler = PromotionScheduler(persons, tick_seconds=0.01).start()
+    t0 = time.perf_counter()
+    for i in range(n_writes):
+        slot = now + timedelta(days=1, minutes=30 * i)
+        persons.create_availability(person, slot, slot + timedelta(minutes=15))
+    writes_s = time.perf_counter() - t0
+    while persons.commitments and (time.perf_counter() - t0 < 60):
+        time.sleep(0.01)
+    promoted_s = time.perf_counter() - t0
+    scheduler.stop()
+    assert scheduler.last_error is None, scheduler.last_error
+    assert not persons.commitments and len(persons.meetings_history) == n_commitments
+    assert len(person.availability) == n_writes
+    print(f"  {n_writes} foreground create_availability calls: {writes_s*1000:.0f} ms; "
+          f"all {n_commitments} overdue commitments promoted in the background by {promoted_s*1000:.0f} ms ({scheduler.runs} runs, no errors)")
+
+
+# ---------------------------------------------------------------------------
+# Write-behind: buffered edits flushed in one transaction vs. write-through
+# ---------------------------------------------------------------------------
+
+def bench_write_behind(tmp_dir: str, n_persons: int = 50, n_edits: int = 20):
+    _section(f"Write-behind — {n_persons} persons x {n_edits} availability edits (durable profile: fsync per commit)")
+    start = datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC"))
+    edits = _slots(n_edits, start, step_minutes=120)
+    try:
+        for label, write_behind_seconds in (("write-through", None), ("write-behind", 0)):
+            _make_persons(tmp_dir, f"write_behind_{label}.db", n_persons)
+            persons = Persons("UTC", "durable", write_behind_seconds)
+            t0 = time.perf_counter()
+            for person in persons.persons:
+                for s, e in edits:
+                    persons.create_availability(person, s, e)
+                persons.remove_availability(person, *edits[0])  # churn the buffer coalesces
+            edits_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            flushed = persons.flush()
+            flush_s = time.perf_counter() - t0
+            for person in persons.persons:
+                assert _db_schedule(person.id)[0] == [(x.start_ts, x.end_ts) for x in person.availability], f"{label}: DB differs from memory"
+            print(f"  {label:<14} edits {edits_s*1000:8.1f} ms   flush {flush_s*1000:7.1f} ms ({flushed} persons)   "
+                  f"total {(edits_s + flush_s)*1000:8.1f} ms")
+
+        # Crash after a flush: edits made since are lost, the flushed state is intact
+        person = persons.persons[0]
+        flushed_state = [(x.start_ts, x.end_ts) for x in person.availability]
+        persons.create_availability(person, start + timedelta(days=30), start + timedelta(days=30, hours=1))
+        assert len(persons.write_buffer) == 1
+        reloaded = Persons("UTC")  # a fresh process reading the DB (the buffered edit is never flushed)
+        assert [(x.start_ts, x.end_ts) for x in reloaded.persons_by_id[person.id].availability] == flushed_state
+        print(f"  crash after flush: reload sees exactly the last flushed state (1 buffered edit lost, nothing partial)")
+
+        # Interval flushing: the background thread persists buffered edits without an explicit flush()
+        timed = Persons("UTC", "durable", 0.05)
+        person = timed.persons_by_id[person.id]
+        timed.create_availability(person, start + timedelta(days=31), start + timedelta(days=31, hours=1))
+        t0 = time.perf_counter()
+        while len(timed.write_buffer) and (time.perf_counter() - t0 < 10):
+            time.sleep(0.01)
+        assert _db_schedule(person.id)[0] == [(x.start_ts, x.end_ts) for x in person.availability]
+        timed.close()
+        print(f"  flush thread (every 0.05 s): buffered edit persisted after {(time.perf_counter() - t0)*1000:.0f} ms, no explicit flush()")
+    finally:
+        database.set_profile(database.DEFAULT_PROFILE)
+
+
+# ---------------------------------------------------------------------------
+# Balance ledger: per-call key rebuild vs. persistent key set + UNIQUE index
+# ---------------------------------------------------------------------------
+
+def _legacy_create_balance_entries(balance, ledger, user_id, entries):
+    """The pre-ledger-key create_balance_entries() logic on plain values: the key set is rebuilt every call."""
+    keys = {x[0:5] for x in ledger}
+    for associate_ids, start_ts, end_ts, entry in entries:
+        balance = balance + float(entry)
+        row = (user_id, tuple(associate_ids), start_ts, end_ts, float(entry), balance)
+        if (row[0:5] not in keys):
+            keys.add(row[0:5])
+            ledger.append(row)
+    return balance
+
+def _db_ledger(user_id):
+    return (
+        [tuple(r) for r in database.fetch_all(
+            "SELECT associate_ids, start_ts, end_ts, amount, balance_after FROM balance_history WHERE user_id=? ORDER BY entry_id",
+            (user_id,))],
+        database.fetch_one("SELECT balance FROM users WHERE id=?", (user_id,))[0],
+    )
+
+def bench_ledger(tmp_dir: str, n_history: int = 20_000, n_calls: int = 500, n_batches: int = 300):
+    _section(f"Balance ledger — duplicate check and balance write ({n_history} entries already recorded)")
+    persons = _make_persons(tmp_dir, "ledger.db", 2)
+    person = persons.persons[0]
+    base_ts = int(datetime(2099, 1, 1, tzinfo=ZoneInfo("UTC")).timestamp())
+    with database.transaction():
+        database.execute_many(
+            """INSERT INTO balance_history (user_id, associate_ids, start_utc, end_utc, start_ts, end_ts, amount, balance_after)
+               VALUES (?,?,?,?,?,?,?,?)""",
+            [(person.id, "0&1", epoch_to_utc_text(base_ts + i * 3600), epoch_to_utc_text(base_ts + i * 3600 + 1800),
+              base_ts + i * 3600, base_ts + i * 3600 + 1800, 50.0, 50.0 * (i + 1)) for i in range(n_history)])
+        database.execute("UPDATE users SET balance=? WHERE id=?", (50.0 * n_history, person.id))
+    person = Person([getattr(person, a) for a in persons.person_attributes])
+    person.balance = 50.0 * n_history
+    person.balance_history  # loaded once, with its key set
+
+    _sub(f"Duplicate check, {n_calls} calls")
+    probes = [(person.id, (0, 1), base_ts + i * 3600, base_ts + i * 3600 + 1800, 50.0) for i in range(0, 2 * n_calls, 2)]
+    t0 = time.perf_counter()
+    legacy = [(key in {x[0:5] for x in person.balance_history}) for key in probes]
+    legacy_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    current = [(key in person._balance_keys) for key in probes]
+    current_s = time.perf_counter() - t0
+    assert legacy == current
+    print(f"  per-call key rebuild {legacy_s / n_calls * 1e6:10.1f} us per call")
+    print(f"  persistent key set   {current_s / n_calls * 1e6:10.3f} us per call   ({legacy_s / max(current_s, 1e-9):,.0f}x)")
+
+    _sub(f"create_balance_entry(), {n_calls} calls (half of them duplicates)")
+    database.enable_instrumentation(slow_query_ms=float("inf"))
+    try:
+        database.reset_query_stats()
+        t0 = time.perf_counter()
+        for i in range(n_calls):
+            ts = base_ts + (n_history - n_calls // 2 + i) * 3600  # the first half is already in the ledger
+            person.create_balance_entry((0, 1), ts, ts + 1800, 50.0)
+        elapsed = time.perf_counter() - t0
+        stats = database.query_stats()
+    finally:
+        database.disable_instrumentation()
+        database.reset_query_stats()
+    for x in stats:
+        print(f"  {x['calls']:6d} x {' '.join(x['sql'].split())[:70]}")
+    print(f"  {elapsed / n_calls * 1000:.3f} ms per call")
+    assert _db_ledger(person.id) == ([(ids_to_str(x.associate_ids), x.start_ts, x.end_ts, x.amount, x.balance_after)
+                                      for x in person.balance_history], person.balance)
+
+    _sub(f"Differential check — {n_batches} random billing batches (frequent duplicates) vs. the per-call rebuild")
+    rng = random.Random(25)
+    try:
+        for label, write_behind_seconds in (("write-through", None), ("write-behind", 0)):
+            _make_persons(tmp_dir, f"ledger_{label}.db", 2)
+            persons = Persons("UTC", None, write_behind_seconds)
+            person = persons.persons[0]
+            balance, ledger = person.balance, []
+            for i in range(n_batches):
+                entries = [(rng.choice(((0,), (0, 1))), base_ts + rng.randrange(40) * 1800, base_ts + rng.randrange(40, 60) * 1800,
+                            rng.choice((50.0, -20.0, 12.5))) for _ in range(rng.randint(1, 4))]
+                balance = _legacy_create_balance_entries(balance, ledger, person.id, entries)
+                person.create_balance_entries(entries)
+                assert [tuple(x) for x in person.balance_history] == ledger and person.balance == balance, f"{label}: batch {i + 1}"
+                if (write_behind_seconds is not None) and (rng.random() < 0.8):
+                    continue  # leave the batch in the buffer, coalesced with the next ones
+                persons.flush()
+                stored, stored_balance = _db_ledger(person.id)
+                assert stored == [(ids_to_str(x[1]), *x[2:]) for x in ledger], f"{label}: DB ledger differs after batch {i + 1}"
+                assert abs(stored_balance - balance) < 1e-6, f"{label}: users.balance differs after batch {i + 1}"
+            persons.close()
+            print(f"  {label:<14} {n_batches} batches: ledger ({len(ledger)} entries) and balance identical in memory and DB")
+    finally:
+        Person.write_buffer = None
+
+    _sub("Migration 3 on a ledger holding duplicates")
+    _use_temp_db(tmp_dir, "ledger_migration.db")
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.init_db(apply_migrations=False)
+        database.migrate(2)
+    database.execute("INSERT INTO users (id, role, first_name, last_name, date_of_birth, rate, balance, timezone) VALUES (1,'student','A','B','2000-01-01',50,150,'UTC')")
+    row = ("1", "2099-01-01 00:00:00", "2099-01-01 00:30:00", base_ts, base_ts + 1800)
+    database.execute_many(
+        "INSERT INTO balance_history (user_id, associate_ids, start_utc, end_utc, start_ts, end_ts, amount, balance_after) VALUES (1,?,?,?,?,?,50,?)",
+        [(*row, 50.0), (*row, 100.0), ("1&2", *row[1:], 150.0)])
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.migrate()
+    assert [r[0] for r in database.fetch_all("SELECT balance_after FROM balance_history ORDER BY entry_id")] == [50.0, 150.0]
+    assert database.fetch_one("SELECT balance FROM users WHERE id=1")[0] == 150
+    print(f"  3 rows (one duplicate) -> 2 rows, first copy kept, users.balance unchanged; schema v{database.get_schema_version()}")
+
+
+# ===========================================================================
+#  MAIN  — run all benchmarks
+# ===========================================================================
+
+def run_all_benchmarks():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bench_query_plans(tmp_dir)
+        bench_profiles(tmp_dir)
+        bench_sync(tmp_dir)
+        bench_startup(tmp_dir)
+        bench_memory()
+        bench_interval_insert()
+        bench_interval_remove()
+        bench_intersections()
+        bench_quorum()
+        bench_bitmaps(tmp_dir)
+        bench_batch()
+        bench_free_view(tmp_dir)
+        bench_promotion(tmp_dir)
+        bench_batch_promotion(tmp_dir)
+        bench_scheduler(tmp_dir)
+        bench_write_behind(tmp_dir)
+        bench_ledger(tmp_dir)
+        database.close_pool()
+
+    print(f"\n{SEP}\n  All benchmarks complete.\n{SEP}\n")
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
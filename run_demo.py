@@ -47,16 +47,19 @@ def _sub(label: str):
 #  persons.persons              -> list[Person]          all loaded Person objects
 #  persons.persons_len          -> int
 #  persons.person_attributes    -> list[str]             ordered field name list
-#  persons.commitments          -> list[[ids_str, start_utc, end_utc]]   global
-#  persons.meetings_history     -> list[[ids_str, start_utc, end_utc]]   global
-#  persons.active_meetings      -> list[[ids_str, start_utc, end_utc]]   transient
+#  persons.commitments          -> list[Interval(ids, start_ts, end_ts)]   global
+#  persons.meetings_history     -> list[Interval(ids, start_ts, end_ts)]   global
+#  persons.active_meetings      -> list[Interval(ids, start_ts, end_ts)]   transient
 #  persons.current_timezone     -> ZoneInfo
 #  persons.current_datetime     -> datetime (tz-aware)
 #  persons.search_results       -> list[Person]          last search result
 #  persons.selected_persons     -> list[Person]          working selection
-#  persons.selected_intersections -> list[[ids_str, start_utc, end_utc]]
+#  persons.selected_intersections -> list[Interval(ids, start_ts, end_ts)]
 #  persons.global_balance_entry_modifiers -> list[float] price multipliers
 #
+#  Interval (classes/interval.py) is an immutable NamedTuple: ids is a tuple of int user
+#  ids, start_ts / end_ts are integer UTC epoch seconds (see classes/timestamps.py)
+#
 # ===========================================================================
 
 def demo_persons_init():
@@ -76,6 +79,7 @@ def demo_persons_update(persons: Persons):
     _section("persons.update()")
     # INPUT  : (none)
     # EFFECT : refreshes current_datetime; promotes past commitments to meetings
+    #          (pops only the commitments that started / ended since the last update: O(1) when idle)
     # RETURNS: None
     persons.update()
     print(f"  current_datetime refreshed -> {persons.current_datetime}")
@@ -198,23 +202,29 @@ def demo_getters(persons: Persons):
 
     _sub("persons.get_availability(person)")
     # INPUT  : person  Person
-    # RETURNS: list[[user_id_str, start_utc_str, end_utc_str]]
+    # RETURNS: list[Interval((user_id,), start_ts, end_ts)]
     avail = persons.get_availability(p)
     print(f"  get_availability({p.first_name}) -> {avail[:2]} ...")
 
     _sub("persons.get_commitments(person)")
-    # RETURNS: list[[user_id_str, start_utc_str, end_utc_str]]
+    # RETURNS: list[Interval((user_id,), start_ts, end_ts)]
     commits = persons.get_commitments(p)
     print(f"  get_commitments({p.first_name}) -> {commits[:2]} ...")
 
+    _sub("person.free")
+    # RETURNS: IntervalSet of Interval((user_id,), start_ts, end_ts)  availability minus commitments
+    # NOTE   : built on first access, then updated incrementally by create/remove availability and
+    #          create/remove commitment; the intersection engines read it
+    print(f"  {p.first_name}.free -> {p.free[:2]} ...")
+
     _sub("persons.get_meetings_history(person)")
-    # RETURNS: list[[user_id_str, start_utc_str, end_utc_str]]
+    # RETURNS: list[Interval((user_id,), start_ts, end_ts)]
     meetings = persons.get_meetings_history(p)
     print(f"  get_meetings_history({p.first_name}) -> {meetings[:2]} ...")
 
     _sub("persons.get_active_meetings_for(person)")
     # INPUT  : person  Person
-    # RETURNS: list[[ids_str, start_utc_str, end_utc_str]]
+    # RETURNS: list[Interval(ids, start_ts, end_ts)]
     #          subset of persons.active_meetings where person.id is a participant
     active = persons.get_active_meetings_for(p)
     print(f"  get_active_meetings_for({p.first_name}) -> {active}")
@@ -327,10 +337,11 @@ def demo_plan_meeting(persons: Persons):
     _sub("persons.get_intersecting_availability(target_persons=[])")
     # INPUT  : target_persons  list[Person]  (defaults to persons.selected_persons)
     #          Requires >= 2 persons with overlapping availability
-    # RETURNS: list[[ids_str, start_utc_str, end_utc_str]]
+    # RETURNS: list[Interval(ids, start_ts, end_ts)]
     #          Each entry is a window where ALL listed persons are free.
-    #          ids_str format: "38&39&50"  (& -separated user ids)
-    # NOTE   : does NOT persist anything; purely computed from in-memory availability
+    #          ids format: (38, 39, 50)  (interval.ids_str -> "38&39&50")
+    # NOTE   : does NOT persist anything; purely computed from in-memory free time
+    #          (person.free = availability minus commitments), so booked time is never proposed
     if len(persons.persons) >= 2:
         intersections = persons.get_intersecting_availability(persons.persons[:2])
         print(f"  intersections for persons[0..1] -> {intersections}")
@@ -338,8 +349,47 @@ def demo_plan_meeting(persons: Persons):
         print("  (need >= 2 persons to demo)")
         intersections = []
 
+    _sub("persons.get_intersecting_availability_batch(groups)")
+    # INPUT  : groups  list[list[Person]]  candidate groups, e.g. [[teacher, s] for s in students]
+    # RETURNS: list[list[Interval(ids, start_ts, end_ts)]]  one result per group, in order
+    #          (same windows as get_intersecting_availability(group); [] for groups of < 2)
+    # NOTE   : vectorized with NumPy when installed, sweep line per group otherwise;
+    #          does not modify selected_persons / selected_intersections
+    if len(persons.persons) >= 2:
+        batch = persons.get_intersecting_availability_batch([[persons.persons[0], x] for x in persons.persons[1:3]])
+        print(f"  persons[0] against persons[1..2] -> {batch}")
+    else:
+        print("  (need >= 2 persons to demo)")
+
+    _sub("persons.get_quorum_availability(quorum, target_persons=[])")
+    # INPUT  : quorum  int  minimum number of target_persons that must be available
+    #          target_persons  list[Person]  (defaults to persons.selected_persons)
+    # RETURNS: list[Interval(free_ids, start_ts, end_ts)]
+    #          Each entry is a window where at least quorum persons are free; free_ids lists
+    #          exactly who is free, so committing it books only those persons.
+    # NOTE   : one sweep over all availabilities; quorum == len(target_persons) gives the same
+    #          windows as get_intersecting_availability()
+    if len(persons.persons) >= 3:
+        quorum_windows = persons.get_quorum_availability(2, persons.persons[:3])
+        print(f"  >= 2 of persons[0..2] available -> {quorum_windows}")
+    else:
+        print("  (need >= 3 persons to demo)")
+
+    _sub("persons.get_bitmap_availability(quorum=None, target_persons=[], grid=None)")
+    # INPUT  : quorum  int | None  (None = everyone free, like get_intersecting_availability)
+    #          target_persons  list[Person]  (defaults to persons.selected_persons)
+    #          grid  BitmapGrid  (defaults to persons.get_bitmap_grid(): 15-minute buckets, 90 days from today UTC)
+    # RETURNS: list[Interval(ids, start_ts, end_ts)]  (quorum windows annotated with who is free)
+    # NOTE   : uses availability MINUS commitments; windows are whole buckets. Each person's bitmap
+    #          is cached (person.free_bitmap(grid)) until their availability or commitments change
+    if len(persons.persons) >= 2:
+        bitmap_windows = persons.get_bitmap_availability(target_persons=persons.persons[:2])
+        print(f"  bitmap intersections for persons[0..1] -> {bitmap_windows}")
+    else:
+        print("  (need >= 2 persons to demo)")
+
     _sub("persons.append_selected_intersection(intersection)")
-    # INPUT  : intersection  [ids_str, start_utc_str, end_utc_str]
+    # INPUT  : intersection  Interval(ids, start_ts, end_ts)  (or a legacy [ids_str, start_ts, end_ts])
     # EFFECT : appends to persons.selected_intersections
     # RETURNS: None
     # (Typically called for each item the user picks from the intersection list)
@@ -429,7 +479,7 @@ def demo_person_direct(persons: Persons):
     p = persons.persons[0]
 
     _sub("Person attributes (read)")
-    # All attributes are plain strings (stored as str, cast on use):
+    # id / family_id are int (family_id may be None), rate / balance are float, the rest are str:
     print(f"  p.id            = {p.id}")
     print(f"  p.role          = {p.role}")
     print(f"  p.first_name    = {p.first_name}")
@@ -445,11 +495,11 @@ def demo_person_direct(persons: Persons):
     print(f"  p.timezone      = {p.timezone}")
     print(f"  p.comments      = {p.comments}")
 
-    _sub("Person scheduling data (read — list of [id_str, start_utc, end_utc])")
+    _sub("Person scheduling data (read — list of Interval((id,), start_ts, end_ts))")
     print(f"  p.availability      [{len(p.availability)}]")
     print(f"  p.commitments       [{len(p.commitments)}]")
     print(f"  p.meetings_history  [{len(p.meetings_history)}]")
-    # balance_history rows: [user_id, associate_ids, start_utc, end_utc, amount, balance_after]
+    # balance_history rows: BalanceEntry(user_id, associate_ids, start_ts, end_ts, amount, balance_after)
     print(f"  p.balance_history   [{len(p.balance_history)}]")
 
     _sub("str(person)")
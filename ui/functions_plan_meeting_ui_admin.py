@@ -1,20 +1,25 @@
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+from classes.interval import Interval
+from classes.timestamps import to_epoch, from_epoch
+
 
 class Functions_Plan_Meeting_Ui_Admin:
     """
     Sub-UI for the plan_meeting flow.
     Shows available intersection windows for the selected persons, lets the admin
     pick a window and optionally trim the start/end time within its bounds, then
-    returns the finalised list of [ids_str, start_utc_str, end_utc_str] items
+    returns the finalised list of Interval(ids, start_ts, end_ts) items (UTC epoch seconds)
     ready to be committed as intersecting commitments.
+    Quorum windows (Persons.get_quorum_availability) carry only the available
+    participants' ids, so committing one books just those participants.
     """
-    FMT = "%Y-%m-%d %H:%M:%S%z"
 
-    def __init__(self, persons, intersections: list):
+    def __init__(self, persons, intersections: list, n_selected: int | None = None):
         self.persons = persons
-        self.intersections = intersections  # list of [ids_str, start_utc_str, end_utc_str]
+        self.intersections = intersections  # list of Interval(ids, start_ts, end_ts)
+        self.n_selected = n_selected        # shown as "k/n available" when given
         self.local_tz = persons.current_timezone
         self.utc_tz = ZoneInfo("UTC")
 
@@ -31,26 +36,27 @@ class Functions_Plan_Meeting_Ui_Admin:
                 continue
         return None
 
-    def _fmt_local(self, utc_str: str) -> str:
-        dt = datetime.strptime(utc_str, self.FMT).astimezone(self.local_tz)
+    def _fmt_local(self, ts: int) -> str:
+        dt = from_epoch(ts, self.local_tz)
         return dt.strftime("%Y-%m-%d %H:%M %Z")
 
     def _print_separator(self, label=""):
         print(f"---------- {label} ----------" if label else "----------------------------------------")
 
-    def _print_intersection(self, idx: int, item: list):
-        ids_str, start_str, end_str = item[0], item[1], item[2]
-        start_local = datetime.strptime(start_str, self.FMT).astimezone(self.local_tz)
-        end_local   = datetime.strptime(end_str,   self.FMT).astimezone(self.local_tz)
+    def _print_intersection(self, idx: int, item: Interval):
+        ids_str, start_ts, end_ts = item.ids_str, item.start_ts, item.end_ts
+        start_local = from_epoch(start_ts, self.local_tz)
+        end_local   = from_epoch(end_ts,   self.local_tz)
         duration_min = int((end_local - start_local).total_seconds() // 60)
-        print(f"  [{idx}]  IDs: {ids_str}  |  {start_local:%Y-%m-%d %H:%M %Z} --> {end_local:%H:%M %Z}  ({duration_min} min)")
+        available = f"  [{len(item.ids)}/{self.n_selected} available]" if self.n_selected else ""
+        print(f"  [{idx}]  IDs: {ids_str}{available}  |  {start_local:%Y-%m-%d %H:%M %Z} --> {end_local:%H:%M %Z}  ({duration_min} min)")
 
     # ----- Main entry point -----
 
     def run(self) -> list:
         """
         Interactive loop. Returns a (possibly empty) list of trimmed
-        [ids_str, start_utc_str, end_utc_str] items to commit, or [] on cancel.
+        Interval(ids, start_ts, end_ts) items to commit, or [] on cancel.
         """
         planned = []
 
@@ -91,9 +97,9 @@ class Functions_Plan_Meeting_Ui_Admin:
                 continue
 
             item = self.intersections[idx]
-            ids_str      = item[0]
-            window_start = datetime.strptime(item[1], self.FMT).astimezone(self.local_tz)
-            window_end   = datetime.strptime(item[2], self.FMT).astimezone(self.local_tz)
+            ids_str      = item.ids_str
+            window_start = from_epoch(item[1], self.local_tz)
+            window_end   = from_epoch(item[2], self.local_tz)
             duration_min = int((window_end - window_start).total_seconds() // 60)
 
             print("")
@@ -107,7 +113,7 @@ class Functions_Plan_Meeting_Ui_Admin:
                 continue
 
             elif choice == "f":
-                planned.append(list(item))
+                planned.append(item)
                 print(f"  Added full window.")
 
             elif choice == "t":
@@ -125,13 +131,11 @@ class Functions_Plan_Meeting_Ui_Admin:
                     if t_end and t_start < t_end <= window_end:
                         break
                     print(f"  Must be after {t_start:%H:%M} and no later than {window_end:%H:%M}.")
-                t_start_utc = t_start.astimezone(self.utc_tz)
-                t_end_utc   = t_end.astimezone(self.utc_tz)
-                planned.append([
-                    ids_str,
-                    t_start_utc.strftime(self.FMT),
-                    t_end_utc.strftime(self.FMT)
-                ])
+                planned.append(Interval(
+                    item.ids,
+                    to_epoch(t_start),
+                    to_epoch(t_end)
+                ))
                 trimmed_min = int((t_end - t_start).total_seconds() // 60)
                 print(f"  Added: {t_start:%H:%M %Z} --> {t_end:%H:%M %Z}  ({trimmed_min} min)")
 